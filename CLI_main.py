@@ -1,7 +1,19 @@
 import sys
 import os
-import docker_manager
+from lazy_import import lazy_import
 import vm_manager  
+import capacity
+import launch_profile
+import storage_maintenance
+import vm_snapshots
+import job_scheduler
+
+# Only loaded (and the daemon contacted) once a Docker option is used
+docker_manager = lazy_import("docker_manager")
+docker_stacks = lazy_import("docker_stacks")
+container_ops = lazy_import("container_ops")
+docker_gc = lazy_import("docker_gc")
+docker_hosts = lazy_import("docker_hosts")
 
 def print_header():
     print("=" * 40)
@@ -9,10 +21,17 @@ def print_header():
     print("=" * 40)
 
 def main_menu():
+    # Pick up disks added or removed while the tool was closed
+    try:
+        vm_manager.reconcile_inventory()
+    except Exception as e:
+        print(f"Warning: could not sync the VM inventory: {e}")
+
     while True:
         print_header()
         print("1. VM Operations (QEMU)")
         print("2. Docker Operations")
+        print("3. Background Jobs")
         print("0. Exit")
         print("-" * 40)
         
@@ -22,6 +41,8 @@ def main_menu():
             vm_menu()
         elif choice == '2':
             docker_menu()
+        elif choice == '3':
+            job_scheduler.show_jobs()
         elif choice == '0':
             print("Exiting system. Goodbye!")
             sys.exit()
@@ -32,6 +53,23 @@ def vm_menu():
     print("\n--- VM Operations ---")
     print("1. Create VM (Interactive)")
     print("2. Create VM (From Config File)")
+    print("3. Create VM Fleet (Batch)")
+    print("4. List Base Images")
+    print("5. List Running VMs")
+    print("6. Stop a VM")
+    print("7. Force-kill a VM")
+    print("8. VM Status (All)")
+    print("9. Pause a VM")
+    print("10. Resume a VM")
+    print("11. Shut Down a VM (Graceful)")
+    print("12. VM CPU & Disk Stats")
+    print("13. Watch Serial Console (Headless VM)")
+    print("14. Host Capacity")
+    print("15. Launch Profile (KVM / CPU Tuning)")
+    print("16. VM Inventory")
+    print("17. Disk Usage Report")
+    print("18. Compact / Compress Disk Images")
+    print("19. Snapshots")
     print("0. Back to Main Menu")
     
     choice = input("Select operation: ")
@@ -39,13 +77,65 @@ def vm_menu():
         vm_manager.create_vm_interactive()
     elif choice == '2':
         vm_manager.create_vm_from_config()  
+    elif choice == '3':
+        vm_manager.create_fleet_from_source()
+    elif choice == '4':
+        vm_manager.show_base_images()
+    elif choice == '5':
+        vm_manager.list_running_vms()
+    elif choice == '6':
+        vm_manager.stop_vm()
+    elif choice == '7':
+        vm_manager.stop_vm(force=True)
+    elif choice == '8':
+        vm_manager.show_vm_status()
+    elif choice == '9':
+        vm_manager.control_vm("pause")
+    elif choice == '10':
+        vm_manager.control_vm("resume")
+    elif choice == '11':
+        vm_manager.control_vm("shutdown")
+    elif choice == '12':
+        vm_manager.show_vm_stats()
+    elif choice == '13':
+        vm_manager.watch_console()
+    elif choice == '14':
+        capacity.show_capacity()
+    elif choice == '15':
+        launch_profile.show_profile()
+    elif choice == '16':
+        vm_manager.show_inventory()
+    elif choice == '17':
+        storage_maintenance.show_report()
+    elif choice == '18':
+        storage_maintenance.run_maintenance()
+    elif choice == '19':
+        snapshot_menu()
+    elif choice == '0':
+        return
+    else:
+        print("Invalid choice.")
+
+def snapshot_menu():
+    print("\n--- VM Snapshots ---")
+    print("1. Create Snapshot")
+    print("2. List Snapshots")
+    print("3. Revert to Snapshot")
+    print("4. Delete Snapshot")
+    print("5. Reset VM to Snapshot (Fast Restore)")
+    print("0. Back")
+
+    actions = {'1': "create", '2': "list", '3': "revert", '4': "delete", '5': "reset"}
+    choice = input("Select operation: ")
+    if choice in actions:
+        vm_snapshots.manage_snapshots(actions[choice])
     elif choice == '0':
         return
     else:
         print("Invalid choice.")
 
 def docker_menu():
-    print("\n--- Docker Operations ---")
+    print(f"\n--- Docker Operations (host: {docker_hosts.hosts.active}) ---")
     print("1. Create Dockerfile")          
     print("2. Build Docker Image")
     print("3. List Docker Images")
@@ -53,6 +143,14 @@ def docker_menu():
     print("5. Stop a Container")            
     print("6. Search Image (DockerHub)")
     print("7. Pull Image")
+    print("8. Search Local Images")
+    print("9. Container Resource Usage")
+    print("10. Deploy Stack")
+    print("11. Tear Down Stack")
+    print("12. Bulk Container Operations")
+    print("13. Clean Up Images & Build Cache")
+    print("14. Analyze Dockerfile")
+    print("15. Select Docker Host")
     print("0. Back to Main Menu")
     
     choice = input("Select operation: ")
@@ -71,6 +169,22 @@ def docker_menu():
         docker_manager.search_dockerhub()
     elif choice == '7':
         docker_manager.pull_image()
+    elif choice == '8':
+        docker_manager.search_local_images()
+    elif choice == '9':
+        docker_manager.show_container_stats()
+    elif choice == '10':
+        docker_stacks.deploy_stack_interactive()
+    elif choice == '11':
+        docker_stacks.teardown_stack_interactive()
+    elif choice == '12':
+        container_ops.bulk_containers_interactive()
+    elif choice == '13':
+        docker_gc.collect_garbage_interactive()
+    elif choice == '14':
+        docker_manager.analyze_dockerfile()
+    elif choice == '15':
+        docker_manager.select_docker_host()
     elif choice == '0':
         return
     else:
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+from statistics import median
+
+# Each measurement runs in a fresh interpreter so nothing is already imported
+Default_Runs = 5
+
+# Code timed in the child process; it prints the elapsed seconds as JSON
+Import_Snippet = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "docker_loaded": "docker" in sys.modules}}))
+"""
+
+Gui_Snippet = """
+import json, time
+started = time.perf_counter()
+import gui_main
+imported = time.perf_counter()
+app = gui_main.CloudManagerApp()
+app.update()
+shown = time.perf_counter()
+app.destroy()
+print(json.dumps({"seconds": shown - started, "import_seconds": imported - started}))
+"""
+
+Docker_Snippet = """
+import json, time
+import docker_manager
+started = time.perf_counter()
+try:
+    docker_manager.get_client().ping()
+    error = None
+except Exception as e:
+    error = str(e)
+print(json.dumps({"seconds": time.perf_counter() - started, "error": error}))
+"""
+
+
+def run_snippet(code):
+    """Runs code in a new interpreter from the project folder and returns its JSON result."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run([sys.executable, "-c", code], cwd=here, capture_output=True, text=True, timeout=120)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit status {proc.returncode}")
+    return json.loads(lines[-1])
+
+
+def measure(name, code, runs):
+    results, error = [], None
+    for _ in range(runs):
+        try:
+            results.append(run_snippet(code))
+        except Exception as e:
+            error = str(e)
+            break
+    row = {"name": name, "runs": len(results), "error": error}
+    if results:
+        times = [r["seconds"] for r in results]
+        row.update({"median_ms": 1000 * median(times), "min_ms": 1000 * min(times), "max_ms": 1000 * max(times)})
+        row["docker_loaded"] = results[-1].get("docker_loaded")
+        row["error"] = row["error"] or results[-1].get("error")
+    return row
+
+
+def run_benchmarks(runs=Default_Runs, gui=True, docker=True):
+    rows = [measure(f"import {m}", Import_Snippet.format(module=m), runs)
+            for m in ("CLI_main", "gui_main", "cms", "vm_manager", "docker_manager")]
+    if gui:
+        rows.append(measure("GUI window shown", Gui_Snippet, runs))
+    if docker:
+        rows.append(measure("Docker first connect", Docker_Snippet, runs))
+    return rows
+
+
+def print_report(rows):
+    print(f"{'MEASUREMENT':<24} {'MEDIAN ms':>10} {'MIN ms':>8} {'MAX ms':>8}  NOTES")
+    for r in rows:
+        if "median_ms" not in r:
+            print(f"{r['name']:<24} {'-':>10} {'-':>8} {'-':>8}  skipped: {r['error']}")
+            continue
+        notes = []
+        if r.get("docker_loaded"):
+            notes.append("loads docker-py")
+        if r["error"]:
+            notes.append(f"error: {r['error'][:60]}")
+        print(f"{r['name']:<24} {r['median_ms']:>10.1f} {r['min_ms']:>8.1f} {r['max_ms']:>8.1f}  {', '.join(notes)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup latency of the CLI, the GUI and the Docker connection")
+    parser.add_argument("--runs", type=int, default=Default_Runs)
+    parser.add_argument("--no-gui", action="store_true", help="skip opening the window (e.g. without a display)")
+    parser.add_argument("--no-docker", action="store_true", help="skip connecting to the Docker daemon")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+    results = run_benchmarks(args.runs, gui=not args.no_gui, docker=not args.no_docker)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_report(results)
@@ -0,0 +1,216 @@
+import os
+import queue
+import tarfile
+import threading
+from docker.utils.build import PatternMatcher, exclude_paths
+from job_scheduler import check_cancelled
+
+# Size of each piece of the build context sent to the daemon
+Chunk_Size = 64 * 1024
+
+# How many pieces may wait for the upload; caps memory at about 2 MB
+Queue_Chunks = 32
+
+# Files or top-level folders bigger than this are pointed out
+Large_Item_MB = 50
+
+# Things that are almost never needed inside an image
+Suggested_Ignores = [
+    (".git", "version control history"),
+    ("**/node_modules", "installed JS packages; install them in the Dockerfile"),
+    ("**/__pycache__", "Python bytecode"),
+    ("**/*.pyc", "Python bytecode"),
+    (".venv", "local virtualenv"),
+    ("venv", "local virtualenv"),
+    ("**/.pytest_cache", "test cache"),
+    ("**/.mypy_cache", "type checker cache"),
+    ("**/*.log", "log files"),
+    (".idea", "editor settings"),
+    (".vscode", "editor settings"),
+    ("**/.DS_Store", "Finder metadata"),
+]
+
+
+def read_dockerignore(path):
+    """Patterns from <path>/.dockerignore, parsed the way the Docker client does."""
+    ignore_file = os.path.join(path, ".dockerignore")
+    if not os.path.exists(ignore_file):
+        return []
+    with open(ignore_file) as f:
+        return [line.strip() for line in f.read().splitlines() if line.strip() and not line.strip().startswith("#")]
+
+
+def context_files(path, patterns=None, dockerfile="Dockerfile"):
+    """Relative paths (files and folders) that end up in the build context."""
+    patterns = read_dockerignore(path) if patterns is None else patterns
+    # exclude_paths() appends to the list it is given
+    return sorted(exclude_paths(os.path.abspath(path), list(patterns), dockerfile=dockerfile))
+
+
+def _ignored_by(matcher, rel):
+    """A pattern that matches a folder also ignores everything below it."""
+    parts = rel.split("/")
+    return any(matcher.matches("/".join(parts[:i])) for i in range(1, len(parts) + 1))
+
+
+def analyze_context(path, dockerfile="Dockerfile", top=10):
+    """
+    Walks what the build would send and reports its size, the largest
+    files and top-level entries, and .dockerignore entries that would
+    shrink it, each with the bytes it saves.
+    """
+    root = os.path.abspath(path)
+    patterns = read_dockerignore(path)
+    sizes = {}
+    for rel in context_files(path, patterns, dockerfile):
+        full_path = os.path.join(root, rel)
+        if os.path.islink(full_path) or not os.path.isdir(full_path):
+            sizes[rel] = os.lstat(full_path).st_size
+
+    by_top = {}
+    for rel, size in sizes.items():
+        head = rel.split("/", 1)[0]
+        by_top[head] = by_top.get(head, 0) + size
+
+    suggestions = []
+    for pattern, reason in Suggested_Ignores:
+        if pattern in patterns:
+            continue
+        matcher = PatternMatcher([pattern])
+        saved = sum(size for rel, size in sizes.items() if _ignored_by(matcher, rel))
+        if saved:
+            suggestions.append({"pattern": pattern, "reason": reason, "bytes": saved})
+    suggested = {s["pattern"] for s in suggestions}
+    for head, size in sorted(by_top.items(), key=lambda item: item[1], reverse=True):
+        if size >= Large_Item_MB * 1024 * 1024 and head not in suggested and head not in (dockerfile, ".dockerignore"):
+            suggestions.append({"pattern": head, "reason": "large; ignore it unless the image needs it", "bytes": size})
+
+    return {
+        "path": root,
+        "total_bytes": sum(sizes.values()),
+        "files": len(sizes),
+        "largest_files": sorted(sizes.items(), key=lambda item: item[1], reverse=True)[:top],
+        "largest_entries": sorted(by_top.items(), key=lambda item: item[1], reverse=True)[:top],
+        "suggestions": sorted(suggestions, key=lambda s: s["bytes"], reverse=True),
+        "has_dockerignore": os.path.exists(os.path.join(root, ".dockerignore")),
+    }
+
+
+def format_context_report(report):
+    def size(n):
+        return f"{n / (1024 * 1024):.1f} MB"
+
+    lines = [f"Build context: {size(report['total_bytes'])} in {report['files']} file(s)"
+             + ("" if report["has_dockerignore"] else " (no .dockerignore)")]
+    if report["largest_entries"]:
+        lines.append("Largest top-level entries:")
+        lines.extend(f"  {size(n):>10}  {name}" for name, n in report["largest_entries"])
+    if report["largest_files"]:
+        lines.append("Largest files:")
+        lines.extend(f"  {size(n):>10}  {name}" for name, n in report["largest_files"])
+    if report["suggestions"]:
+        lines.append("Suggested .dockerignore entries:")
+        lines.extend(f"  {s['pattern']:<22} saves {size(s['bytes']):>10}  ({s['reason']})" for s in report["suggestions"])
+    return lines
+
+
+def write_dockerignore(path, patterns):
+    """Appends patterns that are not there yet to .dockerignore. Returns the ones added."""
+    existing = read_dockerignore(path)
+    added = [p for p in patterns if p not in existing]
+    if added:
+        ignore_file = os.path.join(path, ".dockerignore")
+        needs_newline = os.path.exists(ignore_file) and os.path.getsize(ignore_file) > 0
+        with open(ignore_file, "a") as f:
+            if needs_newline:
+                f.write("\n")
+            f.write("# Added by the build context analyzer\n")
+            f.write("\n".join(added) + "\n")
+    return added
+
+
+class _QueueWriter:
+    """File-like object that tarfile writes into; hands fixed-size chunks to a queue."""
+
+    def __init__(self, chunks, cancelled):
+        self.chunks = chunks
+        self.cancelled = cancelled
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        while len(self.buffer) >= Chunk_Size:
+            self.put(bytes(self.buffer[:Chunk_Size]))
+            del self.buffer[:Chunk_Size]
+        return len(data)
+
+    def flush_all(self):
+        if self.buffer:
+            self.put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def put(self, chunk):
+        while True:
+            if self.cancelled.is_set():
+                raise InterruptedError("build context upload cancelled")
+            try:
+                self.chunks.put(chunk, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+
+def stream_context(path, dockerfile="Dockerfile"):
+    """
+    Yields the build context as tar chunks while it is being written, with
+    .dockerignore applied. Files are read on a helper thread and at most
+    Queue_Chunks chunks wait for the upload, so the context is never held
+    in memory or written to a temporary file first.
+    """
+    root = os.path.abspath(path)
+    files = context_files(path, dockerfile=dockerfile)
+    chunks = queue.Queue(maxsize=Queue_Chunks)
+    cancelled = threading.Event()
+    done = object()
+    failure = []
+
+    writer = _QueueWriter(chunks, cancelled)
+
+    def produce():
+        try:
+            with tarfile.open(mode="w|", fileobj=writer) as tar:
+                for rel in files:
+                    full_path = os.path.join(root, rel)
+                    info = tar.gettarinfo(full_path, arcname=rel)
+                    if info is None:
+                        # Sockets cannot be archived
+                        continue
+                    if info.isfile():
+                        with open(full_path, "rb") as f:
+                            tar.addfile(info, f)
+                    else:
+                        tar.addfile(info)
+            writer.flush_all()
+        except Exception as e:
+            failure.append(e)
+        finally:
+            try:
+                writer.put(done)
+            except InterruptedError:
+                pass
+
+    producer = threading.Thread(target=produce, name="build-context", daemon=True)
+    producer.start()
+    try:
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            # The upload runs on the build's own thread, so a cancelled job stops it here
+            check_cancelled()
+            yield chunk
+        if failure:
+            raise failure[0]
+    finally:
+        # The upload stopped early (or finished): let the producer exit
+        cancelled.set()
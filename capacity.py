@@ -0,0 +1,147 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from vm_supervisor import supervisor
+from job_scheduler import check_cancelled
+
+# How far VM allocations may go past the host's real resources.
+# RAM is not overcommitted by default because a swapping host slows every VM.
+RAM_Overcommit = float(os.environ.get("CMS_RAM_OVERCOMMIT", "1.0"))
+CPU_Overcommit = float(os.environ.get("CMS_CPU_OVERCOMMIT", "4.0"))
+
+# RAM kept free for the host OS and QEMU's own overhead
+Host_Reserved_MB = int(os.environ.get("CMS_HOST_RESERVED_MB", "1024"))
+
+# Held between the admission check and the QEMU start, so two launches
+# can't both take the last free slot
+_admission_lock = threading.Lock()
+
+
+class CapacityError(Exception):
+    """Raised when a VM does not fit on this host."""
+
+
+def read_meminfo():
+    """Returns /proc/meminfo as {field: value in kB}."""
+    info = {}
+    with open("/proc/meminfo", 'r') as f:
+        for line in f:
+            key, value = line.split(":", 1)
+            info[key] = int(value.split()[0])
+    return info
+
+
+def kvm_available():
+    """True when /dev/kvm exists and this user may open it."""
+    return os.path.exists("/dev/kvm") and os.access("/dev/kvm", os.R_OK | os.W_OK)
+
+
+def host_capacity():
+    """Reads the host's memory, usable cores and KVM availability."""
+    meminfo = read_meminfo()
+    return {
+        "ram_total_mb": meminfo["MemTotal"] // 1024,
+        "ram_available_mb": meminfo.get("MemAvailable", meminfo["MemFree"]) // 1024,
+        "cpu_cores": len(os.sched_getaffinity(0)),
+        "kvm": kvm_available(),
+    }
+
+
+def allocated():
+    """RAM and vCPUs already given to the VMs the supervisor is running."""
+    vms = supervisor.list_vms()
+    return {
+        "ram_mb": sum(vm["ram_mb"] for vm in vms),
+        "cpu_cores": sum(vm["cpu_cores"] for vm in vms),
+        "vms": len(vms),
+    }
+
+
+def limits(host=None):
+    """The most RAM and vCPUs that may be allocated to VMs in total."""
+    host = host or host_capacity()
+    return {
+        "ram_mb": int((host["ram_total_mb"] - Host_Reserved_MB) * RAM_Overcommit),
+        "cpu_cores": int(host["cpu_cores"] * CPU_Overcommit),
+    }
+
+
+def check(ram_mb, cpu_cores, extra_ram_mb=0, extra_cpu_cores=0):
+    """
+    Returns (ok, reason) for starting a VM of this size now.
+    extra_* counts resources promised to VMs that are not running yet.
+    """
+    limit = limits()
+    used = allocated()
+    ram_after = used["ram_mb"] + extra_ram_mb + int(ram_mb)
+    cpu_after = used["cpu_cores"] + extra_cpu_cores + int(cpu_cores)
+
+    if ram_after > limit["ram_mb"]:
+        return False, f"RAM would be {ram_after} MB of {limit['ram_mb']} MB allowed (overcommit x{RAM_Overcommit})"
+    if cpu_after > limit["cpu_cores"]:
+        return False, f"vCPUs would be {cpu_after} of {limit['cpu_cores']} allowed (overcommit x{CPU_Overcommit})"
+    return True, "ok"
+
+
+@contextmanager
+def reserve(ram_mb, cpu_cores, wait=False, timeout=None, poll_seconds=2):
+    """
+    Admission control around a VM launch. Start the VM inside the 'with'
+    block. Raises CapacityError if the VM doesn't fit; with wait=True it is
+    queued until running VMs free enough resources (or the timeout passes).
+    """
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        with _admission_lock:
+            ok, reason = check(ram_mb, cpu_cores)
+            if ok:
+                yield
+                return
+        if not wait:
+            raise CapacityError(reason)
+        if deadline is not None and time.monotonic() > deadline:
+            raise CapacityError(f"Timed out waiting for capacity: {reason}")
+        # A queued launch inside a job stops waiting once the job is cancelled
+        check_cancelled()
+        time.sleep(poll_seconds)
+
+
+def plan_fleet(specs):
+    """
+    Bin-packs a fleet onto the free capacity of this host.
+    Largest VMs (by RAM, then vCPUs) are placed first; each VM that still
+    fits is admitted. Returns (admitted, deferred) lists of specs.
+    """
+    limit = limits()
+    used = allocated()
+    free_ram = limit["ram_mb"] - used["ram_mb"]
+    free_cpu = limit["cpu_cores"] - used["cpu_cores"]
+
+    admitted, deferred = [], []
+    for spec in sorted(specs, key=lambda s: (int(s["ram_mb"]), int(s["cpu_cores"])), reverse=True):
+        if int(spec["ram_mb"]) <= free_ram and int(spec["cpu_cores"]) <= free_cpu:
+            admitted.append(spec)
+            free_ram -= int(spec["ram_mb"])
+            free_cpu -= int(spec["cpu_cores"])
+        else:
+            deferred.append(spec)
+    return admitted, deferred
+
+
+def show_capacity():
+    """Prints host resources, what the running VMs use and what is left."""
+    print("\n--- Host Capacity ---")
+    try:
+        host = host_capacity()
+        limit = limits(host)
+        used = allocated()
+    except Exception as e:
+        print(f"Error reading host resources: {e}")
+        return
+    print(f"KVM acceleration : {'available' if host['kvm'] else 'NOT available (/dev/kvm)'}")
+    print(f"Host RAM         : {host['ram_total_mb']} MB total, {host['ram_available_mb']} MB available")
+    print(f"Host cores       : {host['cpu_cores']}")
+    print(f"Running VMs      : {used['vms']}")
+    print(f"RAM allocated    : {used['ram_mb']} / {limit['ram_mb']} MB (overcommit x{RAM_Overcommit}, {Host_Reserved_MB} MB reserved)")
+    print(f"vCPUs allocated  : {used['cpu_cores']} / {limit['cpu_cores']} (overcommit x{CPU_Overcommit})")
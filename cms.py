@@ -0,0 +1,544 @@
+"""
+Scriptable command line for the Cloud Management System.
+
+    python cms.py vm create --config vm_config.json
+    python cms.py docker pull ubuntu nginx python:3.12
+    python cms.py docker images --json
+
+Nothing is asked interactively. Results go to stdout as a table, as one
+JSON document (--json) or as one JSON object per line (--ndjson).
+Progress and messages from the managers go to stderr, so stdout can be
+piped. The exit status is 0 on success, 1 if any part of the operation
+failed and 2 for usage errors.
+"""
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+# Where results are written; manager output is redirected to stderr
+_stdout = sys.stdout
+
+
+def log(line):
+    print(line, file=sys.stderr, flush=True)
+
+
+def emit(args, data, columns=None):
+    """Writes a result (a dict or a list of dicts) in the chosen format."""
+    if args.format == "json":
+        json.dump(data, _stdout, indent=2, default=str)
+        _stdout.write("\n")
+    elif args.format == "ndjson":
+        for item in data if isinstance(data, list) else [data]:
+            _stdout.write(json.dumps(item, default=str) + "\n")
+    elif isinstance(data, dict):
+        width = max((len(k) for k in data), default=0)
+        for key, value in data.items():
+            _stdout.write(f"{key:<{width}}  {value}\n")
+    else:
+        columns = columns or (list(data[0]) if data else [])
+        widths = [max([len(c)] + [len(_cell(row.get(c))) for row in data]) for c in columns]
+        _stdout.write("  ".join(c.upper().ljust(w) for c, w in zip(columns, widths)).rstrip() + "\n")
+        for row in data:
+            _stdout.write("  ".join(_cell(row.get(c)).ljust(w) for c, w in zip(columns, widths)).rstrip() + "\n")
+    _stdout.flush()
+
+
+def _cell(value):
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.1f}"
+    if isinstance(value, (list, tuple)):
+        return ",".join(str(v) for v in value)
+    return str(value)
+
+
+def _failed(results, key="error"):
+    return 1 if any(r.get(key) for r in results) else 0
+
+
+# =====================================================
+# VM
+# =====================================================
+def vm_create(args):
+    import vm_manager
+    import capacity
+
+    if args.config:
+        specs = vm_manager.load_vm_specs(args.config)
+    else:
+        if not (args.name and args.ram and args.cpu and args.disk):
+            raise UsageError("give --config, or --name, --ram, --cpu and --disk")
+        specs = [dict(vm_manager.VM_Defaults, vm_name=args.name, ram_mb=args.ram, cpu_cores=args.cpu,
+                      disk_size_gb=args.disk, iso_path=args.iso or "", base_image=args.base,
+                      headless=args.headless, vnc=args.vnc)]
+
+    if len(specs) == 1 and not args.no_launch:
+        spec = specs[0]
+        ok, reason = capacity.check(spec["ram_mb"], spec["cpu_cores"])
+        if not ok:
+            emit(args, [{"name": spec["vm_name"], "disk_path": None, "pid": None, "error": f"not enough host capacity: {reason}"}])
+            return 1
+
+    results = vm_manager.create_fleet(specs, launch=not args.no_launch, queue=args.queue)
+    rows = []
+    for r in results:
+        vm = r.get("vm")
+        error = r["error"]
+        if not error and not args.no_launch and not vm:
+            error = "deferred: not enough host capacity" if r.get("deferred") else "QEMU failed to start"
+        rows.append({"name": r["name"], "disk_path": r["disk_path"], "pid": vm["pid"] if vm else None,
+                     "seconds": r["seconds"], "error": error})
+    emit(args, rows, ["name", "pid", "seconds", "disk_path", "error"])
+    return _failed(rows)
+
+
+def vm_list(args):
+    import vm_manager
+
+    rows = [{"name": vm["name"], "pid": vm["pid"], "ram_mb": vm["ram_mb"], "cpu_cores": vm["cpu_cores"],
+             "uptime_s": int(time.time() - vm["started_at"]), "disk_path": vm.get("disk_path")}
+            for vm in vm_manager.supervisor.list_vms()]
+    emit(args, rows, ["name", "pid", "ram_mb", "cpu_cores", "uptime_s", "disk_path"])
+    return 0
+
+
+def vm_inventory(args):
+    import vm_manager
+
+    vm_manager.inventory.sync_running(vm["name"] for vm in vm_manager.supervisor.list_vms())
+    rows = vm_manager.inventory.list_vms(args.status)
+    emit(args, rows, ["name", "status", "created_at", "last_run_at", "base_image", "disk_path"])
+    return 0
+
+
+def vm_status(args):
+    import vm_manager
+
+    if args.name:
+        statuses = {args.name: vm_manager.vm_status(args.name)}
+    else:
+        statuses = vm_manager.query_all_vms()
+    rows = []
+    for name, status in statuses.items():
+        if isinstance(status, Exception):
+            rows.append({"name": name, "status": None, "error": str(status)})
+        else:
+            rows.append({"name": name, "status": status["status"], "error": None})
+    emit(args, rows, ["name", "status", "error"])
+    return _failed(rows)
+
+
+def vm_stop(args):
+    import vm_manager
+
+    stopped = vm_manager.supervisor.kill(args.name) if args.force else vm_manager.supervisor.stop(args.name)
+    if stopped:
+        vm_manager.inventory.set_status(args.name, "stopped")
+    emit(args, {"name": args.name, "stopped": stopped})
+    return 0 if stopped else 1
+
+
+def vm_control(args):
+    import vm_manager
+
+    {"pause": vm_manager.pause_vm, "resume": vm_manager.resume_vm, "shutdown": vm_manager.powerdown_vm}[args.action](args.name)
+    emit(args, {"name": args.name, "action": args.action, "sent": True})
+    return 0
+
+
+def vm_stats(args):
+    import vm_manager
+
+    data = {"name": args.name, "cpus": vm_manager.vm_cpu_stats(args.name), "disks": vm_manager.vm_blockstats(args.name)}
+    if args.format == "table":
+        rows = [{"device": f"vCPU {c['cpu_index']}", "cpu_seconds": c["cpu_seconds"]} for c in data["cpus"]]
+        rows += [{"device": d.get("device") or d.get("qdev", "?"), "read_bytes": d["stats"]["rd_bytes"],
+                  "written_bytes": d["stats"]["wr_bytes"]} for d in data["disks"]]
+        emit(args, rows, ["device", "cpu_seconds", "read_bytes", "written_bytes"])
+    else:
+        emit(args, data)
+    return 0
+
+
+def vm_capacity(args):
+    import capacity
+
+    host = capacity.host_capacity()
+    limit = capacity.limits(host)
+    used = capacity.allocated()
+    emit(args, {"kvm": host["kvm"], "ram_total_mb": host["ram_total_mb"], "ram_available_mb": host["ram_available_mb"],
+                "cpu_cores": host["cpu_cores"], "vms": used["vms"], "ram_allocated_mb": used["ram_mb"],
+                "ram_limit_mb": limit["ram_mb"], "cpu_allocated": used["cpu_cores"], "cpu_limit": limit["cpu_cores"]})
+    return 0
+
+
+def vm_bases(args):
+    import vm_manager
+
+    rows = [{"base_image": base, "overlays": len(overlays), "overlay_paths": overlays}
+            for base, overlays in vm_manager.list_base_images().items()]
+    emit(args, rows, ["base_image", "overlays"])
+    return 0
+
+
+def vm_disks(args):
+    import storage_maintenance
+
+    rows = storage_maintenance.image_report()
+    emit(args, rows, ["path", "actual_bytes", "virtual_bytes", "backing", "error"])
+    return _failed(rows)
+
+
+def vm_compact(args):
+    import storage_maintenance
+    from job_scheduler import scheduler
+
+    plain, cold, skipped = storage_maintenance.plan_compaction(args.compress_cold)
+    targets = plain + cold
+    jobs = storage_maintenance.runner.submit(plain)
+    jobs += storage_maintenance.runner.submit(cold, compress=True)
+    log(f"Compacting {len(jobs)} image(s), {storage_maintenance.runner.max_workers} at a time...")
+    scheduler.gather(jobs)
+    rows = [{"path": j["path"], "status": j["status"], "compressed": j["compress"], "before_bytes": j["before"],
+             "after_bytes": j["after"], "error": j["error"]}
+            for j in storage_maintenance.runner.snapshot() if j["path"] in targets]
+    # Images with snapshots are reported but don't fail the run; nothing was wrong with them
+    rows += [{"path": path, "status": "skipped", "compressed": False, "before_bytes": None,
+              "after_bytes": None, "error": reason} for path, reason in skipped.items()]
+    emit(args, rows, ["path", "status", "compressed", "before_bytes", "after_bytes", "error"])
+    return 1 if any(r["status"] not in ("done", "skipped") for r in rows) else 0
+
+
+def vm_snapshot(args):
+    import vm_snapshots
+
+    if args.action == "list":
+        rows = [{"name": s["name"], "live": s.get("vm-state-size", 0) > 0, "date_sec": s.get("date-sec")}
+                for s in vm_snapshots.list_snapshots(args.name)]
+        emit(args, rows, ["name", "live", "date_sec"])
+        return 0
+    tag = args.tag or vm_snapshots.Default_Tag
+    action = {"create": vm_snapshots.create_snapshot, "revert": vm_snapshots.revert_snapshot,
+              "delete": vm_snapshots.delete_snapshot, "reset": vm_snapshots.reset_to_snapshot}[args.action]
+    result = action(args.name, tag)
+    emit(args, {"name": args.name, "action": args.action, "tag": tag, "result": result})
+    return 0
+
+
+# =====================================================
+# DOCKER
+# =====================================================
+def docker_images(args):
+    import docker_manager
+
+    index = docker_manager.get_image_index()
+    if args.search:
+        term = args.search.lower()
+        rows = index.search(term.rstrip("*"), prefix=term.endswith("*"), field="both")
+    else:
+        rows = index.rows(args.sort)
+    emit(args, rows, ["repository", "tag", "short_id", "size", "created"])
+    return 0
+
+
+def docker_containers(args):
+    import docker_manager
+
+    rows = docker_manager.get_container_state().containers(running_only=not args.all)
+    rows.sort(key=lambda c: c["name"])
+    emit(args, rows, ["name", "short_id", "image", "status", "health"])
+    return 0
+
+
+def docker_stats(args):
+    import docker_manager
+
+    collector = docker_manager.get_metrics_collector()
+    # Sampling was just started; let it collect a few samples
+    time.sleep(args.sample)
+    rows = collector.report(args.window)
+    emit(args, rows, ["name", "cpu_avg", "cpu_max", "mem_avg", "mem_max"])
+    return 0
+
+
+def docker_pull(args):
+    import docker_manager
+
+    results = docker_manager.pull_images(args.refs, max_workers=args.workers or docker_manager.Pull_Workers, on_line=log)
+    emit(args, results, ["ref", "status", "seconds", "error"])
+    return _failed(results)
+
+
+def docker_build(args):
+    import os
+    import docker_manager
+    import dockerfile_analyzer
+
+    if not os.path.exists(os.path.join(args.path, args.file)):
+        raise UsageError(f"no {args.file} in {args.path}")
+    buildargs = {}
+    for item in args.build_arg or []:
+        buildargs.update(docker_manager.parse_key_values(item))
+    result = docker_manager.stream_build(args.path, args.tag, buildargs, args.cache_from, on_line=log, dockerfile=args.file)
+    if result["image_id"] and not result["error"]:
+        result["layers"] = dockerfile_analyzer.layer_report(docker_manager.client, result["image_id"])
+    if args.format == "table":
+        for line in docker_manager.build_summary(result):
+            _stdout.write(line + "\n")
+        emit(args, {"image_id": result["image_id"], "tag": result["tag"], "seconds": result["seconds"], "error": result["error"]})
+    else:
+        emit(args, result)
+    return 1 if result["error"] or not result["image_id"] else 0
+
+
+def docker_stop(args):
+    import docker_manager
+
+    import container_ops
+
+    timeout = container_ops.Default_Timeout if args.timeout is None else args.timeout
+    results = []
+    for cid in args.containers:
+        try:
+            docker_manager.client.api.stop(cid, timeout=timeout)
+            results.append({"container": cid, "stopped": True, "error": None})
+        except Exception as e:
+            results.append({"container": cid, "stopped": False, "error": str(e)})
+    emit(args, results, ["container", "stopped", "error"])
+    return _failed(results)
+
+
+def docker_bulk(args):
+    import container_ops
+
+    if not (args.name or args.label or args.image):
+        raise UsageError("give at least one of --name, --label or --image")
+    containers = container_ops.select_containers(args.name, args.label, args.image, include_stopped=(args.action == "remove"))
+    timeout = container_ops.Default_Timeout if args.timeout is None else args.timeout
+    results = container_ops.bulk_action(args.action, containers, timeout=timeout, max_workers=args.workers,
+                                        dry_run=args.dry_run, on_line=log)
+    emit(args, results, ["name", "status", "seconds", "error"])
+    return 1 if any(r["status"] == "failed" for r in results) else 0
+
+
+def docker_gc(args):
+    import docker_gc as gc
+
+    keep = gc.Keep_Tags if args.keep is None else args.keep
+    cache_days = gc.Build_Cache_Days if args.cache_days is None else args.cache_days
+    report = gc.collect_garbage(keep, cache_days, not args.no_dangling, args.dry_run, on_line=log)
+    for usage in (report["before"], report["after"]):
+        usage.pop("cache_entries", None)
+    if args.format == "table":
+        for line in gc.format_gc_report(report):
+            _stdout.write(line + "\n")
+        _stdout.flush()
+    else:
+        emit(args, report)
+    return 1 if report["failed"] else 0
+
+
+def docker_lint(args):
+    import os
+    import dockerfile_analyzer
+
+    path = os.path.join(args.path, "Dockerfile") if os.path.isdir(args.path) else args.path
+    with open(path) as f:
+        findings = dockerfile_analyzer.lint_dockerfile(f.read())
+    emit(args, findings, ["line", "severity", "rule", "message"])
+    return 1 if any(f["severity"] == "error" for f in findings) else 0
+
+
+def docker_context(args):
+    import build_context
+
+    report = build_context.analyze_context(args.path, args.file)
+    if args.write_ignore:
+        report["added_to_dockerignore"] = build_context.write_dockerignore(args.path, [s["pattern"] for s in report["suggestions"]])
+    if args.format == "table":
+        for line in build_context.format_context_report(report):
+            _stdout.write(line + "\n")
+        _stdout.flush()
+    else:
+        emit(args, report)
+    return 0
+
+
+def docker_stack_deploy(args):
+    import docker_stacks
+
+    stack = docker_stacks.load_stack(args.file)
+    log(f"Deploying stack '{stack['name']}' ({len(stack['services'])} service(s))...")
+    results = docker_stacks.deploy_stack(stack, on_line=log)
+    emit(args, results, ["service", "status", "seconds", "error"])
+    return 1 if any(r["status"] != "running" for r in results) else 0
+
+
+def docker_stack_list(args):
+    import docker_stacks
+
+    rows = [{"stack": name, "containers": count} for name, count in sorted(docker_stacks.list_stacks().items())]
+    emit(args, rows, ["stack", "containers"])
+    return 0
+
+
+def docker_stack_remove(args):
+    import docker_stacks
+
+    removed = docker_stacks.teardown_stack(args.name, on_line=log)
+    emit(args, {"stack": args.name, "removed": removed})
+    return 0
+
+
+# =====================================================
+# ARGUMENTS
+# =====================================================
+class UsageError(Exception):
+    """Bad combination of arguments; exits with status 2."""
+
+
+def build_parser():
+    output = argparse.ArgumentParser(add_help=False)
+    group = output.add_mutually_exclusive_group()
+    group.add_argument("--json", dest="format", action="store_const", const="json", help="one JSON document on stdout")
+    group.add_argument("--ndjson", dest="format", action="store_const", const="ndjson", help="one JSON object per line on stdout")
+    output.set_defaults(format="table")
+
+    host = argparse.ArgumentParser(add_help=False)
+    host.add_argument("--host", help="Docker host from docker_hosts.json, or a URL like tcp://10.0.0.5:2375")
+
+    parser = argparse.ArgumentParser(prog="cms", description="Cloud Management System (non-interactive)")
+    areas = parser.add_subparsers(dest="area", required=True)
+
+    def command(sub, name, func, help_text, parents=(output,)):
+        p = sub.add_parser(name, parents=list(parents), help=help_text)
+        p.set_defaults(func=func)
+        return p
+
+    # --- vm ---
+    vm = areas.add_parser("vm", help="QEMU virtual machines").add_subparsers(dest="command", required=True)
+    p = command(vm, "create", vm_create, "create (and launch) one VM or a fleet")
+    p.add_argument("--config", help="JSON file (one VM or a list) or a folder of JSON files")
+    p.add_argument("--name")
+    p.add_argument("--ram", type=int, help="RAM in MB")
+    p.add_argument("--cpu", type=int, help="CPU cores")
+    p.add_argument("--disk", type=int, help="disk size in GB")
+    p.add_argument("--iso")
+    p.add_argument("--base", help="base image to clone")
+    p.add_argument("--headless", action="store_true")
+    p.add_argument("--vnc", help="VNC display for headless VMs, e.g. :1")
+    p.add_argument("--no-launch", action="store_true", help="only create the disks")
+    p.add_argument("--queue", action="store_true", help="wait for capacity instead of deferring VMs that don't fit")
+    command(vm, "list", vm_list, "running VMs")
+    p = command(vm, "inventory", vm_inventory, "every known VM")
+    p.add_argument("--status", choices=["running", "stopped", "created", "discovered", "missing"])
+    p = command(vm, "status", vm_status, "QEMU run state")
+    p.add_argument("name", nargs="?")
+    p = command(vm, "stop", vm_stop, "stop a VM")
+    p.add_argument("name")
+    p.add_argument("--force", action="store_true", help="kill the QEMU process")
+    for action in ("pause", "resume", "shutdown"):
+        p = command(vm, action, vm_control, f"{action} a VM")
+        p.add_argument("name")
+        p.set_defaults(action=action)
+    p = command(vm, "stats", vm_stats, "vCPU time and disk I/O")
+    p.add_argument("name")
+    command(vm, "capacity", vm_capacity, "host resources and allocation")
+    command(vm, "bases", vm_bases, "base images and their overlays")
+    command(vm, "disks", vm_disks, "actual vs. virtual disk sizes")
+    p = command(vm, "compact", vm_compact, "compact idle disk images")
+    p.add_argument("--compress-cold", action="store_true", help="also compress images idle for a long time")
+    p = command(vm, "snapshot", vm_snapshot, "list, create, revert, delete or reset snapshots")
+    p.add_argument("action", choices=["list", "create", "revert", "delete", "reset"])
+    p.add_argument("name")
+    p.add_argument("--tag")
+
+    # --- docker ---
+    dk = areas.add_parser("docker", help="Docker images, containers and stacks").add_subparsers(dest="command", required=True)
+    p = command(dk, "images", docker_images, "local images", parents=(output, host))
+    p.add_argument("--sort", choices=["created", "size", "name"], default="created")
+    p.add_argument("--search", help="name or tag contains this ('pyth*' = starts with)")
+    p = command(dk, "containers", docker_containers, "containers", parents=(output, host))
+    p.add_argument("--all", action="store_true", help="include stopped containers")
+    p = command(dk, "stats", docker_stats, "CPU, memory, network and disk usage", parents=(output, host))
+    p.add_argument("--window", choices=["1m", "5m", "15m"], default="1m")
+    p.add_argument("--sample", type=float, default=3.0, help="seconds to collect samples first")
+    p = command(dk, "pull", docker_pull, "pull images in parallel", parents=(output, host))
+    p.add_argument("refs", nargs="+")
+    p.add_argument("--workers", type=int, help="parallel pulls")
+    p = command(dk, "build", docker_build, "build an image", parents=(output, host))
+    p.add_argument("path")
+    p.add_argument("--tag", "-t", required=True)
+    p.add_argument("--file", "-f", default="Dockerfile")
+    p.add_argument("--build-arg", action="append", help="KEY=VALUE (repeatable)")
+    p.add_argument("--cache-from", action="append", help="image to use as cache (repeatable)")
+    p = command(dk, "stop", docker_stop, "stop containers", parents=(output, host))
+    p.add_argument("containers", nargs="+")
+    p.add_argument("--timeout", type=int, help="grace period in seconds")
+    p = command(dk, "bulk", docker_bulk, "stop, kill, restart or remove matching containers", parents=(output, host))
+    p.add_argument("action", choices=["stop", "kill", "restart", "remove"])
+    p.add_argument("--name", help="name glob, e.g. web-*")
+    p.add_argument("--label", help="key or key=value")
+    p.add_argument("--image", help="e.g. redis, myapp:*")
+    p.add_argument("--timeout", type=int, help="grace period in seconds")
+    p.add_argument("--workers", type=int, help="containers at a time (default and most: all the connection pool allows)")
+    p.add_argument("--dry-run", action="store_true")
+    p = command(dk, "gc", docker_gc, "remove old tags, dangling images and stale build cache", parents=(output, host))
+    p.add_argument("--keep", type=int, help="tags kept per repository")
+    p.add_argument("--cache-days", type=int, help="prune build cache unused for this many days")
+    p.add_argument("--no-dangling", action="store_true")
+    p.add_argument("--dry-run", action="store_true")
+    p = command(dk, "lint", docker_lint, "check a Dockerfile")
+    p.add_argument("path", help="Dockerfile or the folder holding it")
+    p = command(dk, "context", docker_context, "analyze a build context")
+    p.add_argument("path")
+    p.add_argument("--file", "-f", default="Dockerfile")
+    p.add_argument("--write-ignore", action="store_true", help="append the suggestions to .dockerignore")
+    stack = dk.add_parser("stack", help="multi-container stacks").add_subparsers(dest="stack_command", required=True)
+    p = command(stack, "deploy", docker_stack_deploy, "deploy a stack file", parents=(output, host))
+    p.add_argument("file")
+    command(stack, "ls", docker_stack_list, "deployed stacks", parents=(output, host))
+    p = command(stack, "rm", docker_stack_remove, "tear down a stack", parents=(output, host))
+    p.add_argument("name")
+    return parser
+
+
+def use_host(host):
+    """Makes a host from docker_hosts.json, or a URL given on the command line, the active one."""
+    import docker_hosts
+
+    if "://" in host:
+        docker_hosts.hosts.add(host, host, save=False)
+    docker_hosts.hosts.set_active(host)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    # Managers print as they work; keep that off stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            if getattr(args, "host", None):
+                use_host(args.host)
+            return args.func(args)
+        except UsageError as e:
+            parser.error(str(e))
+        except KeyboardInterrupt:
+            log("Interrupted.")
+            return 130
+        except Exception as e:
+            # str() of a KeyError quotes its message
+            message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+            if args.format == "table":
+                log(f"Error: {message}")
+            else:
+                emit(args, {"error": message, "type": type(e).__name__})
+            return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
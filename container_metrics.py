@@ -0,0 +1,250 @@
+import time
+import queue
+import threading
+from collections import deque
+from docker.errors import NotFound
+
+# Seconds between two samples of one container
+Poll_Interval = 2
+
+# Holds 15 minutes of samples
+History_Samples = 15 * 60 // Poll_Interval
+
+# History windows in seconds
+Windows = {"1m": 60, "5m": 300, "15m": 900}
+
+# At most this many stats requests are in flight at once
+Metrics_Workers = 32
+
+
+def parse_sample(raw):
+    """
+    Turns one /containers/{id}/stats sample into a tuple of
+    (time, cpu %, memory bytes, memory limit, net rx, net tx, block read, block write).
+    Network and block I/O are cumulative byte counters.
+    """
+    cpu, precpu = raw.get("cpu_stats", {}), raw.get("precpu_stats", {})
+    cpu_delta = cpu.get("cpu_usage", {}).get("total_usage", 0) - precpu.get("cpu_usage", {}).get("total_usage", 0)
+    system_delta = cpu.get("system_cpu_usage", 0) - precpu.get("system_cpu_usage", 0)
+    online = cpu.get("online_cpus") or len(cpu.get("cpu_usage", {}).get("percpu_usage") or []) or 1
+    cpu_pct = cpu_delta / system_delta * online * 100 if cpu_delta > 0 and system_delta > 0 else 0.0
+
+    mem = raw.get("memory_stats", {})
+    stats = mem.get("stats", {})
+    # Page cache is reclaimable, so leave it out like 'docker stats' does (cgroup v1 / v2)
+    cache = stats.get("total_inactive_file", stats.get("inactive_file", 0))
+    mem_used = max(mem.get("usage", 0) - cache, 0)
+
+    rx = tx = 0
+    for net in (raw.get("networks") or {}).values():
+        rx += net.get("rx_bytes", 0)
+        tx += net.get("tx_bytes", 0)
+
+    read = write = 0
+    for entry in (raw.get("blkio_stats", {}).get("io_service_bytes_recursive") or []):
+        op = entry.get("op", "").lower()
+        if op == "read":
+            read += entry.get("value", 0)
+        elif op == "write":
+            write += entry.get("value", 0)
+
+    return (time.time(), cpu_pct, mem_used, mem.get("limit", 0), rx, tx, read, write)
+
+
+class MetricsCollector:
+    """
+    Samples stats for every running container every Poll_Interval seconds
+    and keeps them in a fixed-size ring buffer per container. A container's
+    history is dropped when it stops, so memory stays bounded by the number
+    of running containers. Each sample is one stats request on a bounded
+    pool of workers, so however many containers run, each gets its turn;
+    on a busy host the samples just come further apart. The workers are
+    daemon threads so a slow request never keeps the program alive.
+    """
+
+    def __init__(self, client, max_workers=Metrics_Workers, history=History_Samples, interval=Poll_Interval):
+        self.client = client
+        self.max_workers = max_workers
+        self.history = history
+        self.interval = interval
+        self._queue = queue.Queue()
+        self._workers = []
+        self._ticker = None
+        self._lock = threading.Lock()
+        self._samples = {}   # container id -> deque of parse_sample() tuples
+        self._names = {}     # container id -> name
+        self._pending = set()  # container ids with a request queued or in flight
+        self._stopped = threading.Event()
+
+    def track(self, container_id, name=None):
+        """Starts sampling a container's stats. Does nothing if it is already tracked."""
+        with self._lock:
+            if container_id in self._samples or self._stopped.is_set():
+                return
+            self._samples[container_id] = deque(maxlen=self.history)
+            self._names[container_id] = name or container_id[:12]
+            # Grow the pool only as far as there are containers to sample
+            if len(self._workers) < min(self.max_workers, len(self._samples)):
+                worker = threading.Thread(target=self._work, name=f"container-stats-{len(self._workers)}", daemon=True)
+                self._workers.append(worker)
+                worker.start()
+            if self._ticker is None:
+                self._ticker = threading.Thread(target=self._tick, name="container-stats-ticker", daemon=True)
+                self._ticker.start()
+        self._schedule(container_id)
+
+    def untrack(self, container_id):
+        with self._lock:
+            self._samples.pop(container_id, None)
+            self._names.pop(container_id, None)
+
+    def sync(self, running):
+        """Tracks exactly the given running containers (dicts with 'id' and 'name')."""
+        wanted = {c["id"]: c["name"] for c in running}
+        with self._lock:
+            stale = [cid for cid in self._samples if cid not in wanted]
+        for container_id in stale:
+            self.untrack(container_id)
+        for container_id, name in wanted.items():
+            self.track(container_id, name)
+
+    def stop(self):
+        """Stops sampling and drops all history; the worker threads exit."""
+        with self._lock:
+            self._stopped.set()
+            self._samples.clear()
+            self._names.clear()
+            workers = len(self._workers)
+        for _ in range(workers):
+            self._queue.put(None)
+
+    def _schedule(self, container_id):
+        # A container whose last request hasn't finished is not queued again
+        with self._lock:
+            if container_id not in self._samples or container_id in self._pending:
+                return
+            self._pending.add(container_id)
+        self._queue.put(container_id)
+
+    def _tick(self):
+        while not self._stopped.wait(self.interval):
+            with self._lock:
+                tracked = list(self._samples)
+            for container_id in tracked:
+                self._schedule(container_id)
+
+    def _work(self):
+        while True:
+            container_id = self._queue.get()
+            if container_id is None:
+                return
+            try:
+                self._sample(container_id)
+            finally:
+                with self._lock:
+                    self._pending.discard(container_id)
+
+    def _sample(self, container_id):
+        with self._lock:
+            if container_id not in self._samples:
+                return
+        try:
+            # One sample with precpu_stats filled in, so CPU % can be worked out
+            raw = self.client.api.stats(container_id, stream=False)
+        except NotFound:
+            # The container is gone: drop it entirely
+            self.untrack(container_id)
+            return
+        except Exception:
+            # Try again on the next tick
+            return
+        sample = parse_sample(raw)
+        with self._lock:
+            samples = self._samples.get(container_id)
+            if samples is not None:
+                samples.append(sample)
+
+    def handle_event(self, event):
+        """Starts and stops sampling as containers come and go; subscribe this to 'container' events."""
+        action = event.get("Action") or event.get("status") or ""
+        actor = event.get("Actor", {})
+        container_id = actor.get("ID") or event.get("id")
+        if not container_id:
+            return
+        if action in ("start", "unpause"):
+            self.track(container_id, actor.get("Attributes", {}).get("name"))
+        elif action in ("die", "destroy"):
+            self.untrack(container_id)
+        elif action == "rename":
+            with self._lock:
+                if container_id in self._names:
+                    self._names[container_id] = actor.get("Attributes", {}).get("name", self._names[container_id])
+
+    def current(self, container_id):
+        """The latest sample as a dict, or None if there is none yet."""
+        with self._lock:
+            samples = self._samples.get(container_id)
+            if not samples:
+                return None
+            t, cpu, mem, limit, rx, tx, read, write = samples[-1]
+        return {"time": t, "cpu_pct": cpu, "mem_bytes": mem, "mem_limit": limit,
+                "net_rx_bytes": rx, "net_tx_bytes": tx, "blk_read_bytes": read, "blk_write_bytes": write}
+
+    def summary(self, container_id, window="1m"):
+        """
+        Averages and peaks over a window ("1m", "5m" or "15m"). I/O is
+        returned as bytes per second over the window.
+        """
+        cutoff = time.time() - Windows[window]
+        with self._lock:
+            samples = [s for s in self._samples.get(container_id, ()) if s[0] >= cutoff]
+        if not samples:
+            return None
+        first, last = samples[0], samples[-1]
+        elapsed = last[0] - first[0]
+
+        def rate(i):
+            return max(last[i] - first[i], 0) / elapsed if elapsed > 0 else 0.0
+
+        return {
+            "samples": len(samples),
+            "cpu_avg": sum(s[1] for s in samples) / len(samples),
+            "cpu_max": max(s[1] for s in samples),
+            "mem_avg": sum(s[2] for s in samples) / len(samples),
+            "mem_max": max(s[2] for s in samples),
+            "mem_limit": last[3],
+            "net_rx_rate": rate(4),
+            "net_tx_rate": rate(5),
+            "blk_read_rate": rate(6),
+            "blk_write_rate": rate(7),
+        }
+
+    def report(self, window="1m"):
+        """One summary per tracked container, busiest CPU first."""
+        with self._lock:
+            tracked = list(self._names.items())
+        rows = []
+        for container_id, name in tracked:
+            summary = self.summary(container_id, window)
+            if summary:
+                rows.append({"id": container_id, "name": name, **summary})
+        rows.sort(key=lambda r: r["cpu_avg"], reverse=True)
+        return rows
+
+    def tracked(self):
+        with self._lock:
+            return len(self._samples)
+
+
+def format_metrics_rows(rows, window="1m"):
+    """Formats MetricsCollector.report() rows as a table."""
+    mb = 1024 * 1024
+    output = [f"Resource usage over the last {window}"]
+    output.append(f"{'NAME':<20} {'CPU % (avg/max)':<17} {'MEM MB (avg/max)':<18} {'NET KB/s (rx/tx)':<18} {'BLK KB/s (r/w)':<16}")
+    output.append("-" * 92)
+    for r in rows:
+        output.append(
+            f"{r['name'][:20]:<20} {r['cpu_avg']:>6.1f} / {r['cpu_max']:<6.1f}  {r['mem_avg'] / mb:>7.1f} / {r['mem_max'] / mb:<7.1f}  "
+            f"{r['net_rx_rate'] / 1024:>7.1f} / {r['net_tx_rate'] / 1024:<7.1f}  {r['blk_read_rate'] / 1024:>6.1f} / {r['blk_write_rate'] / 1024:<6.1f}"
+        )
+    return output
@@ -0,0 +1,158 @@
+import time
+from fnmatch import fnmatchcase
+from concurrent.futures import ThreadPoolExecutor
+import docker
+import docker_manager
+import docker_hosts
+from container_metrics import Metrics_Workers
+from job_scheduler import current_job, scheduler
+
+# Most calls one batch keeps in flight: the shared client's pool minus the
+# connections kept for the metrics workers and the events stream. More
+# would only open connections the pool then throws away.
+Bulk_Workers = docker_hosts.Pool_Size - Metrics_Workers - 1
+
+# Seconds a container gets to stop before it is killed
+Default_Timeout = 10
+
+Actions = ("stop", "kill", "restart", "remove")
+
+
+def _label_matches(labels, selector):
+    key, sep, value = selector.partition("=")
+    if key not in labels:
+        return False
+    return not sep or labels[key] == value
+
+
+def _image_matches(image, pattern):
+    # 'nginx' should match 'nginx:latest' and 'nginx:1.27' as well
+    return fnmatchcase(image, pattern) or fnmatchcase(image.rsplit(":", 1)[0], pattern)
+
+
+def select_containers(name=None, label=None, image=None, include_stopped=False, host=None):
+    """
+    Selects containers from the event-fed model, so selecting does not
+    call the daemon. Every given filter must match:
+    name is a glob ('web-*'), label is 'key' or 'key=value' and image is
+    a glob on the image name ('redis', 'myapp:*').
+    """
+    selected = []
+    for c in docker_manager.get_container_state(host).containers(running_only=not include_stopped):
+        if name and not fnmatchcase(c["name"], name):
+            continue
+        if label and not _label_matches(c["labels"], label):
+            continue
+        if image and not _image_matches(c["image"], image):
+            continue
+        selected.append(c)
+    return sorted(selected, key=lambda c: c["name"])
+
+
+def _apply(action, container, timeout, api):
+    if action == "stop":
+        api.stop(container["id"], timeout=timeout)
+    elif action == "kill":
+        api.kill(container["id"])
+    elif action == "restart":
+        api.restart(container["id"], timeout=timeout)
+    elif action == "remove":
+        # force stops a running container with SIGKILL first
+        api.remove_container(container["id"], force=True)
+
+
+def bulk_action(action, containers, timeout=Default_Timeout, max_workers=None, dry_run=False, on_line=print, host=None):
+    """
+    Runs stop, kill, restart or remove on many containers at once: one call
+    per container, up to max_workers (default and most: Bulk_Workers) at a
+    time. Containers that ignore SIGTERM each use up their grace period, so
+    a batch of n of them takes about n / max_workers grace periods at worst.
+    With dry_run=True nothing is changed; the selection is just listed.
+    'host' is the Docker host the containers were selected from.
+    Returns one result per container.
+    """
+    if action not in Actions:
+        raise ValueError(f"Unknown action '{action}' (use {', '.join(Actions)})")
+    if dry_run:
+        for c in containers:
+            on_line(f"[dry run] would {action} {c['name']} ({c['short_id']}, {c['image']}, {c['status']})")
+        return [{"name": c["name"], "id": c["id"], "status": "dry run", "seconds": 0.0, "error": None} for c in containers]
+
+    api = docker_manager.get_client(host).api
+    job = current_job()
+
+    def run(container):
+        started = time.perf_counter()
+        result = {"name": container["name"], "id": container["id"], "status": "done", "seconds": 0.0, "error": None}
+        if job is not None and job.cancel_requested():
+            # Containers not reached yet are left alone once the job is cancelled
+            result["status"] = "cancelled"
+            return result
+        try:
+            _apply(action, container, timeout, api)
+        except docker.errors.NotFound:
+            result["status"] = "gone"
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+        result["seconds"] = time.perf_counter() - started
+        on_line(f"[{container['name']}] {action}: {result['status']}" + (f" ({result['error']})" if result["error"] else ""))
+        return result
+
+    if not containers:
+        return []
+    workers = min(max_workers or Bulk_Workers, Bulk_Workers, len(containers))
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(run, containers))
+
+
+def bulk_summary(action, results, seconds):
+    failed = [r for r in results if r["status"] == "failed"]
+    cancelled = [r for r in results if r["status"] == "cancelled"]
+    return f"{action}: {len(results) - len(failed) - len(cancelled)}/{len(results)} container(s) in {seconds:.1f}s" + (
+        f", {len(failed)} failed" if failed else "") + (f", {len(cancelled)} cancelled" if cancelled else "")
+
+
+def bulk_containers_interactive():
+    """Selects containers by name glob, label or image and acts on all of them."""
+    print("\n--- Bulk Container Operations ---")
+    print("Leave a filter empty to skip it.")
+    name = input("Name glob (e.g. web-*): ").strip() or None
+    label = input("Label (key or key=value): ").strip() or None
+    image = input("Image (e.g. redis, myapp:*): ").strip() or None
+    if not (name or label or image):
+        print("Error: Give at least one filter.")
+        return
+    action = input(f"Action ({'/'.join(Actions)}): ").strip().lower()
+    if action not in Actions:
+        print(f"Error: Action must be one of {', '.join(Actions)}.")
+        return
+    timeout = Default_Timeout
+    if action in ("stop", "restart"):
+        try:
+            timeout = int(input(f"Grace period in seconds (default {Default_Timeout}): ").strip() or Default_Timeout)
+        except ValueError:
+            print("Error: The grace period must be a number.")
+            return
+    try:
+        workers = int(input(f"Containers at a time (default and most {Bulk_Workers}): ").strip() or Bulk_Workers)
+    except ValueError:
+        print("Error: The number of containers at a time must be a number.")
+        return
+
+    try:
+        # Removing also covers stopped containers
+        containers = select_containers(name, label, image, include_stopped=(action == "remove"))
+        if not containers:
+            print("No containers match.")
+            return
+        bulk_action(action, containers, dry_run=True)
+        if input(f"{action.capitalize()} these {len(containers)} container(s)? (y/n): ").lower() != 'y':
+            print("Cancelled.")
+            return
+        started = time.perf_counter()
+        results = scheduler.run(f"Bulk {action}", bulk_action, action, containers, timeout=timeout, max_workers=workers,
+                                resource="docker")
+        print(bulk_summary(action, results, time.perf_counter() - started))
+    except Exception as e:
+        print(f"Error: {e}")
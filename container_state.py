@@ -0,0 +1,119 @@
+import threading
+
+# Container event -> status it leaves the container in
+Status_By_Action = {
+    "create": "created",
+    "start": "running",
+    "restart": "running",
+    "unpause": "running",
+    "pause": "paused",
+    "die": "exited",
+    "stop": "exited",
+}
+
+# Event attributes that are not container labels
+Non_Label_Attributes = {"name", "image", "exitCode", "signal", "oldName", "execID", "container"}
+
+
+class ContainerState:
+    """
+    Live model of every container (running or not), loaded once and then
+    updated from the Docker events stream. Event attributes carry the name,
+    image and labels, so no per-container API calls are needed.
+    Rendered tables are cached until the next change.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._containers = {}  # full id -> record
+        self._version = 0
+        self._rendered = {}    # running_only -> (version, lines)
+        self.loaded = False
+
+    def load(self):
+        """(Re)loads all containers with a single /containers/json call."""
+        containers = {}
+        for raw in self.client.api.containers(all=True):
+            containers[raw["Id"]] = {
+                "id": raw["Id"],
+                "short_id": raw["Id"][:12],
+                "name": raw["Names"][0].lstrip("/") if raw.get("Names") else raw["Id"][:12],
+                "image": raw.get("Image", ""),
+                "status": raw.get("State", ""),
+                "health": None,
+                "labels": raw.get("Labels") or {},
+                "created": raw.get("Created", 0),
+            }
+        with self._lock:
+            self._containers = containers
+            self._version += 1
+            self.loaded = True
+
+    def handle_event(self, event):
+        """Keeps the model current; subscribe this to 'container' events."""
+        action = event.get("Action") or event.get("status") or ""
+        actor = event.get("Actor", {})
+        container_id = actor.get("ID") or event.get("id")
+        attrs = actor.get("Attributes", {})
+        if not container_id:
+            return
+
+        with self._lock:
+            if action == "destroy":
+                self._containers.pop(container_id, None)
+            else:
+                record = self._containers.get(container_id)
+                before = self._fields(record) if record is not None else None
+                if record is None:
+                    record = {"id": container_id, "short_id": container_id[:12], "name": attrs.get("name", container_id[:12]),
+                              "image": attrs.get("image", ""), "status": "created", "health": None,
+                              "labels": {}, "created": event.get("time", 0)}
+                    self._containers[container_id] = record
+                if "name" in attrs:
+                    record["name"] = attrs["name"]
+                if "image" in attrs:
+                    record["image"] = attrs["image"]
+                # Labels come in as plain attributes next to name and image
+                record["labels"].update({k: v for k, v in attrs.items() if k not in Non_Label_Attributes})
+                if action in Status_By_Action:
+                    record["status"] = Status_By_Action[action]
+                elif action.startswith("health_status"):
+                    record["health"] = action.split(":", 1)[1].strip()
+                if self._fields(record) == before:
+                    # Nothing changed (exec_*, attach, kill, ...), so cached tables stay valid
+                    return
+            self._version += 1
+
+    @staticmethod
+    def _fields(record):
+        return (record["name"], record["image"], record["status"], record["health"], dict(record["labels"]))
+
+    def containers(self, running_only=False):
+        with self._lock:
+            return [dict(c) for c in self._containers.values()
+                    if not running_only or c["status"] == "running"]
+
+    def get(self, id_or_name):
+        """Finds a container by name, full ID or ID prefix."""
+        with self._lock:
+            for c in self._containers.values():
+                if c["name"] == id_or_name or c["id"].startswith(id_or_name):
+                    return dict(c)
+        return None
+
+    def render(self, running_only=True):
+        """Table lines for the CLI/GUI. Reused as-is until something changes."""
+        with self._lock:
+            cached = self._rendered.get(running_only)
+            if cached and cached[0] == self._version:
+                return cached[1]
+            lines = [f"{'ID':<12} {'NAME':<20} {'IMAGE':<20} {'STATUS':<15}", "-" * 70]
+            for c in sorted(self._containers.values(), key=lambda c: c["name"]):
+                if running_only and c["status"] != "running":
+                    continue
+                image = c["image"] if len(c["image"]) <= 18 else c["image"][:15] + "..."
+                status = f"{c['status']} ({c['health']})" if c["health"] else c["status"]
+                lines.append(f"{c['short_id']:<12} {c['name']:<20} {image:<20} {status:<15}")
+            self._rendered[running_only] = (self._version, lines)
+            return lines
@@ -0,0 +1,82 @@
+import threading
+
+
+class EventStream:
+    """
+    Reads the Docker events stream on one background thread and hands each
+    event to the handlers subscribed to its type ("image", "container", ...).
+    If the stream breaks (e.g. the daemon restarts) it reconnects, replays
+    what it missed with 'since', and tells on_reconnect handlers to resync.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._handlers = {}
+        self._reconnect_handlers = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._stream = None
+        self._last_time = None
+
+    def subscribe(self, event_type, handler):
+        with self._lock:
+            self._handlers.setdefault(event_type, []).append(handler)
+
+    def unsubscribe(self, event_type, handler):
+        with self._lock:
+            handlers = self._handlers.get(event_type, [])
+            if handler in handlers:
+                handlers.remove(handler)
+
+    def on_reconnect(self, handler):
+        with self._lock:
+            self._reconnect_handlers.append(handler)
+
+    def remove_reconnect(self, handler):
+        with self._lock:
+            if handler in self._reconnect_handlers:
+                self._reconnect_handlers.remove(handler)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="docker-events", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._stream is not None:
+            self._stream.close()
+
+    def _dispatch(self, event):
+        with self._lock:
+            handlers = list(self._handlers.get(event.get("Type"), ()))
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                print(f"Docker event handler error: {e}")
+
+    def _run(self):
+        delay = 1
+        first = True
+        while not self._stopped.is_set():
+            try:
+                self._stream = self.client.events(decode=True, since=self._last_time)
+                if not first:
+                    with self._lock:
+                        handlers = list(self._reconnect_handlers)
+                    for handler in handlers:
+                        handler()
+                first = False
+                delay = 1
+                for event in self._stream:
+                    self._last_time = event.get("time", self._last_time)
+                    self._dispatch(event)
+            except Exception:
+                if self._stopped.is_set():
+                    break
+            # Stream ended or failed: back off and reconnect
+            self._stopped.wait(delay)
+            delay = min(delay * 2, 30)
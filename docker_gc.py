@@ -0,0 +1,204 @@
+import os
+import time
+import fcntl
+from contextlib import contextmanager
+from datetime import datetime
+import docker
+import docker_manager
+import docker_hosts
+from image_index import created_epoch
+from job_scheduler import scheduler
+
+# Tags kept per repository, newest first
+Keep_Tags = 3
+
+# Build cache not used for this many days is pruned
+Build_Cache_Days = 7
+
+# Seconds one removal, prune or disk usage call may take; on hosts with
+# a big build cache these are much slower than ordinary API calls
+GC_Call_Timeout = 600
+
+# Held while a collection runs, so scheduled runs never overlap
+Lock_File = os.path.join(docker_manager.Docker_Projects_Main, ".docker_gc.lock")
+
+
+class GCError(Exception):
+    """Raised when a collection cannot run (e.g. another one holds the lock)."""
+
+
+@contextmanager
+def gc_lock(path=Lock_File):
+    """Non-blocking exclusive lock; the OS drops it if the process dies."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise GCError("Another garbage collection is already running")
+        try:
+            f.write(str(os.getpid()))
+            f.flush()
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def disk_usage(host=None):
+    """Bytes used by images and by the build cache, from one /system/df call."""
+    df = docker_manager.get_client(host).api.df()
+    return {
+        "images": df.get("LayersSize", 0),
+        "build_cache": sum(entry.get("Size", 0) for entry in (df.get("BuildCache") or [])),
+        "cache_entries": df.get("BuildCache") or [],
+    }
+
+
+def images_in_use(host=None):
+    """IDs of images used by any container, running or stopped."""
+    return {raw["ImageID"] for raw in docker_manager.get_client(host).api.containers(all=True) if raw.get("ImageID")}
+
+
+def plan_collection(keep=Keep_Tags, dangling=True, host=None):
+    """
+    Decides what to delete without deleting anything:
+    tags beyond the 'keep' newest per repository, plus dangling
+    (untagged) images. Images used by any container are never picked.
+    Returns a list of {"ref", "id", "size", "reason"} and the skipped ones.
+    """
+    rows = docker_manager.get_image_index(host).rows("created")
+    used = images_in_use(host)
+    removals, skipped = [], []
+
+    by_repo = {}
+    for row in rows:
+        by_repo.setdefault(row["repository"], []).append(row)
+
+    for repo, repo_rows in sorted(by_repo.items()):
+        if repo == "<none>":
+            if not dangling:
+                continue
+            candidates = [(row, row["id"], "dangling") for row in repo_rows]
+        else:
+            # rows() is newest first, so everything after 'keep' is older
+            candidates = [(row, f"{repo}:{row['tag']}", f"older than the {keep} newest tag(s)") for row in repo_rows[keep:]]
+        for row, ref, reason in candidates:
+            entry = {"ref": ref, "id": row["id"], "size": row["size"], "reason": reason}
+            (skipped if row["id"] in used else removals).append(entry)
+
+    # An image only frees space once every tag pointing at it is gone
+    refs_by_id = {}
+    for row in rows:
+        refs_by_id.setdefault(row["id"], set()).add(row["id"] if row["repository"] == "<none>" else f"{row['repository']}:{row['tag']}")
+    removed_refs = {e["ref"] for e in removals}
+    counted = set()
+    for e in removals:
+        frees = refs_by_id.get(e["id"], set()) <= removed_refs and e["id"] not in counted
+        counted.add(e["id"])
+        e["frees"] = e["size"] if frees else 0
+    return removals, skipped
+
+
+def stale_cache_bytes(cache_entries, days=Build_Cache_Days):
+    """Estimated size of build cache not used for 'days' days (for dry runs)."""
+    cutoff = time.time() - days * 86400
+    total = 0
+    for entry in cache_entries:
+        last_used = entry.get("LastUsedAt") or entry.get("CreatedAt")
+        if entry.get("InUse") or entry.get("Shared"):
+            continue
+        if not last_used or created_epoch(last_used) < cutoff:
+            total += entry.get("Size", 0)
+    return total
+
+
+def collect_garbage(keep=Keep_Tags, cache_days=Build_Cache_Days, dangling=True, dry_run=False, on_line=print, host=None):
+    """
+    Runs one collection under the lock and returns a report with disk
+    usage before and after. Images are removed one at a time without
+    force, so an image that got a container since planning is refused
+    by the daemon and reported as skipped.
+    """
+    # Every call goes to the host the collection started on, even if the active one changes
+    host = host or docker_hosts.hosts.active
+    client = docker_manager.get_client(host)
+    with gc_lock(), docker_hosts.call_timeout(GC_Call_Timeout):
+        before = disk_usage(host)
+        removals, skipped = plan_collection(keep, dangling, host)
+        report = {"dry_run": dry_run, "before": before, "after": None, "removed": [], "skipped": skipped,
+                  "failed": [], "cache_reclaimed": 0}
+
+        for e in skipped:
+            on_line(f"Skipping {e['ref']}: in use by a container")
+        for e in removals:
+            if dry_run:
+                on_line(f"[dry run] would remove {e['ref']} ({e['reason']})")
+                report["removed"].append(e)
+                continue
+            try:
+                client.api.remove_image(e["ref"])
+                on_line(f"Removed {e['ref']} ({e['reason']})")
+                report["removed"].append(e)
+            except docker.errors.NotFound:
+                pass
+            except docker.errors.APIError as err:
+                # 409: a container started using it since we planned
+                target = report["skipped"] if err.status_code == 409 else report["failed"]
+                target.append({**e, "error": str(err.explanation or err)})
+                on_line(f"Could not remove {e['ref']}: {err.explanation or err}")
+
+        if cache_days is not None:
+            if dry_run:
+                report["cache_reclaimed"] = stale_cache_bytes(before["cache_entries"], cache_days)
+                on_line(f"[dry run] would prune build cache unused for {cache_days}+ day(s)")
+            else:
+                # all=True: every unused entry past the cutoff, not just dangling ones,
+                # which is what stale_cache_bytes() estimates for the dry run
+                result = client.api.prune_builds(filters={"until": f"{cache_days * 24}h"}, all=True)
+                report["cache_reclaimed"] = result.get("SpaceReclaimed", 0) or 0
+
+        report["after"] = before if dry_run else disk_usage(host)
+    return report
+
+
+def format_gc_report(report):
+    def size(n):
+        return f"{n / (1024 * 1024):.1f} MB"
+
+    before, after = report["before"], report["after"]
+    freed = sum(e["frees"] for e in report["removed"])
+    prefix = "Would free" if report["dry_run"] else "Freed"
+    lines = [
+        f"{'':<14} {'IMAGES':<14} {'BUILD CACHE':<14}",
+        f"{'Before':<14} {size(before['images']):<14} {size(before['build_cache']):<14}",
+    ]
+    if not report["dry_run"]:
+        lines.append(f"{'After':<14} {size(after['images']):<14} {size(after['build_cache']):<14}")
+    lines.append(f"{prefix} {size(freed)} from {len(report['removed'])} image reference(s) "
+                 f"and {size(report['cache_reclaimed'])} of build cache.")
+    if report["skipped"]:
+        lines.append(f"Skipped {len(report['skipped'])} image(s) in use by containers.")
+    if report["failed"]:
+        lines.append(f"{len(report['failed'])} removal(s) failed.")
+    return lines
+
+
+def collect_garbage_interactive():
+    print("\n--- Docker Garbage Collection ---")
+    try:
+        keep = int(input(f"Tags to keep per repository (default {Keep_Tags}): ").strip() or Keep_Tags)
+        cache_days = int(input(f"Prune build cache unused for how many days (default {Build_Cache_Days}): ").strip() or Build_Cache_Days)
+    except ValueError:
+        print("Error: Please enter numbers.")
+        return
+    dangling = input("Delete dangling images? (y/n, default y): ").strip().lower() != 'n'
+    dry_run = input("Dry run only? (y/n, default y): ").strip().lower() != 'n'
+    try:
+        report = scheduler.run("Garbage collection" + (" (dry run)" if dry_run else ""), collect_garbage,
+                               keep, cache_days, dangling, dry_run, resource="docker")
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    print(f"\n--- Report ({datetime.now():%Y-%m-%d %H:%M}) ---")
+    for line in format_gc_report(report):
+        print(line)
@@ -0,0 +1,214 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+import docker
+from docker.tls import TLSConfig
+from urllib3.exceptions import ProtocolError
+from urllib3.util.retry import Retry
+import job_scheduler
+from container_metrics import Metrics_Workers
+
+# Extra Docker hosts, e.g. {"build-box": "tcp://10.0.0.5:2375"} or
+# {"node1": {"url": "tcp://10.0.0.6:2376", "tls": true, "cert_path": "~/.docker/node1"}}
+Hosts_File = "docker_hosts.json"
+
+# The daemon named by DOCKER_HOST, or the local socket
+Local_Host = "local"
+
+# Seconds the first request (the API version check) may take; a dead or
+# slow host fails fast instead of hanging whoever touched Docker first
+Connect_Timeout = 5
+
+# Seconds an ordinary API call may take (docker-py's default)
+API_Timeout = 60
+
+# HTTP connections kept open per host: every job worker may be calling the
+# API at once, plus every metrics worker's stats request and the events stream
+Pool_Size = job_scheduler.Job_Workers + Metrics_Workers + 1
+
+# While a daemon restarts it refuses connections (or its unix socket is missing);
+# retry for about 7.5s (0.5, 1, 2, 4s apart) before failing, on every kind of
+# host. Requests already sent are never retried.
+Reconnect_Attempts = 4
+Reconnect_Backoff = 0.5
+
+_local = threading.local()
+
+
+class _APIClient(docker.APIClient):
+    """APIClient whose default timeout can be changed per thread with call_timeout()."""
+
+    def _set_request_timeout(self, kwargs):
+        override = getattr(_local, "timeout", None)
+        if override is not None:
+            kwargs.setdefault("timeout", override)
+        return super()._set_request_timeout(kwargs)
+
+
+class _DockerClient(docker.DockerClient):
+    def __init__(self, **kwargs):
+        self.api = _APIClient(**kwargs)
+
+
+@contextmanager
+def call_timeout(seconds):
+    """API calls made on this thread inside the block may take up to 'seconds'."""
+    previous = getattr(_local, "timeout", None)
+    _local.timeout = seconds
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+
+class _ReconnectRetry(Retry):
+    """Retry that also counts a refused or missing unix socket as a connect error."""
+
+    def _is_connection_error(self, err):
+        # urllib3 only knows tcp connect failures; a unix socket's connect() raises a
+        # bare OSError, which it wraps in ProtocolError as if the request had been sent
+        if isinstance(err, ProtocolError) and len(err.args) > 1:
+            if isinstance(err.args[1], (ConnectionRefusedError, FileNotFoundError)):
+                return True
+        return super()._is_connection_error(err)
+
+
+def _tune_adapters(api):
+    """Sizes every connection pool of a client to Pool_Size and retries refused connections."""
+    # read=False re-raises read errors as they are, so timeouts still surface as requests' Timeout
+    retries = _ReconnectRetry(total=None, connect=Reconnect_Attempts, read=False, redirect=0, status=0, other=0,
+                              backoff_factor=Reconnect_Backoff)
+    for adapter in set(api.adapters.values()):
+        if not hasattr(adapter, "pools"):
+            # requests' own adapters (tcp:// and TLS) ignore max_pool_size; docker's
+            # unix/ssh adapters already got it
+            adapter.init_poolmanager(Pool_Size, Pool_Size)
+        adapter.max_retries = retries
+
+
+class HostRegistry:
+    """
+    The Docker hosts the tools can manage, and one shared client per host,
+    connected on first use. One host is active; the CLI, the GUI and the
+    job workers all use its client unless they name another host.
+    """
+
+    def __init__(self, hosts_file=Hosts_File):
+        self.hosts_file = hosts_file
+        self._lock = threading.Lock()
+        self._hosts = None       # name -> {"url", "tls", "cert_path"}, read on first use
+        self._clients = {}       # name -> DockerClient
+        self._drop_handlers = []
+        self.active = Local_Host
+
+    def _settings(self):
+        # Caller holds the lock
+        if self._hosts is None:
+            hosts = {Local_Host: {"url": None}}
+            if os.path.exists(self.hosts_file):
+                with open(self.hosts_file) as f:
+                    for name, entry in json.load(f).items():
+                        hosts[name] = entry if isinstance(entry, dict) else {"url": entry}
+            self._hosts = hosts
+        return self._hosts
+
+    def names(self):
+        with self._lock:
+            return list(self._settings())
+
+    def url(self, name=None):
+        with self._lock:
+            settings = self._settings().get(name or self.active)
+        if settings is None:
+            raise KeyError(f"Unknown Docker host '{name}'")
+        return settings["url"] or os.environ.get("DOCKER_HOST") or "unix:///var/run/docker.sock"
+
+    def add(self, name, url, tls=False, cert_path=None, save=True):
+        """Adds (or changes) a host, e.g. add("node1", "tcp://10.0.0.6:2375"), and saves Hosts_File."""
+        if not url.startswith(("tcp://", "unix://", "ssh://", "http://", "https://")):
+            raise ValueError(f"'{url}' is not a Docker host URL (tcp://host:2375, unix:///path, ssh://user@host)")
+        entry = {"url": url}
+        if tls or cert_path:
+            entry.update({"tls": True, "cert_path": cert_path})
+        with self._lock:
+            self._settings()[name] = entry
+            client = self._clients.pop(name, None)
+            if save:
+                extra = {n: (e if e.get("tls") else e["url"]) for n, e in self._hosts.items() if n != Local_Host}
+                with open(self.hosts_file, "w") as f:
+                    json.dump(extra, f, indent=2)
+        self._dropped(name, client)
+
+    def set_active(self, name):
+        with self._lock:
+            if name not in self._settings():
+                raise KeyError(f"Unknown Docker host '{name}'")
+            self.active = name
+
+    def get_client(self, name=None):
+        """The shared client of a host (the active one by default), connected on first use."""
+        with self._lock:
+            name = name or self.active
+            client = self._clients.get(name)
+            if client is not None:
+                return client
+            settings = self._settings().get(name)
+            if settings is None:
+                raise KeyError(f"Unknown Docker host '{name}'")
+        # Connecting can take Connect_Timeout plus the retries, so other hosts
+        # are not held up meanwhile
+        client = self._connect(name, settings)
+        with self._lock:
+            current = self._clients.get(name)
+            if current is None and self._settings().get(name) is settings:
+                self._clients[name] = client
+                return client
+        # Another thread connected first, or the host was changed meanwhile
+        client.close()
+        return current if current is not None else self.get_client(name)
+
+    def _connect(self, name, settings):
+        if settings.get("url"):
+            kwargs = {"base_url": settings["url"]}
+            if settings.get("tls"):
+                cert_path = os.path.expanduser(settings.get("cert_path") or "~/.docker")
+                kwargs["tls"] = TLSConfig(client_cert=(os.path.join(cert_path, "cert.pem"), os.path.join(cert_path, "key.pem")),
+                                          ca_cert=os.path.join(cert_path, "ca.pem"), verify=True)
+        else:
+            kwargs = docker.utils.kwargs_from_env()
+        try:
+            client = _DockerClient(version="auto", timeout=Connect_Timeout, max_pool_size=Pool_Size, **kwargs)
+        except docker.errors.DockerException as e:
+            hint = " Did you run 'sudo service docker start'?" if name == Local_Host else ""
+            raise docker.errors.DockerException(f"Cannot connect to Docker host '{name}': {e}.{hint}") from e
+        client.api.timeout = API_Timeout
+        _tune_adapters(client.api)
+        return client
+
+    def on_drop(self, handler):
+        """handler(name) is called after a host's client was closed, so whatever used it can let go."""
+        with self._lock:
+            self._drop_handlers.append(handler)
+
+    def _dropped(self, name, client):
+        if client is not None:
+            client.close()
+        with self._lock:
+            handlers = list(self._drop_handlers)
+        for handler in handlers:
+            try:
+                handler(name)
+            except Exception as e:
+                print(f"Docker host '{name}' drop handler error: {e}")
+
+    def reset(self, name=None):
+        """Closes a host's client; the next call connects again."""
+        with self._lock:
+            name = name or self.active
+            client = self._clients.pop(name, None)
+        self._dropped(name, client)
+
+
+# Shared by the CLI, the GUI and the managers
+hosts = HostRegistry()
@@ -1,56 +1,336 @@
 import docker
+import requests
 import os
+import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from docker_events import EventStream
+from image_index import ImageIndex
+from container_state import ContainerState
+from container_metrics import MetricsCollector, format_metrics_rows
+import build_context
+import dockerfile_analyzer
+import docker_hosts
+from job_scheduler import JobCancelled, current_job, check_cancelled, report_progress, scheduler
 
 Docker_Projects_Main = "Docker_Projects"
 
-if not os.path.exists(Docker_Projects_Main):
-    os.makedirs(Docker_Projects_Main)
+# How many images a batch pull downloads at the same time
+Pull_Workers = 4
 
+# Seconds a registry digest check or Docker Hub search may take; the
+# daemon forwards these to the registry, which can be slow to answer
+Registry_Timeout = 15
 
-try:
-    client = docker.from_env()
-except Exception as e:
-    print(f"Error connecting to Docker: {e}")
-    print("Did you run 'sudo service docker start'?")
+_state_lock = threading.Lock()
+# Per Docker host name; each host gets its own events stream and models
+_event_streams = {}
+_image_indexes = {}
+_container_states = {}
+_metrics_collectors = {}
+
+def get_client(host=None):
+    """
+    The shared Docker client of a host (the active one by default),
+    connected on first use so that starting the tool (or doing VM-only
+    work) never waits for a daemon. See docker_hosts.
+    """
+    return docker_hosts.hosts.get_client(host)
+
+def _drop_models(host):
+    # The host's client was closed (reset, or re-added with a new URL); its
+    # models would keep using it, so stop them and build new ones on next use
+    with _state_lock:
+        events = _event_streams.pop(host, None)
+        _image_indexes.pop(host, None)
+        _container_states.pop(host, None)
+        collector = _metrics_collectors.pop(host, None)
+    if collector is not None:
+        collector.stop()
+    if events is not None:
+        events.stop()
+
+docker_hosts.hosts.on_drop(_drop_models)
+
+def __getattr__(name):
+    # docker_manager.client keeps working for the other modules, lazily
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_event_stream(host=None):
+    """The shared Docker events subscriber of a host, started on first use."""
+    host = host or docker_hosts.hosts.active
+    client = get_client(host)
+    with _state_lock:
+        if host not in _event_streams:
+            events = EventStream(client)
+            events.start()
+            _event_streams[host] = events
+        return _event_streams[host]
+
+def get_image_index(host=None):
+    """
+    The shared local image index of a host. The first call loads it from
+    the daemon; after that it is kept current by the events stream.
+    """
+    host = host or docker_hosts.hosts.active
+    events = get_event_stream(host)
+    with _state_lock:
+        if host not in _image_indexes:
+            index = ImageIndex(get_client(host))
+            # Subscribed before loading so no change made during the load is missed
+            events.subscribe("image", index.handle_event)
+            # After a daemon restart we may have missed changes, so reload
+            events.on_reconnect(index.load)
+            try:
+                index.load()
+            except Exception:
+                # Not cached, so the next call tries again with fresh handlers
+                events.unsubscribe("image", index.handle_event)
+                events.remove_reconnect(index.load)
+                raise
+            _image_indexes[host] = index
+        return _image_indexes[host]
+
+def get_container_state(host=None):
+    """
+    The shared container model of a host. The first call loads it from the
+    daemon; after that it is kept current by the events stream.
+    """
+    host = host or docker_hosts.hosts.active
+    events = get_event_stream(host)
+    with _state_lock:
+        if host not in _container_states:
+            state = ContainerState(get_client(host))
+            events.subscribe("container", state.handle_event)
+            events.on_reconnect(state.load)
+            try:
+                state.load()
+            except Exception:
+                events.unsubscribe("container", state.handle_event)
+                events.remove_reconnect(state.load)
+                raise
+            _container_states[host] = state
+        return _container_states[host]
+
+def get_metrics_collector(host=None):
+    """
+    The shared container metrics collector of a host. The first call starts
+    sampling stats for every running container; the events stream adds
+    and removes containers after that.
+    """
+    host = host or docker_hosts.hosts.active
+    state = get_container_state(host)
+    events = get_event_stream(host)
+    with _state_lock:
+        if host not in _metrics_collectors:
+            collector = MetricsCollector(get_client(host))
+            events.subscribe("container", collector.handle_event)
+            # Runs after the container model has reloaded
+            events.on_reconnect(lambda: collector.sync(state.containers(running_only=True)))
+            collector.sync(state.containers(running_only=True))
+            _metrics_collectors[host] = collector
+        return _metrics_collectors[host]
+
+def format_image_rows(rows):
+    """Formats image index rows as a table."""
+    output = [f"{'REPOSITORY':<30} {'TAG':<15} {'ID':<12} {'SIZE (MB)':<10}"]
+    output.append("-" * 75)
+    for row in rows:
+        output.append(f"{row['repository']:<30} {row['tag']:<15} {row['short_id']:<12} {row['size'] / (1024 * 1024):<10.1f}")
+    return output
 
 def list_images():
     """Lists all Docker images downloaded on this system."""
     print("\n--- Local Docker Images ---")
     try:
-        images = client.images.list()
-        if not images:
+        rows = get_image_index().rows()
+        if not rows:
             print("No images found. Try pulling one first!")
+            return
         
-        for img in images:
-            # Images can have multiple tags, we print the first one
-            tags = img.tags if img.tags else ["<no-tag>"]
-            print(f"ID: {img.short_id} | Tags: {', '.join(tags)}")
+        for line in format_image_rows(rows):
+            print(line)
     except Exception as e:
         print(f"Error listing images: {e}")
 
+def search_local_images():
+    """Searches local images by repository or tag. End the term with '*' for a prefix search."""
+    term = input("Enter repository or tag to search for (e.g. 'pyth' or 'pyth*'): ").strip()
+    if not term:
+        print("Error: Please enter a search term.")
+        return
+    prefix = term.endswith("*")
+    term = term.rstrip("*")
+    try:
+        rows = get_image_index().search(term, prefix=prefix, field="both")
+        if not rows:
+            print(f"No local images match '{term}'.")
+            return
+        for line in format_image_rows(rows):
+            print(line)
+    except Exception as e:
+        print(f"Error searching images: {e}")
+
 def list_containers():
     """Lists currently running containers."""
     print("\n--- Running Containers ---")
     try:
-        containers = client.containers.list()
-        if not containers:
+        lines = get_container_state().render()
+        if len(lines) <= 2:
             print("No containers are currently running.")
-            
-        for container in containers:
-            print(f"ID: {container.short_id} | Name: {container.name} | Status: {container.status}")
+        else:
+            print("\n".join(lines))
     except Exception as e:
         print(f"Error listing containers: {e}")
 
+def show_container_stats():
+    """Shows CPU, memory, network and disk usage of running containers."""
+    print("\n--- Container Resource Usage ---")
+    window = input("Window (1m/5m/15m, default 1m): ").strip() or "1m"
+    if window not in ("1m", "5m", "15m"):
+        print("Error: Window must be 1m, 5m or 15m.")
+        return
+    try:
+        collector = get_metrics_collector()
+        rows = collector.report(window)
+        if not rows:
+            # Sampling was just started; give it a moment for the first samples
+            time.sleep(2)
+            rows = collector.report(window)
+        if not rows:
+            print("No running containers.")
+            return
+        for line in format_metrics_rows(rows, window):
+            print(line)
+    except Exception as e:
+        print(f"Error reading container stats: {e}")
+
+def is_present_locally(ref, host=None):
+    """
+    True when the image is already here and matches the registry.
+    A digest reference only needs a local lookup; a tag is compared with
+    the registry's current digest (one small request, no layer download).
+    """
+    client = get_client(host)
+    try:
+        image = client.images.get(ref)
+    except docker.errors.ImageNotFound:
+        return False
+    if "@sha256:" in ref:
+        return True
+    try:
+        with docker_hosts.call_timeout(Registry_Timeout):
+            remote_digest = client.images.get_registry_data(ref).id
+    except (docker.errors.APIError, requests.exceptions.Timeout):
+        return False
+    local_digests = {d.split("@", 1)[1] for d in image.attrs.get("RepoDigests", []) if "@" in d}
+    return remote_digest in local_digests
+
+class LayerProgress:
+    """
+    Turns the progress events of many parallel pulls into readable lines.
+    A layer shared by several images is only reported by the first image
+    that starts it, and download/extract progress is reported in 25% steps.
+    """
+
+    def __init__(self, on_line):
+        self.on_line = on_line
+        self._lock = threading.Lock()
+        self._owners = {}    # layer id -> image ref reporting it
+        self._reported = {}  # layer id -> last (status, step) printed
+
+    def handle(self, ref, event):
+        layer = event.get("id")
+        status = event.get("status", "")
+        if not layer or status.startswith(("Pulling from", "Digest", "Status")):
+            self.on_line(f"[{ref}] {status}")
+            return
+
+        with self._lock:
+            if self._owners.setdefault(layer, ref) != ref:
+                return
+            detail = event.get("progressDetail") or {}
+            step = None
+            if detail.get("total"):
+                step = int(100 * detail.get("current", 0) / detail["total"]) // 25 * 25
+            if self._reported.get(layer) == (status, step):
+                return
+            self._reported[layer] = (status, step)
+
+        self.on_line(f"[{ref}] {layer}: {status}{f' {step}%' if step is not None else ''}")
+
+def pull_one(ref, progress, job=None, host=None):
+    """
+    Pulls one image, streaming its progress. Returns a result record.
+    If 'job' is cancelled the pull stops at its next progress event.
+    """
+    started = time.perf_counter()
+    result = {"ref": ref, "status": "pulled", "seconds": 0.0, "error": None}
+    try:
+        check_cancelled(job)
+        if is_present_locally(ref, host):
+            result["status"] = "skipped"
+            progress.on_line(f"[{ref}] Already up to date, skipping.")
+        else:
+            stream = get_client(host).api.pull(ref, stream=True, decode=True)
+            for event in stream:
+                if job is not None and job.cancel_requested():
+                    stream.close()
+                    check_cancelled(job)
+                if "error" in event:
+                    raise docker.errors.APIError(event["error"])
+                progress.handle(ref, event)
+    except JobCancelled:
+        result["status"] = "cancelled"
+    except Exception as e:
+        result["status"] = "failed"
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def pull_images(refs, max_workers=Pull_Workers, on_line=print, host=None):
+    """
+    Pulls many images at once, at most max_workers at a time.
+    Duplicate references and images already present locally are skipped.
+    Returns one result record per unique reference.
+    """
+    unique_refs = list(dict.fromkeys(r.strip() for r in refs if r.strip()))
+    if not unique_refs:
+        return []
+    # Every pull goes to the host the batch started on, even if the active one changes
+    host = host or docker_hosts.hosts.active
+    progress = LayerProgress(on_line)
+    # Pool threads are not the job's own thread, so they are handed the job
+    job = current_job()
+    finished = []
+
+    def pull(ref):
+        result = pull_one(ref, progress, job, host)
+        finished.append(ref)
+        report_progress(100 * len(finished) / len(unique_refs), f"{len(finished)}/{len(unique_refs)} image(s)", job)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(unique_refs)))) as pool:
+        return list(pool.map(pull, unique_refs))
+
 def pull_image():
-    """Downloads an image from Docker Hub."""
-    image_name = input("Enter image name to pull (e.g., 'ubuntu', 'nginx', 'python'): ")
-    print(f"Pulling '{image_name}'... (This might take a moment)")
+    """Downloads one or more images from Docker Hub."""
+    names = input("Enter image name(s) to pull, separated by spaces (e.g., 'ubuntu nginx python:3.12'): ")
+    refs = names.replace(",", " ").split()
+    if not refs:
+        print("Error: Please enter at least one image name.")
+        return
+    print(f"Pulling {len(refs)} image(s), up to {Pull_Workers} at a time...")
     
     try:
-        client.images.pull(image_name)
-        print(f"Successfully pulled {image_name}!")
-    except docker.errors.ImageNotFound:
-        print(f"Error: Image '{image_name}' not found on DockerHub.")
+        results = scheduler.run(f"Pull {', '.join(refs)}", pull_images, refs, resource="pull")
+        print("\n--- Pull Summary ---")
+        for r in results:
+            detail = r["error"] or f"{r['seconds']:.1f}s"
+            print(f"{r['ref']:<35} | {r['status']:<8} | {detail}")
     except Exception as e:
         print(f"Error: {e}")
 
@@ -59,7 +339,7 @@ def stop_container():
     container_id = input("Enter Container ID or Name to stop: ")
     try:
         # We need to 'get' the container object first, then stop it
-        container = client.containers.get(container_id)
+        container = get_client().containers.get(container_id)
         print(f"Stopping container {container_id}...")
         container.stop()
         print(f"Container {container_id} stopped successfully!")
@@ -68,6 +348,31 @@ def stop_container():
     except Exception as e:
         print(f"Error: {e}")
 
+def select_docker_host():
+    """Lists the known Docker hosts and switches the active one (or adds a tcp:// host)."""
+    print("\n--- Docker Hosts ---")
+    hosts = docker_hosts.hosts
+    for name in hosts.names():
+        print(f"{'*' if name == hosts.active else ' '} {name:<20} {hosts.url(name)}")
+    choice = input("Host to use, or 'name=tcp://address:2375' to add one (Enter to keep): ").strip()
+    if not choice:
+        return
+    try:
+        if "=" in choice:
+            name, url = (part.strip() for part in choice.split("=", 1))
+            hosts.add(name, url)
+            choice = name
+        hosts.set_active(choice)
+        version = get_client().version().get("Version", "?")
+        print(f"Now managing '{choice}' ({hosts.url(choice)}), Docker {version}.")
+    except Exception as e:
+        print(f"Error: {e}")
+
+def search_hub(term, host=None):
+    """Docker Hub search results (through the daemon), bounded by Registry_Timeout."""
+    with docker_hosts.call_timeout(Registry_Timeout):
+        return get_client(host).images.search(term)
+
 def search_dockerhub():
     """Searches Docker Hub for images."""
     term = input("Enter image name to search on Docker Hub: ")
@@ -75,7 +380,7 @@ def search_dockerhub():
     
     try:
         # The Docker API returns a list of dictionaries
-        results = client.images.search(term)
+        results = search_hub(term)
         
         print(f"\n--- Search Results for '{term}' ---")
         # Let's show the top 5 results so we don't spam the screen
@@ -124,14 +429,125 @@ def create_dockerfile():
         print(f"Dockerfile successfully saved at: {file_path}")
     except Exception as e:
         print(f"Error saving file: {e}")
+        return
+
+    print("\n--- Dockerfile Check ---")
+    for line in dockerfile_analyzer.format_findings(dockerfile_analyzer.lint_dockerfile("\n".join(lines))):
+        print(line)
+
+def analyze_dockerfile():
+    """Lints a project's Dockerfile and, optionally, shows the layer sizes of an image built from it."""
+    print("\n--- Analyze Dockerfile ---")
+    project_name = input("Enter project name (e.g., 'my_website'): ")
+    file_path = os.path.join(Docker_Projects_Main, project_name, "Dockerfile")
+    if not os.path.exists(file_path):
+        print(f"Error: '{file_path}' does not exist.")
+        return
+    with open(file_path, "r") as f:
+        findings = dockerfile_analyzer.lint_dockerfile(f.read())
+    for line in dockerfile_analyzer.format_findings(findings):
+        print(line)
+
+    image = input("Image built from it, to show layer sizes (optional): ").strip()
+    if not image:
+        return
+    try:
+        print()
+        for line in dockerfile_analyzer.format_layer_report(dockerfile_analyzer.layer_report(get_client(), image)):
+            print(line)
+    except docker.errors.ImageNotFound:
+        print(f"Error: Image '{image}' not found.")
+    except Exception as e:
+        print(f"Error: {e}")
+
+# "Step 3/7 : RUN pip install ..." lines from the classic builder
+Step_Pattern = re.compile(r"^Step (\d+)/(\d+) : (.*)$")
+
+def parse_key_values(text):
+    """Turns 'A=1, B=2' into {'A': '1', 'B': '2'}."""
+    pairs = {}
+    for item in text.split(","):
+        if "=" in item:
+            key, value = item.split("=", 1)
+            pairs[key.strip()] = value.strip()
+    return pairs
+
+def stream_build(path, tag, buildargs=None, cache_from=None, on_line=print, dockerfile="Dockerfile", host=None):
+    """
+    Builds an image with the low-level API and streams the log while it runs.
+    Each log line is passed to on_line() as soon as the daemon sends it.
+    cache_from lists local images whose layers may be reused as cache.
+    Returns {"image_id", "tag", "steps", "seconds", "error"}; each step has
+    its instruction, duration and whether it was a cache hit.
+    The context is streamed to the daemon while it is being packed
+    (.dockerignore applied) instead of being written to a temp file first.
+    """
+    result = {"image_id": None, "tag": tag, "steps": [], "seconds": 0.0, "error": None}
+    started = time.perf_counter()
+    current = None
+
+    def finish_step():
+        if current is not None:
+            current["seconds"] = time.perf_counter() - current.pop("_started")
+            result["steps"].append(current)
+
+    stream = get_client(host).api.build(
+        fileobj=build_context.stream_context(path, dockerfile), custom_context=True,
+        tag=tag, dockerfile=dockerfile, rm=True, decode=True,
+        buildargs=buildargs or None, cache_from=cache_from or None
+    )
+    for chunk in stream:
+        try:
+            check_cancelled()
+        except JobCancelled:
+            # Dropping the connection makes the daemon abort the build
+            stream.close()
+            on_line("Build cancelled.")
+            raise
+        if "stream" in chunk:
+            for line in chunk["stream"].splitlines():
+                line = line.rstrip()
+                if not line:
+                    continue
+                match = Step_Pattern.match(line)
+                if match:
+                    finish_step()
+                    current = {"step": int(match.group(1)), "total": int(match.group(2)),
+                               "instruction": match.group(3), "cached": False, "_started": time.perf_counter()}
+                    report_progress(100 * (current["step"] - 1) / current["total"], f"step {current['step']}/{current['total']}")
+                elif current is not None and "Using cache" in line:
+                    current["cached"] = True
+                elif line.startswith("Successfully built "):
+                    result["image_id"] = result["image_id"] or line.split()[-1]
+                on_line(line)
+        elif "error" in chunk:
+            result["error"] = chunk["error"].strip()
+            on_line(f"ERROR: {result['error']}")
+        elif "aux" in chunk and "ID" in chunk["aux"]:
+            result["image_id"] = chunk["aux"]["ID"]
+        elif "status" in chunk:
+            # Base image pulls during FROM
+            on_line(f"{chunk.get('id', '')} {chunk['status']}".strip())
+
+    finish_step()
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def build_summary(result):
+    """Per-step timing table for a stream_build() result, as a list of lines."""
+    lines = [f"{'STEP':<8} {'CACHE':<6} {'TIME (s)':<9} INSTRUCTION"]
+    for step in result["steps"]:
+        instruction = step["instruction"] if len(step["instruction"]) <= 60 else step["instruction"][:57] + "..."
+        lines.append(f"{step['step']}/{step['total']:<6} {'HIT' if step['cached'] else 'miss':<6} {step['seconds']:<9.2f} {instruction}")
+    hits = sum(1 for s in result["steps"] if s["cached"])
+    lines.append(f"{hits}/{len(result['steps'])} steps from cache, total {result['seconds']:.1f}s")
+    return lines
 
 def build_image():
     """Builds a Docker image from a directory containing a Dockerfile."""
     print("\n--- Build Docker Image ---")
     
     # 1. Ask for the folder containing the Dockerfile
-    folder_name = input("Enter the project folder name (e.g., 'my_website'): ")
-    
     project_name = input("Enter project name (e.g., 'my_website'): ")
     path = os.path.join(Docker_Projects_Main, project_name)
     
@@ -139,28 +555,43 @@ def build_image():
         print(f"Error: The folder '{path}' does not exist.")
         return
 
+    # Show what would be uploaded and offer to ignore what the image doesn't need
+    report = build_context.analyze_context(path)
+    for line in build_context.format_context_report(report):
+        print(line)
+    if report["suggestions"]:
+        if input("Add the suggested entries to .dockerignore? (y/n): ").lower() == 'y':
+            added = build_context.write_dockerignore(path, [s["pattern"] for s in report["suggestions"]])
+            print(f"Added {len(added)} entr{'y' if len(added) == 1 else 'ies'} to {os.path.join(path, '.dockerignore')}")
+
     # 2. Ask for a name for the new image
     tag_name = input("Enter a name for your new image (e.g., 'my-custom-app:v1'): ")
+
+    # 3. Optional build args and cache sources (e.g. the previous version of the image)
+    buildargs = parse_key_values(input("Build args KEY=VALUE, comma separated (optional): "))
+    cache_from = [c.strip() for c in input("Images to reuse as cache, comma separated (optional): ").split(",") if c.strip()]
     
-    print("Building image... please wait...")
+    print("Building image...\n")
     
     try:
-        # docker build -t tag_name path
-        image, build_logs = client.images.build(path=path, tag=tag_name)
-        
-        # Optional: Print build logs if you want to see details
-        # for chunk in build_logs:
-        #     if 'stream' in chunk:
-        #         print(chunk['stream'], end='')
+        result = scheduler.run(f"Build {tag_name}", stream_build, path, tag_name, buildargs, cache_from, resource="build")
+
+        print()
+        for line in build_summary(result):
+            print(line)
+
+        if result["error"]:
+            print(f"\nBuild failed: {result['error']}")
+            return
                 
         print(f"\nSuccess! Image '{tag_name}' built successfully.")
-        print(f"Image ID: {image.short_id}")
+        print(f"Image ID: {result['image_id']}")
+
+        print("\n--- Layer Sizes ---")
+        for line in dockerfile_analyzer.format_layer_report(dockerfile_analyzer.layer_report(get_client(), result["image_id"] or tag_name)):
+            print(line)
         
-    except docker.errors.BuildError as e:
+    except docker.errors.APIError as e:
         print(f"Build failed: {e}")
-        # Print the build log to see why it failed
-        for line in e.build_log:
-            if 'stream' in line:
-                print(line['stream'], end='')
     except Exception as e:
         print(f"Error: {e}")
\ No newline at end of file
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import docker
+import docker_manager
+import docker_hosts
+from job_scheduler import current_job, scheduler
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Stack specs live here by default (JSON or YAML)
+Stack_Folder = os.path.join(docker_manager.Docker_Projects_Main, "stacks")
+
+# How many containers of a stack are started or removed at the same time
+Stack_Workers = 4
+
+# How long a service may take to become healthy before its dependents give up
+Health_Timeout = 120
+
+# Seconds a container gets to stop on teardown before it is killed
+Stop_Timeout = 10
+
+# Labels that tie containers to their stack, so teardown works without the spec
+Stack_Label = "cms.stack"
+Service_Label = "cms.service"
+Depends_Label = "cms.depends_on"
+
+
+class StackError(Exception):
+    """Raised for invalid stack specs (unknown dependencies, cycles, ...)."""
+
+
+def load_stack(path):
+    """
+    Loads a stack spec:
+        {"name": "test-env",
+         "services": {"db": {"image": "postgres:16", "environment": {...},
+                             "healthcheck": {"test": [...], "interval": 5}},
+                      "web": {"image": "nginx", "ports": {"80/tcp": 8080},
+                              "depends_on": ["db"]}}}
+    YAML files need PyYAML. The stack name defaults to the file name.
+    """
+    with open(path, 'r') as f:
+        if path.endswith((".yml", ".yaml")):
+            if yaml is None:
+                raise StackError("YAML stack files need PyYAML ('pip install pyyaml'); use JSON instead")
+            stack = yaml.safe_load(f)
+        else:
+            stack = json.load(f)
+    if not isinstance(stack, dict) or not stack.get("services"):
+        raise StackError(f"'{path}' has no services")
+    stack.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    for name, service in stack["services"].items():
+        if not service.get("image"):
+            raise StackError(f"Service '{name}' has no image")
+        deps = service.get("depends_on") or []
+        service["depends_on"] = [deps] if isinstance(deps, str) else list(deps)
+    start_waves({n: s["depends_on"] for n, s in stack["services"].items()})
+    return stack
+
+
+def start_waves(depends_on):
+    """
+    Groups services into waves: every service comes after all its
+    dependencies. Raises StackError for unknown dependencies or cycles.
+    """
+    for name, deps in depends_on.items():
+        unknown = [d for d in deps if d not in depends_on]
+        if unknown:
+            raise StackError(f"Service '{name}' depends on unknown service(s): {', '.join(unknown)}")
+    waves, done = [], set()
+    while len(done) < len(depends_on):
+        wave = sorted(n for n, deps in depends_on.items() if n not in done and set(deps) <= done)
+        if not wave:
+            raise StackError(f"Dependency cycle between: {', '.join(sorted(set(depends_on) - done))}")
+        waves.append(wave)
+        done.update(wave)
+    return waves
+
+
+def _seconds_to_ns(value):
+    return int(float(value) * 1_000_000_000)
+
+
+def container_kwargs(stack_name, service_name, service, host=None):
+    """Maps a service entry to containers.run() arguments."""
+    network = f"{stack_name}_net"
+    kwargs = {
+        "image": service["image"],
+        "name": f"{stack_name}-{service_name}",
+        "detach": True,
+        "network": network,
+        # Services reach each other by service name on the stack network
+        "networking_config": {network: docker_manager.get_client(host).api.create_endpoint_config(aliases=[service_name])},
+        "labels": {
+            **(service.get("labels") or {}),
+            Stack_Label: stack_name,
+            Service_Label: service_name,
+            Depends_Label: ",".join(service["depends_on"]),
+        },
+    }
+    for key in ("command", "environment", "ports", "volumes", "mem_limit", "working_dir", "user", "entrypoint"):
+        if service.get(key) is not None:
+            kwargs[key] = service[key]
+    if service.get("cpus"):
+        kwargs["nano_cpus"] = int(float(service["cpus"]) * 1_000_000_000)
+    if service.get("restart"):
+        kwargs["restart_policy"] = {"Name": service["restart"]}
+    if service.get("healthcheck"):
+        # Durations are given in seconds in the spec; the API wants nanoseconds
+        health = dict(service["healthcheck"])
+        for key in ("interval", "timeout", "start_period"):
+            if key in health:
+                health[key] = _seconds_to_ns(health[key])
+        kwargs["healthcheck"] = health
+    return kwargs
+
+
+def _has_healthcheck(container):
+    test = (container.attrs.get("Config", {}).get("Healthcheck") or {}).get("Test") or []
+    return bool(test) and test != ["NONE"]
+
+
+def wait_ready(container, timeout=Health_Timeout, host=None):
+    """
+    Waits until a container is healthy, or just running when it has no
+    health check. Health comes from the event-fed container model, so
+    waiting does not poll the daemon.
+    """
+    state = docker_manager.get_container_state(host)
+    healthcheck = _has_healthcheck(container)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        record = state.get(container.id)
+        if record:
+            if record["status"] == "exited":
+                raise RuntimeError(f"'{container.name}' exited while starting")
+            if record["health"] == "unhealthy":
+                raise RuntimeError(f"'{container.name}' is unhealthy")
+            if record["status"] == "running" and (not healthcheck or record["health"] == "healthy"):
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"'{container.name}' was not ready after {timeout}s")
+
+
+def _ensure_network(name, stack_name, host=None):
+    client = docker_manager.get_client(host)
+    # The name filter matches substrings, so compare exactly
+    if not any(n.name == name for n in client.networks.list(names=[name])):
+        client.networks.create(name, driver="bridge", labels={Stack_Label: stack_name})
+
+
+def deploy_stack(stack, max_workers=Stack_Workers, on_line=print, host=None):
+    """
+    Starts a stack. Missing images are pulled in parallel first. Each
+    service starts as soon as all its dependencies are ready, so services
+    without dependencies between them start at the same time. Existing
+    containers of the stack are replaced. Returns one result per service.
+    """
+    # Every call goes to the host the deploy started on, even if the active one changes
+    host = host or docker_hosts.hosts.active
+    client = docker_manager.get_client(host)
+    name, services = stack["name"], stack["services"]
+    waves = start_waves({n: s["depends_on"] for n, s in services.items()})
+
+    pulls = docker_manager.pull_images([s["image"] for s in services.values()], on_line=on_line, host=host)
+    failed_pulls = {r["ref"]: r["error"] for r in pulls if r["status"] == "failed"}
+    _ensure_network(f"{name}_net", name, host)
+    # Started before any container so no health event is missed
+    docker_manager.get_container_state(host)
+
+    results = {n: {"service": n, "status": "pending", "seconds": 0.0, "error": None} for n in services}
+    job = current_job()
+
+    def start(service_name, dep_futures):
+        service = services[service_name]
+        result = results[service_name]
+        for dep, future in dep_futures.items():
+            if not future.result():
+                result["status"] = "skipped"
+                result["error"] = f"dependency '{dep}' did not start"
+                return False
+        if job is not None and job.cancel_requested():
+            result["status"] = "cancelled"
+            return False
+        started = time.perf_counter()
+        try:
+            if service["image"] in failed_pulls:
+                raise RuntimeError(f"pull failed: {failed_pulls[service['image']]}")
+            container_name = f"{name}-{service_name}"
+            try:
+                client.containers.get(container_name).remove(force=True)
+            except docker.errors.NotFound:
+                pass
+            container = client.containers.run(**container_kwargs(name, service_name, service, host))
+            on_line(f"[{service_name}] Started {container.short_id}, waiting until ready...")
+            wait_ready(container, service.get("health_timeout", Health_Timeout), host)
+            result["status"] = "running"
+            on_line(f"[{service_name}] Ready.")
+            return True
+        except Exception as e:
+            result["status"] = "failed"
+            result["error"] = str(e)
+            on_line(f"[{service_name}] FAILED: {e}")
+            return False
+        finally:
+            result["seconds"] = time.perf_counter() - started
+
+    # Submitted in dependency order, so a service only ever waits on
+    # services a worker has already picked up
+    futures = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(services)))) as pool:
+        for wave in waves:
+            for service_name in wave:
+                deps = {d: futures[d] for d in services[service_name]["depends_on"]}
+                futures[service_name] = pool.submit(start, service_name, deps)
+    return [results[n] for wave in waves for n in wave]
+
+
+def stack_containers(name, host=None):
+    """All containers (running or not) that belong to a stack."""
+    return docker_manager.get_client(host).api.containers(all=True, filters={"label": f"{Stack_Label}={name}"})
+
+
+def list_stacks(host=None):
+    """Stack name -> number of containers, from the labels on existing containers."""
+    stacks = {}
+    for raw in docker_manager.get_client(host).api.containers(all=True, filters={"label": Stack_Label}):
+        stack = raw["Labels"][Stack_Label]
+        stacks[stack] = stacks.get(stack, 0) + 1
+    return stacks
+
+
+def teardown_stack(name, max_workers=Stack_Workers, timeout=Stop_Timeout, on_line=print, host=None):
+    """
+    Stops and removes a stack in reverse dependency order: dependents go
+    first, and services in the same wave go at the same time. The order
+    is rebuilt from container labels, so the spec file is not needed.
+    """
+    host = host or docker_hosts.hosts.active
+    client = docker_manager.get_client(host)
+    by_service = {}
+    for raw in stack_containers(name, host):
+        by_service[raw["Labels"].get(Service_Label, raw["Id"][:12])] = raw
+    if not by_service:
+        on_line(f"No containers found for stack '{name}'.")
+    depends_on = {
+        service: [d for d in raw["Labels"].get(Depends_Label, "").split(",") if d in by_service]
+        for service, raw in by_service.items()
+    }
+
+    def remove(service):
+        try:
+            container = client.containers.get(by_service[service]["Id"])
+            if container.status in ("running", "restarting", "paused"):
+                container.stop(timeout=timeout)
+            container.remove(force=True)
+            on_line(f"[{service}] Removed.")
+            return True
+        except docker.errors.NotFound:
+            return True
+        except Exception as e:
+            on_line(f"[{service}] FAILED: {e}")
+            return False
+
+    removed = 0
+    if by_service:
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(by_service)))) as pool:
+            for wave in reversed(start_waves(depends_on)):
+                removed += sum(pool.map(remove, wave))
+
+    for network in client.networks.list(names=[f"{name}_net"]):
+        if network.name != f"{name}_net":
+            continue
+        try:
+            network.remove()
+        except Exception as e:
+            on_line(f"Could not remove network '{network.name}': {e}")
+    return removed
+
+
+def print_stack_report(results):
+    print(f"\n{'SERVICE':<20} {'STATUS':<10} {'TIME':<8} ERROR")
+    for r in results:
+        print(f"{r['service']:<20} {r['status']:<10} {r['seconds']:<8.1f} {r['error'] or ''}")
+
+
+def deploy_stack_interactive():
+    print("\n--- Deploy Stack ---")
+    if os.path.isdir(Stack_Folder):
+        files = sorted(f for f in os.listdir(Stack_Folder) if f.endswith((".json", ".yml", ".yaml")))
+        if files:
+            print(f"Stack files in {Stack_Folder}: {', '.join(files)}")
+    path = input("Path to the stack file (default 'stack_config.json'): ").strip() or "stack_config.json"
+    if path and not os.path.exists(path) and os.path.exists(os.path.join(Stack_Folder, path)):
+        path = os.path.join(Stack_Folder, path)
+    if not os.path.isfile(path):
+        print(f"Error: '{path}' not found.")
+        return
+    try:
+        stack = load_stack(path)
+        print(f"Deploying stack '{stack['name']}' ({len(stack['services'])} service(s))...")
+        results = scheduler.run(f"Deploy stack {stack['name']}", deploy_stack, stack, resource="docker")
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    print_stack_report(results)
+
+
+def teardown_stack_interactive():
+    print("\n--- Tear Down Stack ---")
+    try:
+        stacks = list_stacks()
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    if not stacks:
+        print("No stacks are deployed.")
+        return
+    for stack, count in sorted(stacks.items()):
+        print(f"{stack:<25} {count} container(s)")
+    name = input("Stack to tear down: ").strip()
+    if name not in stacks:
+        print(f"Error: No stack named '{name}'.")
+        return
+    try:
+        removed = scheduler.run(f"Tear down stack {name}", teardown_stack, name, resource="docker")
+        print(f"Removed {removed} container(s) of stack '{name}'.")
+    except Exception as e:
+        print(f"Error: {e}")
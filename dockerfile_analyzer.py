@@ -0,0 +1,161 @@
+import re
+
+# Commands that fetch dependencies; source copied before them busts their cache.
+# Build and package commands (yarn build, mvn package, gradle build) are not
+# installs: they belong after the source COPY.
+Install_Pattern = re.compile(
+    r"\b(pip3? install|poetry install|pipenv install|npm (install|ci)|pnpm install|"
+    r"go mod download|bundle install|composer install|"
+    # 'yarn install', or 'yarn' with only option flags (not --version/--help) ending the command
+    r"yarn install|yarn(\s+--(?!version\b|help\b)[\w-]+(=\S+)?)*\s*($|&&|;|\|)|"
+    r"mvnw?\b[^&;|]*\bdependency:|"
+    r"gradlew?\b[^&;|]*(\bdependencies\b|--refresh-dependencies))"
+)
+
+# Commands that need compilers or SDKs the final image usually doesn't
+Build_Pattern = re.compile(
+    r"\b(build-essential|gcc|g\+\+|make\b|npm run build|yarn build|go build|cargo build|mvn [\w:-]*\s*package|gradle build|dotnet publish)"
+)
+
+Package_Manager_Pattern = re.compile(r"^\s*(apt-get|apt|apk|yum|dnf)\b")
+
+# Layers bigger than this are called out in the history report
+Large_Layer_MB = 100
+
+
+def parse_dockerfile(text):
+    """
+    Splits a Dockerfile into instructions, joining continuation lines.
+    Returns [{"line", "cmd", "args", "stage"}] where stage counts FROMs.
+    """
+    instructions = []
+    stage = -1
+    buffer, start = "", None
+    for number, raw in enumerate(text.splitlines(), 1):
+        line = raw.strip()
+        if not buffer and (not line or line.startswith("#")):
+            continue
+        if buffer and line.startswith("#"):
+            # Comments inside a continued instruction are dropped
+            continue
+        if start is None:
+            start = number
+        if line.endswith("\\"):
+            buffer += line[:-1] + " "
+            continue
+        buffer += line
+        cmd, _, args = buffer.strip().partition(" ")
+        cmd = cmd.upper()
+        if cmd == "FROM":
+            stage += 1
+        instructions.append({"line": start, "cmd": cmd, "args": args.strip(), "stage": max(stage, 0)})
+        buffer, start = "", None
+    return instructions
+
+
+def _copies_everything(args):
+    sources = [a for a in args.split() if not a.startswith("--")][:-1]
+    return any(s in (".", "./", "*") for s in sources)
+
+
+def lint_dockerfile(text):
+    """
+    Flags instructions that make builds slow or images big.
+    Returns [{"line", "severity", "rule", "message"}] sorted by line.
+    """
+    instructions = parse_dockerfile(text)
+    findings = []
+
+    def add(inst, severity, rule, message):
+        findings.append({"line": inst["line"], "severity": severity, "rule": rule, "message": message})
+
+    if not instructions or instructions[0]["cmd"] not in ("FROM", "ARG"):
+        findings.append({"line": 1, "severity": "error", "rule": "no-from", "message": "A Dockerfile must start with FROM."})
+
+    stages = max((i["stage"] for i in instructions), default=0) + 1
+    copied_source = {}   # stage -> COPY instruction that brought in the whole context
+    previous = None
+    for inst in instructions:
+        cmd, args = inst["cmd"], inst["args"]
+
+        if cmd == "FROM":
+            image = args.split()[0] if args else ""
+            if image.lower() != "scratch" and "@" not in image and (":" not in image.rsplit("/", 1)[-1] or image.endswith(":latest")):
+                add(inst, "warning", "unpinned-base", f"Base image '{image}' is not pinned to a version; rebuilds may change silently.")
+
+        elif cmd in ("COPY", "ADD"):
+            if _copies_everything(args) and "--from" not in args:
+                copied_source.setdefault(inst["stage"], inst)
+
+        elif cmd == "RUN":
+            if Install_Pattern.search(args) and inst["stage"] in copied_source:
+                copy_line = copied_source[inst["stage"]]["line"]
+                add(inst, "warning", "cache-order",
+                    f"Dependencies are installed after the whole source is copied (line {copy_line}), so every code change "
+                    "reinstalls them. Copy only the dependency manifest (requirements.txt, package.json, ...) first.")
+
+            if Package_Manager_Pattern.match(args) and previous and previous["cmd"] == "RUN" \
+                    and previous["stage"] == inst["stage"] and Package_Manager_Pattern.match(previous["args"]):
+                add(inst, "warning", "unmerged-run",
+                    f"Package manager RUN right after another one (line {previous['line']}); merge them into one RUN to save a layer.")
+
+            if re.search(r"\bapt-get update\b", args) and not re.search(r"\bapt-get (-\S+ )*install\b", args):
+                add(inst, "warning", "apt-update-alone",
+                    "'apt-get update' in its own RUN is cached separately and goes stale; run it in the same RUN as 'apt-get install'.")
+            if re.search(r"\bapt-get (-\S+ )*install\b", args):
+                if "/var/lib/apt/lists" not in args:
+                    add(inst, "warning", "no-cache-cleanup", "apt-get install without 'rm -rf /var/lib/apt/lists/*' leaves the package index in the layer.")
+                if "--no-install-recommends" not in args:
+                    add(inst, "info", "install-recommends", "Add '--no-install-recommends' to skip optional packages.")
+            if re.search(r"\bapk add\b", args) and "--no-cache" not in args:
+                add(inst, "warning", "no-cache-cleanup", "apk add without '--no-cache' leaves the package index in the layer.")
+            if re.search(r"\b(yum|dnf) (-\S+ )*install\b", args) and "clean all" not in args:
+                add(inst, "warning", "no-cache-cleanup", "yum/dnf install without 'clean all' leaves the package cache in the layer.")
+            if re.search(r"\bpip3? install\b", args) and "--no-cache-dir" not in args:
+                add(inst, "info", "no-cache-cleanup", "pip install without '--no-cache-dir' keeps the download cache in the layer.")
+
+        previous = inst
+
+    if stages == 1:
+        build_step = next((i for i in instructions if i["cmd"] == "RUN" and Build_Pattern.search(i["args"])), None)
+        if build_step:
+            add(build_step, "warning", "single-stage",
+                "Compilers/build tools end up in the final image. Use a multi-stage build: build in one stage, "
+                "then COPY --from=<stage> only the output into a slim runtime image.")
+
+    return sorted(findings, key=lambda f: f["line"])
+
+
+def format_findings(findings):
+    if not findings:
+        return ["No problems found."]
+    return [f"line {f['line']:<4} {f['severity'].upper():<8} [{f['rule']}] {f['message']}" for f in findings]
+
+
+def layer_report(client, image):
+    """
+    Size of every layer of an image, oldest first, from /images/{id}/history.
+    Returns [{"created_by", "size", "percent"}].
+    """
+    history = list(reversed(client.api.history(image)))
+    total = sum(h.get("Size", 0) for h in history) or 1
+    layers = []
+    for h in history:
+        created_by = (h.get("CreatedBy") or "").replace("/bin/sh -c #(nop) ", "").replace("/bin/sh -c ", "RUN ")
+        layers.append({"created_by": " ".join(created_by.split()), "size": h.get("Size", 0),
+                       "percent": 100 * h.get("Size", 0) / total})
+    return layers
+
+
+def format_layer_report(layers):
+    mb = 1024 * 1024
+    lines = [f"{'SIZE (MB)':>10} {'SHARE':>6}  CREATED BY"]
+    for layer in layers:
+        if layer["size"] == 0:
+            continue
+        created_by = layer["created_by"] if len(layer["created_by"]) <= 70 else layer["created_by"][:67] + "..."
+        flag = "  <-- large" if layer["size"] >= Large_Layer_MB * mb else ""
+        lines.append(f"{layer['size'] / mb:>10.1f} {layer['percent']:>5.1f}%  {created_by}{flag}")
+    empty = sum(1 for layer in layers if layer["size"] == 0)
+    lines.append(f"Total {sum(layer['size'] for layer in layers) / mb:.1f} MB in {len(layers)} layer(s) ({empty} metadata-only)")
+    return lines
@@ -1,11 +1,25 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import vm_manager
-import docker_manager
-import threading
+import capacity
+import storage_maintenance
+import vm_snapshots
+import log_sink
+import job_scheduler
 import os
 import json
-import docker
+import time
+from lazy_import import lazy_import
+
+# The Docker side is only imported when it is first used, so the window
+# opens without loading docker-py or touching the daemon
+docker_manager = lazy_import("docker_manager")
+docker_stacks = lazy_import("docker_stacks")
+container_ops = lazy_import("container_ops")
+docker_gc = lazy_import("docker_gc")
+build_context = lazy_import("build_context")
+dockerfile_analyzer = lazy_import("dockerfile_analyzer")
+docker_hosts = lazy_import("docker_hosts")
 
 # --- CONFIGURATION ---
 ctk.set_appearance_mode("Dark")
@@ -26,13 +40,6 @@ class CloudManagerApp(ctk.CTk):
         self.font_code = ctk.CTkFont(family="Consolas", size=16) 
         self.font_log = ctk.CTkFont(family="Courier New", size=14)
 
-        try:
-            # This creates the connection to the Docker Engine
-            self.docker_client = docker.from_env()
-        except Exception as e:
-            self.docker_client = None
-            print(f"Error connecting to Docker: {e}")
-
         # 2. DEFINE LARGE FONTS
         self.font_title = ctk.CTkFont(family="Arial", size=32, weight="bold")
         self.font_header = ctk.CTkFont(family="Arial", size=24, weight="bold")
@@ -58,6 +65,9 @@ class CloudManagerApp(ctk.CTk):
         self.btn_docker = ctk.CTkButton(self.sidebar, text="Docker Operations", height=60, font=self.font_button, command=self.show_docker_frame)
         self.btn_docker.grid(row=2, column=0, padx=20, pady=15, sticky="ew")
 
+        self.btn_jobs = ctk.CTkButton(self.sidebar, text="Background Jobs", height=60, font=self.font_button, command=self.show_jobs_frame)
+        self.btn_jobs.grid(row=3, column=0, padx=20, pady=15, sticky="ew")
+
         # --- 4. MAIN CONTENT AREA ---
         self.main_area = ctk.CTkFrame(self, corner_radius=0, fg_color="transparent")
         self.main_area.grid(row=0, column=1, sticky="nsew")
@@ -69,26 +79,89 @@ class CloudManagerApp(ctk.CTk):
         self.console_frame = ctk.CTkFrame(self.main_area, height=250) 
         self.console_frame.grid(row=2, column=0, sticky="ew", padx=0, pady=0)
         
-        self.console_label = ctk.CTkLabel(self.console_frame, text=" System Logs / Status:", anchor="w", font=self.font_header)
-        self.console_label.pack(fill="x", padx=10, pady=(10, 0))
+        console_header = ctk.CTkFrame(self.console_frame, fg_color="transparent")
+        console_header.pack(fill="x", padx=10, pady=(10, 0))
+        self.console_label = ctk.CTkLabel(console_header, text=" System Logs / Status:", anchor="w", font=self.font_header)
+        self.console_label.pack(side="left", fill="x", expand=True)
+        self.log_filter = ctk.CTkOptionMenu(console_header, values=["All", "System", "VM", "Console", "Docker"], width=140, font=self.font_body, command=self.refilter_log)
+        self.log_filter.pack(side="right")
         
         # wrap="none" keeps your table rows straight (scrolling horizontally if needed)
         self.console = ctk.CTkTextbox(self.console_frame, height=200, font=self.font_log, wrap="none")
         self.console.pack(fill="both", expand=True, padx=10, pady=10)
+
+        # Workers push log lines here; the Tk thread drains them in batches
+        self.log_sink = log_sink.LogSink()
+        self.after(log_sink.Drain_Interval_MS, self.drain_log)
         self.log("System Initialized. Ready for presentation.")
 
-        # Initialize Frames
+        # Serial console streams of headless VMs, by VM name
+        self.console_streams = {}
+
+        # Views are built the first time they are shown
         self.vm_frame = None
         self.docker_frame = None
-        
-        self.create_vm_view()
-        self.create_docker_view()
+        self.jobs_frame = None
+        self.jobs_refreshing = False
 
         # Start on VM Page
         self.show_vm_frame()
 
-    def log(self, message):
-        self.console.insert("end", f">> {message}\n")
+        # Sync the VM inventory with VM_Storage without holding up the window
+        self.run_job("Sync VM inventory", self.reconcile_inventory)
+
+    def reconcile_inventory(self):
+        try:
+            added, missing = vm_manager.reconcile_inventory()
+            if added or missing:
+                self.vm_log(f"Inventory synced: {added} new disk(s) found, {missing} missing.")
+        except Exception as e:
+            self.vm_log(f"Inventory Error: {e}")
+
+    def log(self, message, source="System"):
+        """Safe to call from any thread; the text shows up on the next drain."""
+        self.log_sink.push(message, source)
+
+    def vm_log(self, message):
+        self.log(message, "VM")
+
+    def docker_log(self, message):
+        self.log(message, "Docker")
+
+    def run_job(self, name, fn, resource=None, key=None):
+        """Runs fn on the shared job scheduler, where the Jobs page shows and cancels it."""
+        submitted_at = time.time()
+        job = job_scheduler.scheduler.submit(name, fn, resource=resource, key=key)
+        if job.created_at < submitted_at:
+            self.log(f"'{job.name}' is already {job.status} as job {job.id}.")
+        return job
+
+    def drain_log(self):
+        """Moves queued log lines into the textbox in one insert (Tk thread)."""
+        try:
+            batch = self.log_sink.drain()
+            shown = self.log_filter.get()
+            text = "".join(f"{line}\n" for source, line in batch if shown == "All" or source == shown)
+            if text:
+                # Only follow new output if the user hasn't scrolled up
+                at_bottom = self.console.yview()[1] >= 0.999
+                self.console.insert("end", text)
+                self.trim_log()
+                if at_bottom:
+                    self.console.see("end")
+        finally:
+            self.after(log_sink.Drain_Interval_MS, self.drain_log)
+
+    def trim_log(self):
+        line_count = int(self.console.index("end-1c").split(".")[0])
+        if line_count > log_sink.Scrollback_Lines:
+            self.console.delete("1.0", f"{line_count - log_sink.Scrollback_Lines + 1}.0")
+
+    def refilter_log(self, shown):
+        self.console.delete("1.0", "end")
+        lines = self.log_sink.lines(None if shown == "All" else shown)
+        if lines:
+            self.console.insert("end", "\n".join(lines) + "\n")
         self.console.see("end")
 
     # =====================================================
@@ -144,6 +217,14 @@ class CloudManagerApp(ctk.CTk):
         btn_browse = ctk.CTkButton(form, text="Browse...", width=120, height=50, font=self.font_button, command=self.browse_iso)
         btn_browse.grid(row=4, column=2, padx=20, pady=20)
 
+        # Input Row 6: Base Image (copy-on-write clone instead of a blank disk)
+        ctk.CTkLabel(form, text="Base Image:", font=self.font_header).grid(row=5, column=0, padx=20, pady=20, sticky="e")
+        self.entry_base = ctk.CTkEntry(form, placeholder_text="Optional golden image to clone", height=50, font=self.font_body)
+        self.entry_base.grid(row=5, column=1, padx=20, pady=20, sticky="ew")
+
+        btn_bases = ctk.CTkButton(form, text="List...", width=120, height=50, font=self.font_button, command=self.run_list_base_images)
+        btn_bases.grid(row=5, column=2, padx=20, pady=20)
+
 
         # --- RIGHT COLUMN: ACTIONS (The Buttons!) ---
         actions = ctk.CTkFrame(content) 
@@ -152,7 +233,7 @@ class CloudManagerApp(ctk.CTk):
         # Center contents
         actions.grid_columnconfigure(0, weight=1)
         actions.grid_rowconfigure(0, weight=1) # Spacer top
-        actions.grid_rowconfigure(5, weight=1) # Spacer bottom
+        actions.grid_rowconfigure(7, weight=1) # Spacer bottom
 
         ctk.CTkLabel(actions, text="Control Panel", font=self.font_header).grid(row=1, column=0, pady=20)
 
@@ -167,6 +248,45 @@ class CloudManagerApp(ctk.CTk):
         btn_config = ctk.CTkButton(actions, text="LAUNCH FROM\nCONFIG FILE", height=80, font=self.font_button, fg_color="#D35400", command=self.run_vm_config)
         btn_config.grid(row=4, column=0, padx=20, pady=20, sticky="ew")
 
+        # 4. Headless mode (no GTK window, serial console streamed into the log)
+        self.check_headless = ctk.CTkCheckBox(actions, text="Headless (serial console)", font=self.font_body)
+        self.check_headless.grid(row=5, column=0, padx=20, pady=(10, 5), sticky="w")
+        self.entry_vnc = ctk.CTkEntry(actions, placeholder_text="VNC display, e.g. :1 (optional)", height=40, font=self.font_body)
+        self.entry_vnc.grid(row=6, column=0, padx=20, pady=(5, 20), sticky="ew")
+
+        # 6. Running VMs (tracked by the supervisor, no thread per VM)
+        running = ctk.CTkFrame(self.vm_frame)
+        running.pack(fill="x", padx=40, pady=(10, 20))
+
+        ctk.CTkLabel(running, text="Running VMs:", font=self.font_header).pack(side="left", padx=20, pady=15)
+        ctk.CTkButton(running, text="List", width=120, height=50, font=self.font_button, command=self.run_list_running_vms).pack(side="left", padx=10)
+        self.entry_vm_target = ctk.CTkEntry(running, placeholder_text="VM Name", height=50, font=self.font_body)
+        self.entry_vm_target.pack(side="left", fill="x", expand=True, padx=10)
+        ctk.CTkButton(running, text="STOP", width=120, height=50, font=self.font_button, fg_color="#C0392B", hover_color="#922B21", command=self.run_vm_stop).pack(side="left", padx=10)
+        ctk.CTkButton(running, text="KILL", width=120, height=50, font=self.font_button, fg_color="#7B241C", hover_color="#641E16", command=lambda: self.run_vm_stop(force=True)).pack(side="left", padx=(0, 20))
+
+        # 7. Live control of the selected VM over QMP
+        controls = ctk.CTkFrame(self.vm_frame, fg_color="transparent")
+        controls.pack(fill="x", padx=40, pady=(0, 20))
+        for text, action in [("Status", "status"), ("Pause", "pause"), ("Resume", "resume"), ("Shutdown", "shutdown"), ("Stats", "stats"), ("Console", "console"), ("Capacity", "capacity"), ("Inventory", "inventory")]:
+            ctk.CTkButton(controls, text=text, height=50, font=self.font_button, command=lambda a=action: self.run_vm_control(a)).pack(side="left", fill="x", expand=True, padx=10)
+
+        # 8. Disk maintenance (runs in the background)
+        storage = ctk.CTkFrame(self.vm_frame, fg_color="transparent")
+        storage.pack(fill="x", padx=40, pady=(0, 20))
+        ctk.CTkButton(storage, text="Disk Usage Report", height=50, font=self.font_button, command=self.run_disk_report).pack(side="left", fill="x", expand=True, padx=10)
+        ctk.CTkButton(storage, text="Compact Idle Disks", height=50, font=self.font_button, command=self.run_disk_compaction).pack(side="left", fill="x", expand=True, padx=10)
+        self.check_compress_cold = ctk.CTkCheckBox(storage, text=f"Compress images idle {storage_maintenance.Cold_Days}+ days", font=self.font_body)
+        self.check_compress_cold.pack(side="left", padx=10)
+
+        # 9. Snapshots of the selected VM
+        snapshots = ctk.CTkFrame(self.vm_frame, fg_color="transparent")
+        snapshots.pack(fill="x", padx=40, pady=(0, 20))
+        self.entry_snapshot = ctk.CTkEntry(snapshots, placeholder_text="Snapshot name (default: clean)", height=50, font=self.font_body)
+        self.entry_snapshot.pack(side="left", fill="x", expand=True, padx=10)
+        for text, action in [("Snapshot", "create"), ("List", "list"), ("Revert", "revert"), ("Delete", "delete"), ("RESET", "reset")]:
+            ctk.CTkButton(snapshots, text=text, width=120, height=50, font=self.font_button, command=lambda a=action: self.run_vm_snapshot(a)).pack(side="left", padx=10)
+
     # =====================================================
     # LOGIC: VM
     # =====================================================
@@ -182,12 +302,31 @@ class CloudManagerApp(ctk.CTk):
         cpu = self.entry_cpu.get()
         disk = self.entry_disk.get()
         iso = self.entry_iso.get()
+        base = self.entry_base.get().strip()
 
         if not name or not ram or not cpu or not disk:
-            self.log("ERROR: Please fill in Name, RAM, CPU, and Disk Size.")
+            self.vm_log("ERROR: Please fill in Name, RAM, CPU, and Disk Size.")
             return
         
-        self.launch_vm_thread(name, ram, cpu, disk, iso)
+        headless = bool(self.check_headless.get())
+        vnc = self.entry_vnc.get().strip() or None
+        self.launch_vm_thread(name, ram, cpu, disk, iso, base, headless, vnc)
+
+    def run_list_base_images(self):
+        def task():
+            try:
+                bases = vm_manager.list_base_images()
+                if not bases:
+                    self.vm_log(f"No base images found in {vm_manager.Base_Folder}")
+                    return
+                output = [f"{'BASE IMAGE':<30} {'OVERLAYS':<10}"]
+                output.append("-" * 45)
+                for base, overlays in bases.items():
+                    output.append(f"{os.path.basename(base):<30} {len(overlays):<10}")
+                self.vm_log("\n".join(output))
+            except Exception as e:
+                self.vm_log(f"Error listing base images: {e}")
+        self.run_job("List base images", task)
 
     def run_vm_config(self):
         choice = messagebox.askyesno("Load Config", "Browse for config file?\n(No = Use default 'vm_config.json')")
@@ -196,33 +335,258 @@ class CloudManagerApp(ctk.CTk):
             config_path = filedialog.askopenfilename(title="Select JSON Config", filetypes=[("JSON Files", "*.json")])
             if not config_path: return
         
-        self.log(f"Reading configuration from: {config_path}")
+        self.vm_log(f"Reading configuration from: {config_path}")
         try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-            name = config.get("vm_name", "config_vm")
-            ram = config.get("ram_mb", 2048)
-            cpu = config.get("cpu_cores", 2)
-            disk = config.get("disk_size_gb", 10)
-            iso = config.get("iso_path", "")
+            defaults = {"vm_name": "config_vm", "ram_mb": 2048, "cpu_cores": 2, "disk_size_gb": 10, "iso_path": ""}
+            specs = vm_manager.load_vm_specs(config_path, defaults=defaults)
+
+            # A file with a list of VMs is provisioned as a fleet
+            if len(specs) > 1:
+                self.launch_fleet_thread(specs)
+                return
+
+            config = specs[0]
+            name = config["vm_name"]
+            ram = config["ram_mb"]
+            cpu = config["cpu_cores"]
+            disk = config["disk_size_gb"]
+            iso = config["iso_path"]
+            base = config.get("base_image") or ""
             
-            self.launch_vm_thread(name, str(ram), str(cpu), str(disk), iso)
+            self.launch_vm_thread(name, str(ram), str(cpu), str(disk), iso, base, config.get("headless", False), config.get("vnc"))
         except Exception as e:
-            self.log(f"Config Error: {e}")
+            self.vm_log(f"Config Error: {e}")
+
+    def launch_fleet_thread(self, specs):
+        self.vm_log(f"Starting Fleet Job: {len(specs)} VMs...")
+        def task():
+            try:
+                results = vm_manager.create_fleet(specs, launch=True)
+                for r in results:
+                    if r["error"]:
+                        self.vm_log(f"FAILED {r['name']} after {r['seconds']:.1f}s: {r['error']}")
+                    elif r.get("vm"):
+                        self.vm_log(f"VM Started: {r['name']} (PID {r['vm']['pid']}) -> {r['disk_path']}")
+                    elif r.get("deferred"):
+                        self.vm_log(f"Deferred: {r['name']} does not fit on this host right now -> {r['disk_path']}")
+                    else:
+                        self.vm_log(f"Launch Failed: {r['name']} -> {r['disk_path']}")
+                started = sum(1 for r in results if r.get("vm"))
+                failed = sum(1 for r in results if r["error"])
+                self.vm_log(f"Fleet Done: {started} started, {len(results) - started - failed} not started, {failed} failed.")
+            except Exception as e:
+                self.vm_log(f"Fleet Error: {e}")
+        self.run_job(f"Create fleet of {len(specs)} VMs", task, resource="vm")
 
-    def launch_vm_thread(self, name, ram, cpu, disk, iso):
-        self.log(f"Starting VM Job: {name}...")
+    def launch_vm_thread(self, name, ram, cpu, disk, iso, base="", headless=False, vnc=None):
+        try:
+            ok, reason = capacity.check(int(ram), int(cpu))
+        except Exception as e:
+            self.vm_log(f"VM Error: {e}")
+            return
+        if not ok:
+            self.vm_log(f"ERROR: Not enough host capacity for '{name}'. {reason}")
+            return
+        self.vm_log(f"Starting VM Job: {name}...")
         def task():
             try:
-                disk_path = vm_manager.create_disk(name, int(disk))
+                disk_path = vm_manager.create_disk(name, int(disk), base or None)
                 if disk_path:
-                    self.log(f"Disk Ready: {disk_path}")
-                    iso_path = iso if iso and iso.strip() != "" else None
-                    vm_manager.launch_vm(int(ram), int(cpu), disk_path, iso_path)
-                    self.log("VM Session Ended.")
+                    self.vm_log(f"Disk Ready: {disk_path}")
+                    iso_path = iso if iso and iso.strip() != "" and not base else None
+                    record = vm_manager.launch_vm(int(ram), int(cpu), disk_path, iso_path, name, headless=headless, vnc=vnc)
+                    if record:
+                        self.vm_log(f"VM '{name}' Running (PID {record['pid']}).")
+                        if headless:
+                            self.toggle_console(name)
+                    else:
+                        self.vm_log(f"VM Error: QEMU failed to start '{name}'.")
             except Exception as e:
-                self.log(f"VM Error: {e}")
-        threading.Thread(target=task).start()
+                self.vm_log(f"VM Error: {e}")
+        self.run_job(f"Launch VM {name}", task, resource="vm", key=("vm", name))
+
+    def run_list_running_vms(self):
+        vms = vm_manager.supervisor.list_vms()
+        if not vms:
+            self.vm_log("No VMs are currently running.")
+            return
+        output = [f"{'NAME':<20} {'PID':<8} {'RAM (MB)':<10} {'CPUS':<6} {'UPTIME (min)':<12}"]
+        output.append("-" * 60)
+        for vm in vms:
+            uptime = (time.time() - vm["started_at"]) / 60
+            output.append(f"{vm['name']:<20} {vm['pid']:<8} {vm['ram_mb']:<10} {vm['cpu_cores']:<6} {uptime:<12.1f}")
+        self.vm_log("\n".join(output))
+
+    def run_vm_control(self, action):
+        name = self.entry_vm_target.get().strip()
+        if action not in ("status", "capacity", "inventory") and not name:
+            self.vm_log(">> Error: Enter the name of a running VM.")
+            return
+        if action == "console":
+            self.toggle_console(name)
+            return
+        def task():
+            try:
+                if action == "status":
+                    for vm_name, status in vm_manager.query_all_vms().items():
+                        text = f"ERROR ({status})" if isinstance(status, Exception) else status["status"]
+                        self.vm_log(f"{vm_name:<20} {text}")
+                elif action == "inventory":
+                    vm_manager.inventory.sync_running(vm["name"] for vm in vm_manager.supervisor.list_vms())
+                    vms = vm_manager.inventory.list_vms()
+                    output = [f"{'NAME':<20} {'STATUS':<11} {'LAST RUN':<17} {'BASE IMAGE':<20}"]
+                    output.append("-" * 70)
+                    for vm in vms:
+                        last_run = time.strftime("%Y-%m-%d %H:%M", time.localtime(vm["last_run_at"])) if vm["last_run_at"] else "never"
+                        base = os.path.basename(vm["base_image"]) if vm["base_image"] else "-"
+                        output.append(f"{vm['name']:<20} {vm['status']:<11} {last_run:<17} {base:<20}")
+                    self.vm_log("\n".join(output) if vms else "Inventory is empty.")
+                elif action == "capacity":
+                    host = capacity.host_capacity()
+                    limit = capacity.limits(host)
+                    used = capacity.allocated()
+                    self.vm_log(f"Host: {host['ram_total_mb']} MB RAM, {host['cpu_cores']} cores, KVM {'yes' if host['kvm'] else 'no'}")
+                    self.vm_log(f"Allocated to {used['vms']} VMs: {used['ram_mb']}/{limit['ram_mb']} MB RAM, {used['cpu_cores']}/{limit['cpu_cores']} vCPUs")
+                elif action == "stats":
+                    for cpu in vm_manager.vm_cpu_stats(name):
+                        used = f"{cpu['cpu_seconds']:.1f}s" if cpu["cpu_seconds"] is not None else "n/a"
+                        self.vm_log(f"{name} vCPU {cpu['cpu_index']}: {used} CPU time")
+                    for dev in vm_manager.vm_blockstats(name):
+                        st = dev["stats"]
+                        self.vm_log(f"{name} disk {dev.get('device') or dev.get('qdev', '?')}: "
+                                 f"read {st['rd_bytes'] / 1024 ** 2:.1f} MB, written {st['wr_bytes'] / 1024 ** 2:.1f} MB")
+                else:
+                    {"pause": vm_manager.pause_vm, "resume": vm_manager.resume_vm, "shutdown": vm_manager.powerdown_vm}[action](name)
+                    self.vm_log(f"Sent '{action}' to VM '{name}'.")
+            except KeyError as e:
+                self.vm_log(f"Error: {e.args[0]}")
+            except Exception as e:
+                self.vm_log(f"QMP Error: {e}")
+        self.run_job(f"VM {action} {name}".strip(), task)
+
+    def toggle_console(self, name):
+        """Starts or stops streaming a headless VM's serial console into the log."""
+        stream = self.console_streams.pop(name, None)
+        if stream:
+            stream.cancel()
+            self.vm_log(f"Stopped console of '{name}'.")
+            return
+        vm = vm_manager.supervisor.get(name)
+        if not vm:
+            self.vm_log(f"Error: No running VM named '{name}'")
+            return
+        try:
+            stream = vm_manager.vm_console.stream_console(vm, lambda line: self.log(f"[{name}] {line}", "Console"))
+        except ValueError as e:
+            self.vm_log(f"Error: {e}")
+            return
+        self.console_streams[name] = stream
+
+        def on_done(f):
+            if self.console_streams.get(name) is f:
+                del self.console_streams[name]
+            if not f.cancelled():
+                error = f.exception()
+                self.vm_log(f"Console of '{name}' closed{f': {error}' if error else '.'}")
+        stream.add_done_callback(on_done)
+        self.vm_log(f"Streaming console of '{name}' (press Console again to stop)...")
+
+    def run_disk_report(self):
+        def task():
+            try:
+                entries = storage_maintenance.image_report()
+                if not entries:
+                    self.vm_log("No disk images found.")
+                    return
+                output = [f"{'IMAGE':<30} {'ACTUAL':<12} {'VIRTUAL':<12}"]
+                output.append("-" * 55)
+                for e in entries:
+                    if e["error"]:
+                        output.append(f"{os.path.basename(e['path']):<30} ERROR: {e['error']}")
+                        continue
+                    output.append(f"{os.path.basename(e['path']):<30} {storage_maintenance.format_size(e['actual_bytes']):<12} "
+                                  f"{storage_maintenance.format_size(e['virtual_bytes']):<12}")
+                self.vm_log("\n".join(output))
+            except Exception as e:
+                self.vm_log(f"Disk Report Error: {e}")
+        self.run_job("Disk usage report", task)
+
+    def run_disk_compaction(self):
+        compress = bool(self.check_compress_cold.get())
+        def report(job):
+            if job.status == "done":
+                before, after = job.result
+                self.vm_log(f"{job.name}: {storage_maintenance.format_size(before)} -> {storage_maintenance.format_size(after)}")
+            elif job.status == "failed":
+                self.vm_log(f"{job.name} FAILED: {job.error}")
+            else:
+                self.vm_log(f"{job.name} {job.status}.")
+
+        def task():
+            try:
+                plain, cold, skipped = storage_maintenance.plan_compaction(compress_cold=compress)
+                for path, reason in skipped.items():
+                    self.vm_log(f"Skipped {os.path.basename(path)}: {reason}")
+                # Each image is its own "disk" job; results are logged as they finish
+                jobs = storage_maintenance.runner.submit(plain, on_done=report)
+                jobs += storage_maintenance.runner.submit(cold, compress=True, on_done=report)
+                self.vm_log(f"Compacting {len(jobs)} idle disk(s) in the background"
+                            + (f" ({len(cold)} cold, compressed)..." if compress else "..."))
+            except Exception as e:
+                self.vm_log(f"Compaction Error: {e}")
+        self.run_job("Plan disk compaction", task)
+
+    def run_vm_snapshot(self, action):
+        name = self.entry_vm_target.get().strip()
+        tag = self.entry_snapshot.get().strip() or vm_snapshots.Default_Tag
+        if not name:
+            self.vm_log(">> Error: Enter the VM name.")
+            return
+        def task():
+            try:
+                if action == "list":
+                    snaps = vm_snapshots.list_snapshots(name)
+                    for snap in snaps:
+                        kind = "live" if snap.get("vm-state-size", 0) > 0 else "disk only"
+                        self.vm_log(f"{name} snapshot: {snap['name']} ({kind})")
+                    if not snaps:
+                        self.vm_log(f"VM '{name}' has no snapshots.")
+                elif action == "create":
+                    vm_snapshots.create_snapshot(name, tag)
+                    self.vm_log(f"Snapshot '{tag}' created for '{name}'.")
+                elif action == "revert":
+                    vm_snapshots.revert_snapshot(name, tag)
+                    self.vm_log(f"VM '{name}' reverted to '{tag}'.")
+                elif action == "delete":
+                    vm_snapshots.delete_snapshot(name, tag)
+                    self.vm_log(f"Snapshot '{tag}' deleted from '{name}'.")
+                elif action == "reset":
+                    result = vm_snapshots.reset_to_snapshot(name, tag)
+                    self.vm_log(f"VM '{name}' reset to '{tag}' ({result}).")
+            except KeyError as e:
+                self.vm_log(f"Error: {e.args[0]}")
+            except Exception as e:
+                self.vm_log(f"Snapshot Error: {e}")
+        self.run_job(f"Snapshot {action} {name}", task, resource="vm")
+
+    def run_vm_stop(self, force=False):
+        name = self.entry_vm_target.get().strip()
+        if not name:
+            self.vm_log(">> Error: Enter the name of a running VM.")
+            return
+        self.vm_log(f"{'Killing' if force else 'Stopping'} VM '{name}'...")
+        def task():
+            try:
+                if force:
+                    stopped = vm_manager.supervisor.kill(name)
+                else:
+                    stopped = vm_manager.supervisor.stop(name)
+                self.vm_log(f"VM '{name}' Stopped." if stopped else f"VM '{name}' is still shutting down.")
+            except KeyError as e:
+                self.vm_log(f"Error: {e.args[0]}")
+            except Exception as e:
+                self.vm_log(f"VM Error: {e}")
+        self.run_job(f"{'Kill' if force else 'Stop'} VM {name}", task, key=("vm-stop", name))
 
     # =====================================================
     # VIEW: DOCKER
@@ -236,6 +600,17 @@ class CloudManagerApp(ctk.CTk):
         self.main_area.grid_rowconfigure(0, weight=1)
         self.main_area.grid_columnconfigure(0, weight=1)
 
+        # Which Docker host every tab works on
+        host_bar = ctk.CTkFrame(self.docker_frame, fg_color="transparent")
+        host_bar.pack(fill="x", padx=20, pady=(10, 0))
+        ctk.CTkLabel(host_bar, text="Docker Host:", font=self.font_body).pack(side="left", padx=(0, 10))
+        self.docker_host = ctk.CTkOptionMenu(host_bar, values=docker_hosts.hosts.names(), width=200, font=self.font_body, command=self.select_docker_host)
+        self.docker_host.set(docker_hosts.hosts.active)
+        self.docker_host.pack(side="left")
+        self.entry_new_host = ctk.CTkEntry(host_bar, placeholder_text="name=tcp://10.0.0.5:2375", width=320, height=40, font=self.font_body)
+        self.entry_new_host.pack(side="left", padx=10)
+        ctk.CTkButton(host_bar, text="Add Host", width=140, height=40, font=self.font_button, command=self.add_docker_host).pack(side="left")
+
         # 2. Create the Tabs
         self.docker_tabs = ctk.CTkTabview(self.docker_frame)
         self.docker_tabs.pack(fill="both", expand=True, padx=20, pady=10)
@@ -249,6 +624,9 @@ class CloudManagerApp(ctk.CTk):
         tab_create = self.docker_tabs.add("Create File")
         tab_build = self.docker_tabs.add("Build Image")
         tab_search = self.docker_tabs.add("Search")
+        tab_stacks = self.docker_tabs.add("Stacks")
+        tab_bulk = self.docker_tabs.add("Bulk")
+        tab_cleanup = self.docker_tabs.add("Cleanup")
 
         # ==========================================
         # TAB 1: MANAGE (List, Run, Stop)
@@ -259,7 +637,12 @@ class CloudManagerApp(ctk.CTk):
         btn_frame = ctk.CTkFrame(tab_manage, fg_color="transparent")
         btn_frame.pack(fill="x", padx=100)
         ctk.CTkButton(btn_frame, text="List All Images", height=50, font=self.font_button, command=self.run_docker_list_images).pack(side="left", fill="x", expand=True, padx=10)
+        self.image_sort = ctk.CTkOptionMenu(btn_frame, values=["Newest", "Largest", "Name"], width=120, height=50, font=self.font_body)
+        self.image_sort.pack(side="left", padx=(0, 10))
         ctk.CTkButton(btn_frame, text="List Running Containers", height=50, font=self.font_button, command=self.run_docker_list_containers).pack(side="left", fill="x", expand=True, padx=10)
+        ctk.CTkButton(btn_frame, text="Resource Usage", height=50, font=self.font_button, command=self.run_docker_stats).pack(side="left", fill="x", expand=True, padx=10)
+        self.stats_window = ctk.CTkOptionMenu(btn_frame, values=["1m", "5m", "15m"], width=80, height=50, font=self.font_body)
+        self.stats_window.pack(side="left", padx=(0, 10))
         
         ctk.CTkFrame(tab_manage, height=2, fg_color="gray").pack(fill="x", pady=20, padx=50) # Separator
 
@@ -317,6 +700,7 @@ class CloudManagerApp(ctk.CTk):
         right_col.grid_rowconfigure(2, weight=1)
 
         ctk.CTkButton(right_col, text="SAVE\nDOCKERFILE", height=80, font=self.font_button, fg_color="#27AE60", hover_color="#1E8449", command=self.save_dockerfile).grid(row=1, column=0, sticky="ew", padx=10)
+        ctk.CTkButton(right_col, text="CHECK\nDOCKERFILE", height=80, font=self.font_button, command=self.run_dockerfile_check).grid(row=2, column=0, sticky="new", padx=10, pady=20)
 
         # ==========================================
         # TAB 3: BUILD IMAGE
@@ -331,6 +715,19 @@ class CloudManagerApp(ctk.CTk):
         self.entry_build_path.pack(fill="x", padx=150, pady=10)
         self.entry_build_path.insert(0, ".") 
 
+        ctk.CTkLabel(tab_build, text="Build Args / Cache Images (optional):", font=self.font_header).pack(pady=(20,5))
+        build_opts = ctk.CTkFrame(tab_build, fg_color="transparent")
+        build_opts.pack(fill="x", padx=150, pady=10)
+        self.entry_build_args = ctk.CTkEntry(build_opts, placeholder_text="e.g. VERSION=1.2, DEBUG=0", height=50, font=self.font_body)
+        self.entry_build_args.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.entry_cache_from = ctk.CTkEntry(build_opts, placeholder_text="e.g. my-app:v1", height=50, font=self.font_body)
+        self.entry_cache_from.pack(side="left", fill="x", expand=True)
+
+        context_btns = ctk.CTkFrame(tab_build, fg_color="transparent")
+        context_btns.pack(fill="x", padx=150, pady=(20, 0))
+        ctk.CTkButton(context_btns, text="Analyze Context", height=50, font=self.font_button, command=self.run_context_analysis).pack(side="left", fill="x", expand=True, padx=(0, 10))
+        ctk.CTkButton(context_btns, text="Write Suggested .dockerignore", height=50, font=self.font_button, command=lambda: self.run_context_analysis(write=True)).pack(side="left", fill="x", expand=True)
+
         ctk.CTkButton(tab_build, text="BUILD IMAGE", height=60, font=self.font_button, fg_color="#8E44AD", hover_color="#71368A", command=self.run_docker_build).pack(pady=30, fill="x", padx=150)
 
         # ==========================================
@@ -340,7 +737,7 @@ class CloudManagerApp(ctk.CTk):
         
         # Search Section
         ctk.CTkLabel(tab_search, text="Search Query:", font=self.font_header).pack(pady=(10,5))
-        self.entry_search = ctk.CTkEntry(tab_search, placeholder_text="e.g. python, nginx", height=50, font=self.font_body)
+        self.entry_search = ctk.CTkEntry(tab_search, placeholder_text="e.g. python, nginx (local: pyth* = starts with)", height=50, font=self.font_body)
         self.entry_search.pack(fill="x", padx=150, pady=10)
         
         # --- FIX 2: MOVE LOCAL SEARCH HERE ---
@@ -356,128 +753,250 @@ class CloudManagerApp(ctk.CTk):
 
         # Pull Section
         ctk.CTkLabel(tab_search, text="Image Name to Pull:", font=self.font_header).pack(pady=(10,5))
-        self.entry_pull = ctk.CTkEntry(tab_search, placeholder_text="e.g. ubuntu:latest", height=50, font=self.font_body)
+        self.entry_pull = ctk.CTkEntry(tab_search, placeholder_text="e.g. ubuntu:latest nginx redis:7", height=50, font=self.font_body)
         self.entry_pull.pack(fill="x", padx=150, pady=10)
         
         # Pull Button is now alone at the bottom
         ctk.CTkButton(tab_search, text="Pull Image", width=200, height=50, font=self.font_button, command=self.run_docker_pull).pack(pady=10)
 
+        # ==========================================
+        # TAB 5: STACKS
+        # ==========================================
+        ctk.CTkLabel(tab_stacks, text="Multi-Container Stacks", font=self.font_title).pack(pady=20)
+
+        ctk.CTkLabel(tab_stacks, text="Stack File (JSON or YAML):", font=self.font_header).pack(pady=(10, 5))
+        stack_file_frame = ctk.CTkFrame(tab_stacks, fg_color="transparent")
+        stack_file_frame.pack(fill="x", padx=150, pady=10)
+        self.entry_stack_file = ctk.CTkEntry(stack_file_frame, placeholder_text="Path to stack file (default: stack_config.json)", height=50, font=self.font_body)
+        self.entry_stack_file.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        ctk.CTkButton(stack_file_frame, text="Browse", width=120, height=50, font=self.font_button, command=self.browse_stack_file).pack(side="left")
+        ctk.CTkButton(tab_stacks, text="DEPLOY STACK", width=220, height=60, font=self.font_button, fg_color="green", command=self.run_stack_deploy).pack(pady=10)
+
+        ctk.CTkFrame(tab_stacks, height=2, fg_color="gray").pack(fill="x", pady=20, padx=50)
+
+        ctk.CTkLabel(tab_stacks, text="Deployed Stack:", font=self.font_header).pack(pady=(10, 5))
+        stack_name_frame = ctk.CTkFrame(tab_stacks, fg_color="transparent")
+        stack_name_frame.pack(fill="x", padx=150, pady=10)
+        self.entry_stack_name = ctk.CTkEntry(stack_name_frame, placeholder_text="Stack name", height=50, font=self.font_body)
+        self.entry_stack_name.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        ctk.CTkButton(stack_name_frame, text="List Stacks", width=150, height=50, font=self.font_button, command=self.run_stack_list).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(stack_name_frame, text="TEAR DOWN", width=150, height=50, font=self.font_button, fg_color="#C0392B", hover_color="#922B21", command=self.run_stack_teardown).pack(side="left")
+
+        # ==========================================
+        # TAB 6: BULK OPERATIONS
+        # ==========================================
+        ctk.CTkLabel(tab_bulk, text="Bulk Container Operations", font=self.font_title).pack(pady=20)
+
+        ctk.CTkLabel(tab_bulk, text="Select Containers (empty filters are skipped):", font=self.font_header).pack(pady=(10, 5))
+        filter_frame = ctk.CTkFrame(tab_bulk, fg_color="transparent")
+        filter_frame.pack(fill="x", padx=100, pady=10)
+        self.entry_bulk_name = ctk.CTkEntry(filter_frame, placeholder_text="Name glob (e.g. web-*)", height=50, font=self.font_body)
+        self.entry_bulk_name.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.entry_bulk_label = ctk.CTkEntry(filter_frame, placeholder_text="Label (key or key=value)", height=50, font=self.font_body)
+        self.entry_bulk_label.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        self.entry_bulk_image = ctk.CTkEntry(filter_frame, placeholder_text="Image (e.g. redis, myapp:*)", height=50, font=self.font_body)
+        self.entry_bulk_image.pack(side="left", fill="x", expand=True)
+
+        action_frame = ctk.CTkFrame(tab_bulk, fg_color="transparent")
+        action_frame.pack(pady=10)
+        self.bulk_action = ctk.CTkOptionMenu(action_frame, values=list(container_ops.Actions), width=150, height=50, font=self.font_body)
+        self.bulk_action.pack(side="left", padx=10)
+        self.entry_bulk_timeout = ctk.CTkEntry(action_frame, placeholder_text=f"Grace period (s), default {container_ops.Default_Timeout}", width=260, height=50, font=self.font_body)
+        self.entry_bulk_timeout.pack(side="left", padx=10)
+        self.entry_bulk_workers = ctk.CTkEntry(action_frame, placeholder_text=f"At a time, default {container_ops.Bulk_Workers}", width=200, height=50, font=self.font_body)
+        self.entry_bulk_workers.pack(side="left", padx=10)
+        ctk.CTkButton(action_frame, text="Dry Run", width=150, height=50, font=self.font_button, command=lambda: self.run_bulk_containers(dry_run=True)).pack(side="left", padx=10)
+        ctk.CTkButton(action_frame, text="APPLY", width=150, height=50, font=self.font_button, fg_color="#C0392B", hover_color="#922B21", command=self.run_bulk_containers).pack(side="left", padx=10)
+
+        # ==========================================
+        # TAB 7: CLEANUP (image and build cache GC)
+        # ==========================================
+        ctk.CTkLabel(tab_cleanup, text="Image & Build Cache Cleanup", font=self.font_title).pack(pady=20)
+
+        policy_frame = ctk.CTkFrame(tab_cleanup, fg_color="transparent")
+        policy_frame.pack(pady=10)
+        ctk.CTkLabel(policy_frame, text="Keep newest tags per repo:", font=self.font_body).grid(row=0, column=0, padx=10, pady=10, sticky="e")
+        self.entry_gc_keep = ctk.CTkEntry(policy_frame, width=120, height=40, font=self.font_body)
+        self.entry_gc_keep.insert(0, str(docker_gc.Keep_Tags))
+        self.entry_gc_keep.grid(row=0, column=1, padx=10, pady=10)
+        ctk.CTkLabel(policy_frame, text="Prune build cache unused for (days):", font=self.font_body).grid(row=1, column=0, padx=10, pady=10, sticky="e")
+        self.entry_gc_days = ctk.CTkEntry(policy_frame, width=120, height=40, font=self.font_body)
+        self.entry_gc_days.insert(0, str(docker_gc.Build_Cache_Days))
+        self.entry_gc_days.grid(row=1, column=1, padx=10, pady=10)
+        self.check_gc_dangling = ctk.CTkCheckBox(policy_frame, text="Delete dangling images", font=self.font_body)
+        self.check_gc_dangling.select()
+        self.check_gc_dangling.grid(row=2, column=0, columnspan=2, pady=10)
+
+        gc_btn_frame = ctk.CTkFrame(tab_cleanup, fg_color="transparent")
+        gc_btn_frame.pack(pady=10)
+        ctk.CTkButton(gc_btn_frame, text="Dry Run", width=200, height=50, font=self.font_button, command=lambda: self.run_docker_gc(dry_run=True)).pack(side="left", padx=10)
+        ctk.CTkButton(gc_btn_frame, text="CLEAN UP", width=200, height=50, font=self.font_button, fg_color="#C0392B", hover_color="#922B21", command=self.run_docker_gc).pack(side="left", padx=10)
+
     # --- DOCKER LOGIC ---
+    def select_docker_host(self, name):
+        docker_hosts.hosts.set_active(name)
+        self.docker_log(f"Docker host: {name} ({docker_hosts.hosts.url(name)})")
+        def task():
+            try:
+                version = docker_manager.get_client(name).version().get("Version", "?")
+                self.docker_log(f"Connected to '{name}', Docker {version}.")
+            except Exception as e:
+                self.docker_log(f"Error: {e}")
+        self.run_job(f"Connect to {name}", task, key=("connect", name))
+
+    def add_docker_host(self):
+        text = self.entry_new_host.get().strip()
+        if "=" not in text:
+            self.docker_log(">> Error: Enter the host as name=tcp://address:port")
+            return
+        name, url = (part.strip() for part in text.split("=", 1))
+        try:
+            docker_hosts.hosts.add(name, url)
+        except ValueError as e:
+            self.docker_log(f">> Error: {e}")
+            return
+        self.entry_new_host.delete(0, "end")
+        self.docker_host.configure(values=docker_hosts.hosts.names())
+        self.docker_host.set(name)
+        self.select_docker_host(name)
+
     def run_docker_list_images(self):
+        sort_by = {"Newest": "created", "Largest": "size", "Name": "name"}[self.image_sort.get()]
+        host = docker_hosts.hosts.active
         def task():
             try:
-                self.log(">> Fetching & Sorting Images...")
-                if not self.docker_client:
-                    self.log("Error: Docker not connected.")
+                # The index is only fetched from the daemon the first time
+                rows = docker_manager.get_image_index(host).rows(sort_by)
+                if not rows:
+                    self.docker_log("No images found. Try pulling one first!")
                     return
+                self.docker_log("\n".join(docker_manager.format_image_rows(rows)))
 
-                # 1. Fetch
-                images = self.docker_client.images.list()
-                
-                # 2. Force Refresh & Sort (Newest Date First)
-                # We handle cases where 'Created' might be missing
-                images.sort(key=lambda x: x.attrs.get('Created', ''), reverse=True)
+            except Exception as e:
+                self.docker_log(f"Error listing images: {e}")
 
-                output = [f"{'REPOSITORY':<30} {'TAG':<15} {'ID':<12} {'SIZE (MB)':<10}"]
-                output.append("-" * 75)
-                
-                for img in images:
-                    # Calculate Size
-                    size_mb = f"{img.attrs['Size'] / (1024 * 1024):.1f}"
-                    short_id = img.short_id.split(":")[1][:12]
-                    
-                    # Handle Tags
-                    tags = img.tags if img.tags else ["<none>:<none>"]
-                    for tag in tags:
-                        try:
-                            if ":" in tag:
-                                repo, version = tag.split(":", 1)
-                            else:
-                                repo, version = tag, "latest"
-                        except:
-                            repo, version = tag, ""
-                        
-                        output.append(f"{repo:<30} {version:<15} {short_id:<12} {size_mb:<10}")
-                
-                self.log("\n".join(output))
+        self.run_job("List images", task)
+
+    def run_docker_list_containers(self):
+        host = docker_hosts.hosts.active
+        def task():
+            try:
+                # Kept current by Docker events, so this never polls the daemon
+                lines = docker_manager.get_container_state(host).render()
+                if len(lines) <= 2:
+                    self.docker_log("No running containers.")
+                    return
+                self.docker_log("\n".join(lines))
 
             except Exception as e:
-                self.log(f"Error listing images: {e}")
+                self.docker_log(f"Error fetching containers: {e}")
 
-        threading.Thread(target=task, daemon=True).start()
+        self.run_job("List containers", task)
 
-    def run_docker_list_containers(self):
-        self.log("Fetching Running Containers...")
-        try:
-            # 1. Get list from Docker
-            containers = self.docker_client.containers.list()
-            
-            if not containers:
-                self.log("No running containers.")
-                return
 
-            # 2. Print Header
-            self.log(f"{'ID':<12} {'NAME':<20} {'IMAGE':<20} {'STATUS':<15}")
-            self.log("-" * 70)
+    def run_docker_stats(self):
+        window = self.stats_window.get()
+        host = docker_hosts.hosts.active
+        def task():
+            try:
+                collector = docker_manager.get_metrics_collector(host)
+                rows = collector.report(window)
+                if not rows:
+                    # Sampling was just started; give it a moment for the first samples
+                    time.sleep(2)
+                    rows = collector.report(window)
+                if not rows:
+                    self.docker_log("No running containers.")
+                    return
+                self.docker_log("\n".join(docker_manager.format_metrics_rows(rows, window)))
 
-            # 3. Print Rows
-            for container in containers:
-                cid = container.short_id
-                name = container.name
-                status = container.status
-                
-                # Get image name (handle cases where tag is missing)
-                image = container.image.tags[0] if container.image.tags else "image_id"
-                if len(image) > 18: image = image[:15] + "..." # Shorten if too long
-                
-                # Log the row to the GUI
-                self.log(f"{cid:<12} {name:<20} {image:<20} {status:<15}")
-                
-        except Exception as e:
-            self.log(f"Error fetching containers: {e}")
+            except Exception as e:
+                self.docker_log(f"Error reading container stats: {e}")
 
+        self.run_job("Container stats", task)
 
     def run_docker_run(self):
         image = self.entry_run_image.get().strip()
         name = self.entry_run_name.get().strip()
         
         if not image:
-            self.log(">> Error: Image Name is required.")
+            self.docker_log(">> Error: Image Name is required.")
             return
+        host = docker_hosts.hosts.active
 
         def task():
             try:
-                self.log(f">> Running '{image}'...")
+                self.docker_log(f">> Running '{image}'...")
                 # detach=True runs it in background
                 args = {"image": image, "detach": True}
                 if name: args["name"] = name
                 
-                container = self.docker_client.containers.run(**args)
+                container = docker_manager.get_client(host).containers.run(**args)
                 
-                self.log(f">> SUCCESS! Started: {container.name} ({container.short_id[:10]})")
-                self.log(">> (Go to 'List Running Containers' to check status)")
+                self.docker_log(f">> SUCCESS! Started: {container.name} ({container.short_id[:10]})")
+                self.docker_log(">> (Go to 'List Running Containers' to check status)")
 
             except Exception as e:
-                self.log(f">> Run Failed: {e}")
+                self.docker_log(f">> Run Failed: {e}")
 
-        threading.Thread(target=task).start()
+        self.run_job(f"Run {image}", task, resource="docker")
 
 
     def run_docker_stop(self):
-        cid = self.entry_stop_id.get()
+        cid = self.entry_stop_id.get().strip()
         if not cid: return
-        self.log(f"Stopping {cid}...")
+        host = docker_hosts.hosts.active
+
+        def task():
+            self.docker_log(f"Stopping {cid}...")
+            try:
+                docker_manager.get_client(host).api.stop(cid, timeout=container_ops.Default_Timeout)
+                self.docker_log("Container Stopped.")
+            except Exception as e:
+                self.docker_log(f"Error: {e}")
+
+        self.run_job(f"Stop container {cid}", task, resource="docker", key=("stop", host, cid))
+
+    def run_bulk_containers(self, dry_run=False):
+        action = self.bulk_action.get()
+        name = self.entry_bulk_name.get().strip() or None
+        label = self.entry_bulk_label.get().strip() or None
+        image = self.entry_bulk_image.get().strip() or None
+        if not (name or label or image):
+            self.docker_log("Error: Give at least one filter.")
+            return
         try:
-            docker_manager.client.containers.get(cid).stop()
-            self.log("Container Stopped.")
-        except Exception as e:
-            self.log(f"Error: {e}")
+            timeout = int(self.entry_bulk_timeout.get().strip() or container_ops.Default_Timeout)
+            workers = int(self.entry_bulk_workers.get().strip() or container_ops.Bulk_Workers)
+        except ValueError:
+            self.docker_log("Error: The grace period and containers at a time must be numbers.")
+            return
+        if not dry_run and not messagebox.askyesno("Bulk Operation", f"{action.capitalize()} every matching container?"):
+            return
+        # Selection and actions both go to this host, even if another one is picked meanwhile
+        host = docker_hosts.hosts.active
+
+        def task():
+            try:
+                containers = container_ops.select_containers(name, label, image, include_stopped=(action == "remove"), host=host)
+                if not containers:
+                    self.docker_log("No containers match.")
+                    return
+                started = time.perf_counter()
+                results = container_ops.bulk_action(action, containers, timeout=timeout, max_workers=workers,
+                                                    dry_run=dry_run, on_line=self.docker_log, host=host)
+                if not dry_run:
+                    self.docker_log(f">> {container_ops.bulk_summary(action, results, time.perf_counter() - started)}")
+            except Exception as e:
+                self.docker_log(f"Error: {e}")
+
+        self.run_job(f"Bulk {action}" + (" (dry run)" if dry_run else ""), task, resource="docker")
 
     def run_save_dockerfile(self):
         project = self.entry_project_name.get()
         content = self.text_dockerfile.get("1.0", "end-1c")
         if not project:
-            self.log("Error: Enter a project name.")
+            self.docker_log("Error: Enter a project name.")
             return
         full_path = os.path.join(docker_manager.DOCKER_HOME, project)
         if not os.path.exists(full_path):
@@ -486,9 +1005,9 @@ class CloudManagerApp(ctk.CTk):
         try:
             with open(file_path, "w") as f:
                 f.write(content)
-            self.log(f"Saved Dockerfile to: {file_path}")
+            self.docker_log(f"Saved Dockerfile to: {file_path}")
         except Exception as e:
-            self.log(f"Error saving: {e}")
+            self.docker_log(f"Error saving: {e}")
 
     def run_docker_build(self):
         # 1. Get Inputs
@@ -496,109 +1015,270 @@ class CloudManagerApp(ctk.CTk):
         path = self.entry_build_path.get().strip()
 
         if not tag or not path:
-            self.log(">> Error: Missing Tag or Path.")
+            self.docker_log(">> Error: Missing Tag or Path.")
             return
         
         if not os.path.exists(os.path.join(path, "Dockerfile")):
-            self.log(f">> Error: No Dockerfile found in {path}")
+            self.docker_log(f">> Error: No Dockerfile found in {path}")
             return
 
+        buildargs = docker_manager.parse_key_values(self.entry_build_args.get())
+        cache_from = [c.strip() for c in self.entry_cache_from.get().split(",") if c.strip()]
+        host = docker_hosts.hosts.active
+
         def task():
             try:
-                self.log(f">> Building '{tag}'... Please wait.")
+                report = build_context.analyze_context(path)
+                self.docker_log(f">> Building '{tag}'... {build_context.format_context_report(report)[0]}")
+                if report["suggestions"]:
+                    self.docker_log(">> Tip: 'Analyze Context' shows what could go into .dockerignore.")
                 
-                # FIX: Use High-Level API (Stricter & Safer)
-                # This waits until finished, then returns the image object
-                image, logs = self.docker_client.images.build(path=path, tag=tag)
+                # Low-level API: every log line shows up while the build runs
+                result = docker_manager.stream_build(path, tag, buildargs, cache_from, on_line=self.docker_log, host=host)
+                self.docker_log("\n".join(docker_manager.build_summary(result)))
                 
                 # Check if it actually worked
-                if image:
-                    short_id = image.short_id.split(":")[1][:10]
-                    self.log(f">> SUCCESS! Built Image ID: {short_id}")
-                    self.log(f">> Tagged as: {tag}")
-                    self.log(">> (Go to 'Manage' -> 'List All Images' to see it)")
+                if result["error"]:
+                    self.docker_log(f">> Build Failed: {result['error']}")
+                elif result["image_id"]:
+                    short_id = result["image_id"].split(":")[-1][:10]
+                    self.docker_log(f">> SUCCESS! Built Image ID: {short_id}")
+                    self.docker_log(f">> Tagged as: {tag}")
+                    self.docker_log("\n".join(dockerfile_analyzer.format_layer_report(dockerfile_analyzer.layer_report(docker_manager.get_client(host), result["image_id"]))))
+                    self.docker_log(">> (Go to 'Manage' -> 'List All Images' to see it)")
                 
             except Exception as e:
-                self.log(f">> Build Failed: {e}")
+                self.docker_log(f">> Build Failed: {e}")
+
+        self.run_job(f"Build {tag}", task, resource="build", key=("build", host, tag))
+
+    def run_dockerfile_check(self):
+        content = self.text_dockerfile.get("0.0", "end").strip()
+        if not content:
+            self.docker_log(">> Error: Dockerfile content is empty.")
+            return
+        self.docker_log(">> Dockerfile check:\n" + "\n".join(dockerfile_analyzer.format_findings(dockerfile_analyzer.lint_dockerfile(content))))
+
+    def run_context_analysis(self, write=False):
+        path = self.entry_build_path.get().strip()
+        if not path or not os.path.isdir(path):
+            self.docker_log(f">> Error: '{path}' is not a directory.")
+            return
+
+        def task():
+            try:
+                report = build_context.analyze_context(path)
+                self.docker_log("\n".join(build_context.format_context_report(report)))
+                if write:
+                    added = build_context.write_dockerignore(path, [s["pattern"] for s in report["suggestions"]])
+                    self.docker_log(f">> Added {len(added)} entr{'y' if len(added) == 1 else 'ies'} to {os.path.join(path, '.dockerignore')}")
+            except Exception as e:
+                self.docker_log(f">> Context analysis failed: {e}")
 
-        threading.Thread(target=task).start()
+        self.run_job(f"Analyze context {os.path.basename(os.path.abspath(path))}", task)
 
     def run_docker_search(self):
         term = self.entry_search.get()
-        self.log(f"Searching DockerHub for '{term}'...")
-        try:
-            results = docker_manager.client.images.search(term)
-            for r in results[:4]:
-                self.log(f"Hub Found: {r['name']} ({r['star_count']} stars)")
-        except Exception as e:
-            self.log(f"Error: {e}")
+        self.docker_log(f"Searching DockerHub for '{term}'...")
+        host = docker_hosts.hosts.active
+        def task():
+            try:
+                results = docker_manager.search_hub(term, host)
+                for r in results[:4]:
+                    self.docker_log(f"Hub Found: {r['name']} ({r['star_count']} stars)")
+            except Exception as e:
+                self.docker_log(f"Error: {e}")
+        self.run_job(f"Search Docker Hub '{term}'", task)
 
     def run_docker_search_local(self):
-        # 1. Get the search term
+        # 1. Get the search term ('pyth*' means "starts with")
         term = self.entry_search.get().strip().lower()
         
         if not term:
-            self.log(">> Please type a name to search locally.")
+            self.docker_log(">> Please type a name to search locally.")
             return
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        host = docker_hosts.hosts.active
 
         def thread_target():
             try:
-                self.log(f">> Searching local repositories for '{term}'...")
-                images = self.docker_client.images.list()
-                
-                # Table Header
-                output = [f"{'REPOSITORY':<25} {'TAG':<15} {'ID':<12} {'SIZE (MB)':<10}"]
-                output.append("-" * 70)
-                
-                found_count = 0
-                for img in images:
-                    tags = img.tags if img.tags else ["<none>:<none>"]
-                    for tag in tags:
-                        # Split into Repo and Version
-                        try:
-                            repo, version = tag.split(":")
-                        except:
-                            repo, version = tag, "<none>"
-                            
-                        # --- THE FIX: STRICT CHECK ---
-                        # Only check if 'term' is inside the 'repo' variable.
-                        # We ignore the 'version' variable.
-                        if term in repo.lower():
-                            short_id = img.short_id.split(":")[1][:12]
-                            size_mb = f"{img.attrs['Size'] / (1024 * 1024):.1f}"
-                            
-                            output.append(f"{repo:<25} {version:<15} {short_id:<12} {size_mb:<10}")
-                            found_count += 1
-                
-                if found_count == 0:
-                    self.log(f">> No local repositories found matching: '{term}'")
+                rows = docker_manager.get_image_index(host).search(term, prefix=prefix, field="both")
+                if not rows:
+                    self.docker_log(f">> No local images found matching: '{term}'")
                 else:
-                    self.log("\n".join(output))
+                    self.docker_log("\n".join(docker_manager.format_image_rows(rows)))
 
             except Exception as e:
-                self.log(f"Error searching local: {e}")
+                self.docker_log(f"Error searching local: {e}")
 
-        threading.Thread(target=thread_target, daemon=True).start()
+        self.run_job(f"Search local images '{term}'", thread_target)
 
     def run_docker_pull(self):
-        img = self.entry_pull.get()
-        self.log(f"Pulling {img}...")
+        refs = self.entry_pull.get().replace(",", " ").split()
+        if not refs:
+            self.docker_log(">> Error: Enter one or more image names.")
+            return
+        self.docker_log(f"Pulling {', '.join(refs)}...")
+        host = docker_hosts.hosts.active
         def task():
             try:
-                docker_manager.client.images.pull(img)
-                self.log("Pull Complete.")
+                results = docker_manager.pull_images(refs, on_line=self.docker_log, host=host)
+                for r in results:
+                    if r["error"]:
+                        self.docker_log(f"Pull Failed: {r['ref']}: {r['error']}")
+                    else:
+                        self.docker_log(f"Pull {r['status'].title()}: {r['ref']} ({r['seconds']:.1f}s)")
+                self.docker_log("Pull Complete.")
             except Exception as e:
-                self.log(f"Error: {e}")
-        threading.Thread(target=task).start()
+                self.docker_log(f"Error: {e}")
+        self.run_job(f"Pull {', '.join(refs)}", task, resource="pull", key=("pull", host, tuple(refs)))
 
     # --- NAVIGATION ---
+    def run_docker_gc(self, dry_run=False):
+        try:
+            keep = int(self.entry_gc_keep.get().strip())
+            cache_days = int(self.entry_gc_days.get().strip())
+        except ValueError:
+            self.docker_log("Error: Tags to keep and cache age must be numbers.")
+            return
+        dangling = bool(self.check_gc_dangling.get())
+        if not dry_run and not messagebox.askyesno("Clean Up", "Delete old tags, dangling images and stale build cache?"):
+            return
+        host = docker_hosts.hosts.active
+
+        def task():
+            try:
+                self.docker_log(">> Collecting garbage..." if not dry_run else ">> Garbage collection dry run...")
+                report = docker_gc.collect_garbage(keep, cache_days, dangling, dry_run, on_line=self.docker_log, host=host)
+                self.docker_log("\n".join(docker_gc.format_gc_report(report)))
+            except Exception as e:
+                self.docker_log(f"Error: {e}")
+
+        self.run_job("Garbage collection" + (" (dry run)" if dry_run else ""), task, resource="docker", key="gc")
+
+    def browse_stack_file(self):
+        filename = filedialog.askopenfilename(title="Select Stack File", initialdir=docker_stacks.Stack_Folder if os.path.isdir(docker_stacks.Stack_Folder) else None,
+                                              filetypes=[("Stack Files", "*.json *.yml *.yaml")])
+        if filename:
+            self.entry_stack_file.delete(0, "end")
+            self.entry_stack_file.insert(0, filename)
+
+    def run_stack_deploy(self):
+        path = self.entry_stack_file.get().strip() or "stack_config.json"
+        host = docker_hosts.hosts.active
+
+        def task():
+            try:
+                stack = docker_stacks.load_stack(path)
+                self.docker_log(f">> Deploying stack '{stack['name']}' ({len(stack['services'])} service(s))...")
+                results = docker_stacks.deploy_stack(stack, on_line=self.docker_log, host=host)
+                running = sum(1 for r in results if r["status"] == "running")
+                self.docker_log(f">> Stack '{stack['name']}': {running}/{len(results)} service(s) running.")
+                for r in results:
+                    if r["error"]:
+                        self.docker_log(f"   {r['service']}: {r['status']} ({r['error']})")
+                # Widgets may only be touched from the Tk thread
+                self.after(0, lambda: (self.entry_stack_name.delete(0, "end"), self.entry_stack_name.insert(0, stack["name"])))
+            except Exception as e:
+                self.docker_log(f">> Stack deploy failed: {e}")
+
+        self.run_job(f"Deploy stack {path}", task, resource="docker", key=("stack", host, path))
+
+    def run_stack_list(self):
+        host = docker_hosts.hosts.active
+        def task():
+            try:
+                stacks = docker_stacks.list_stacks(host)
+                if not stacks:
+                    self.docker_log("No stacks are deployed.")
+                    return
+                self.docker_log("\n".join(f"{name:<25} {count} container(s)" for name, count in sorted(stacks.items())))
+            except Exception as e:
+                self.docker_log(f"Error listing stacks: {e}")
+
+        self.run_job("List stacks", task)
+
+    def run_stack_teardown(self):
+        name = self.entry_stack_name.get().strip()
+        if not name:
+            self.docker_log("Error: Enter the stack name.")
+            return
+        host = docker_hosts.hosts.active
+
+        def task():
+            try:
+                self.docker_log(f">> Tearing down stack '{name}'...")
+                removed = docker_stacks.teardown_stack(name, on_line=self.docker_log, host=host)
+                self.docker_log(f">> Removed {removed} container(s) of stack '{name}'.")
+            except Exception as e:
+                self.docker_log(f">> Teardown failed: {e}")
+
+        self.run_job(f"Tear down stack {name}", task, resource="docker", key=("stack-down", host, name))
+
+    # =====================================================
+    # VIEW: BACKGROUND JOBS
+    # =====================================================
+    def create_jobs_view(self):
+        self.jobs_frame = ctk.CTkFrame(self.main_area, fg_color="transparent")
+
+        title = ctk.CTkLabel(self.jobs_frame, text="Background Jobs", font=self.font_title)
+        title.pack(pady=(20, 10))
+
+        self.jobs_text = ctk.CTkTextbox(self.jobs_frame, font=self.font_log, wrap="none")
+        self.jobs_text.pack(fill="both", expand=True, padx=20, pady=10)
+
+        cancel_frame = ctk.CTkFrame(self.jobs_frame, fg_color="transparent")
+        cancel_frame.pack(pady=10)
+        ctk.CTkLabel(cancel_frame, text="Job ID:", font=self.font_body).pack(side="left", padx=10)
+        self.entry_job_id = ctk.CTkEntry(cancel_frame, width=120, height=40, font=self.font_body)
+        self.entry_job_id.pack(side="left", padx=10)
+        ctk.CTkButton(cancel_frame, text="CANCEL JOB", width=200, height=50, font=self.font_button, fg_color="#C0392B", hover_color="#922B21", command=self.run_job_cancel).pack(side="left", padx=10)
+
+    def refresh_jobs(self):
+        """Redraws the jobs table once a second while the page is shown (Tk thread)."""
+        if not self.jobs_frame.winfo_ismapped():
+            self.jobs_refreshing = False
+            return
+        jobs = job_scheduler.scheduler.list_jobs()
+        text = "\n".join(job_scheduler.format_jobs(jobs)) if jobs else "No jobs have run yet."
+        if self.jobs_text.get("1.0", "end-1c") != text:
+            self.jobs_text.delete("1.0", "end")
+            self.jobs_text.insert("1.0", text)
+        self.after(1000, self.refresh_jobs)
+
+    def run_job_cancel(self):
+        choice = self.entry_job_id.get().strip()
+        if not choice.isdigit() or not job_scheduler.scheduler.cancel(int(choice)):
+            self.log(f"Error: No active job with ID '{choice}'.")
+            return
+        self.log(f"Cancellation of job {choice} requested.")
+
+    def hide_views(self):
+        for frame in (self.vm_frame, self.docker_frame, self.jobs_frame):
+            if frame: frame.grid_forget()
+
     def show_vm_frame(self):
-        if self.docker_frame: self.docker_frame.grid_forget()
+        if self.vm_frame is None:
+            self.create_vm_view()
+        self.hide_views()
         self.vm_frame.grid(row=0, column=0, sticky="nsew")
 
     def show_docker_frame(self):
-        self.vm_frame.grid_forget()
+        if self.docker_frame is None:
+            self.create_docker_view()
+        self.hide_views()
         self.docker_frame.grid(row=0, column=0, sticky="nsew")
+
+    def show_jobs_frame(self):
+        if self.jobs_frame is None:
+            self.create_jobs_view()
+        self.hide_views()
+        self.jobs_frame.grid(row=0, column=0, sticky="nsew")
+        if not self.jobs_refreshing:
+            self.jobs_refreshing = True
+            # Mapping happens on the next idle pass, so start refreshing after it
+            self.after(50, self.refresh_jobs)
         
     def save_dockerfile(self):
         # 1. Get Project Name & Content
@@ -607,10 +1287,10 @@ class CloudManagerApp(ctk.CTk):
 
         # Validation: Must have a name and content
         if not project_name:
-            self.log(">> Error: Please enter a Project Name to create the folder.")
+            self.docker_log(">> Error: Please enter a Project Name to create the folder.")
             return
         if not content:
-            self.log(">> Error: Dockerfile content is empty.")
+            self.docker_log(">> Error: Dockerfile content is empty.")
             return
 
         # 2. Define the Path: Docker_Projects / <ProjectName> / Dockerfile
@@ -622,17 +1302,18 @@ class CloudManagerApp(ctk.CTk):
             # 3. Create the Folder (if it doesn't exist)
             if not os.path.exists(project_folder):
                 os.makedirs(project_folder)
-                self.log(f">> Created new project folder: {project_folder}")
+                self.docker_log(f">> Created new project folder: {project_folder}")
 
             # 4. Save the File (Force name 'Dockerfile', no extension)
             # newline='\n' ensures Linux-style line endings even on Windows
             with open(file_path, "w", newline='\n') as f: 
                 f.write(content)
             
-            self.log(f">> Success! Saved to: {file_path}")
+            self.docker_log(f">> Success! Saved to: {file_path}")
+            self.run_dockerfile_check()
 
         except Exception as e:
-            self.log(f"Error saving file: {e}")
+            self.docker_log(f"Error saving file: {e}")
 
 if __name__ == "__main__":
     app = CloudManagerApp()
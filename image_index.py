@@ -0,0 +1,142 @@
+import bisect
+import threading
+from datetime import datetime
+
+# Image events that change which tags point where
+Refresh_Actions = {"pull", "tag", "untag", "import", "load", "save", "push"}
+
+
+def created_epoch(value):
+    """'Created' is an epoch int from /images/json but an ISO string from inspect."""
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not value:
+        return 0
+    # Trim nanoseconds to microseconds so fromisoformat() accepts it
+    text = value.replace("Z", "+00:00")
+    if "." in text:
+        head, tail = text.split(".", 1)
+        digits = "".join(c for c in tail if c.isdigit())
+        zone = tail[len(digits):]
+        text = f"{head}.{digits[:6]}{zone}"
+    return int(datetime.fromisoformat(text).timestamp())
+
+
+def split_tag(repo_tag):
+    """'localhost:5000/app:v1' -> ('localhost:5000/app', 'v1')."""
+    repo, sep, tag = repo_tag.rpartition(":")
+    if not sep or "/" in tag:
+        return repo_tag, "latest"
+    return repo, tag
+
+
+class ImageIndex:
+    """
+    In-memory index of local images. It is loaded with one API call and
+    then kept current from the Docker events stream, so listing and
+    searching never go back to the daemon.
+    One row exists per (repository, tag); untagged images get '<none>'.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._images = {}     # image id -> {"id", "size", "created", "tags": [(repo, tag)]}
+        self._sorted = None   # sorted rows and search keys, rebuilt after a change
+        self.loaded = False
+
+    def load(self):
+        """(Re)loads every image with a single /images/json call."""
+        images = {}
+        for raw in self.client.api.images():
+            images[raw["Id"]] = self._record(raw["Id"], raw.get("RepoTags"), raw.get("Size", 0), raw.get("Created"))
+        with self._lock:
+            self._images = images
+            self._sorted = None
+            self.loaded = True
+
+    @staticmethod
+    def _record(image_id, repo_tags, size, created):
+        tags = [split_tag(t) for t in (repo_tags or []) if t != "<none>:<none>"]
+        return {"id": image_id, "size": size or 0, "created": created_epoch(created), "tags": tags or [("<none>", "<none>")]}
+
+    def _refresh_image(self, ref):
+        try:
+            raw = self.client.api.inspect_image(ref)
+        except Exception:
+            return
+        record = self._record(raw["Id"], raw.get("RepoTags"), raw.get("Size", 0), raw.get("Created"))
+        with self._lock:
+            # A tag moving to this image must disappear from the old one
+            moved = set(record["tags"]) - {("<none>", "<none>")}
+            for other in self._images.values():
+                if other["id"] != record["id"] and moved.intersection(other["tags"]):
+                    other["tags"] = [t for t in other["tags"] if t not in moved] or [("<none>", "<none>")]
+            self._images[record["id"]] = record
+            self._sorted = None
+
+    def handle_event(self, event):
+        """Keeps the index current; subscribe this to 'image' events."""
+        action = event.get("Action") or event.get("status")
+        image_id = event.get("id") or event.get("Actor", {}).get("ID")
+        if not image_id:
+            return
+        if action == "delete":
+            with self._lock:
+                self._images.pop(image_id, None)
+                self._sorted = None
+        elif action in Refresh_Actions:
+            self._refresh_image(image_id)
+
+    def _rows_sorted(self):
+        """
+        Returns {"repository": (rows, keys), "tag": (rows, keys)} where rows
+        are (repo lower, tag lower, repo, tag, id) sorted on that column.
+        Caller holds the lock.
+        """
+        if self._sorted is None:
+            rows = [(repo.lower(), tag.lower(), repo, tag, img["id"])
+                    for img in self._images.values() for repo, tag in img["tags"]]
+            by_repo = sorted(rows)
+            by_tag = sorted(rows, key=lambda r: (r[1], r[0]))
+            self._sorted = {
+                "repository": (by_repo, [r[0] for r in by_repo]),
+                "tag": (by_tag, [r[1] for r in by_tag]),
+            }
+        return self._sorted
+
+    def _row(self, row):
+        image = self._images[row[4]]
+        return {"repository": row[2], "tag": row[3], "id": image["id"],
+                "short_id": image["id"].split(":")[-1][:12], "size": image["size"], "created": image["created"]}
+
+    def rows(self, sort_by="created"):
+        """All rows, newest first ('created'), biggest first ('size') or by name ('name')."""
+        with self._lock:
+            by_repo, _ = self._rows_sorted()["repository"]
+            rows = [self._row(r) for r in by_repo]
+        if sort_by in ("created", "size"):
+            rows.sort(key=lambda r: r[sort_by], reverse=True)
+        return rows
+
+    def search(self, term, prefix=False, field="repository"):
+        """
+        Finds rows whose repository and/or tag (field="repository", "tag"
+        or "both") contains the term, or starts with it when prefix=True.
+        Prefix lookups use binary search on the sorted index.
+        """
+        term = term.lower()
+        with self._lock:
+            found = []
+            for name, (rows, keys) in self._rows_sorted().items():
+                if field not in (name, "both"):
+                    continue
+                if prefix:
+                    i = bisect.bisect_left(keys, term)
+                    while i < len(keys) and keys[i].startswith(term):
+                        found.append(rows[i])
+                        i += 1
+                else:
+                    found.extend(rows[i] for i, key in enumerate(keys) if term in key)
+            unique = list(dict.fromkeys(found))
+            return [self._row(r) for r in unique]
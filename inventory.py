@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+DB_Path = os.path.join("VM_Storage", "inventory.db")
+
+Schema = """
+CREATE TABLE IF NOT EXISTS vms (
+    id          INTEGER PRIMARY KEY,
+    name        TEXT NOT NULL,
+    config      TEXT,
+    disk_path   TEXT,
+    base_image  TEXT,
+    status      TEXT NOT NULL DEFAULT 'created',
+    disk_bytes  INTEGER,
+    disk_mtime  REAL,
+    created_at  REAL NOT NULL,
+    last_run_at REAL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_vms_name ON vms(name);
+CREATE INDEX IF NOT EXISTS idx_vms_status ON vms(status);
+"""
+
+
+class Inventory:
+    """
+    SQLite record of every VM: its config, disk, base image, status and
+    when it was created and last run. Runs in WAL mode so the GUI can read
+    while a worker thread writes.
+    """
+
+    def __init__(self, path=DB_Path):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._created = False
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # The file and its tables are created on first use, not at import
+            folder = os.path.dirname(self.path)
+            if folder:
+                os.makedirs(folder, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if not self._created:
+                    conn.executescript(Schema)
+                    self._created = True
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _to_dict(row):
+        vm = dict(row)
+        vm["config"] = json.loads(vm["config"]) if vm["config"] else None
+        return vm
+
+    def record_vm(self, name, disk_path, base_image=None, config=None, status="created"):
+        """Adds a VM, or updates it if a VM with this name already exists."""
+        with self._conn() as conn:
+            conn.execute(
+                """
+                INSERT INTO vms (name, config, disk_path, base_image, status, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(name) DO UPDATE SET
+                    config = COALESCE(excluded.config, config),
+                    disk_path = excluded.disk_path,
+                    base_image = excluded.base_image,
+                    status = excluded.status
+                """,
+                (name, json.dumps(config) if config else None, disk_path, base_image, status, time.time())
+            )
+
+    def set_status(self, name, status, ran=False):
+        """Updates a VM's status; ran=True also stamps the last run time."""
+        with self._conn() as conn:
+            if ran:
+                conn.execute("UPDATE vms SET status = ?, last_run_at = ? WHERE name = ?", (status, time.time(), name))
+            else:
+                conn.execute("UPDATE vms SET status = ? WHERE name = ?", (status, name))
+
+    def get(self, name):
+        row = self._conn().execute("SELECT * FROM vms WHERE name = ?", (name,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def list_vms(self, status=None):
+        if status:
+            rows = self._conn().execute("SELECT * FROM vms WHERE status = ? ORDER BY name", (status,))
+        else:
+            rows = self._conn().execute("SELECT * FROM vms ORDER BY name")
+        return [self._to_dict(row) for row in rows]
+
+    def counts(self):
+        """Returns {status: number of VMs}."""
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM vms GROUP BY status")
+        return {status: count for status, count in rows}
+
+    def sync_running(self, running_names):
+        """Marks the given VMs running and any other 'running' VM stopped."""
+        running_names = set(running_names)
+        with self._conn() as conn:
+            stale = [r[0] for r in conn.execute("SELECT name FROM vms WHERE status = 'running'")
+                     if r[0] not in running_names]
+            conn.executemany("UPDATE vms SET status = 'stopped' WHERE name = ?", [(n,) for n in stale])
+            conn.executemany("UPDATE vms SET status = 'running' WHERE name = ? AND status != 'running'",
+                             [(n,) for n in running_names])
+
+    def reconcile(self, folder, running_names=()):
+        """
+        Brings the inventory in line with the disks in 'folder'. Only one
+        directory listing and a stat per file is needed (no qemu-img calls).
+        Unknown disks are added as 'discovered', VMs whose disk is gone are
+        marked 'missing'. Returns (added, missing) counts.
+        """
+        on_disk = {}
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.qcow2'):
+                    st = entry.stat()
+                    on_disk[os.path.join(folder, entry.name)] = (st.st_size, st.st_mtime)
+
+        conn = self._conn()
+        known = {row["disk_path"]: row["name"] for row in conn.execute("SELECT name, disk_path FROM vms")}
+        now = time.time()
+        with conn:
+            added = [
+                (os.path.splitext(os.path.basename(path))[0], path, size, mtime, mtime, now)
+                for path, (size, mtime) in on_disk.items() if path not in known
+            ]
+            conn.executemany(
+                """
+                INSERT INTO vms (name, disk_path, status, disk_bytes, disk_mtime, created_at)
+                VALUES (?, ?, 'discovered', ?, ?, MIN(?, ?))
+                ON CONFLICT(name) DO NOTHING
+                """,
+                added
+            )
+            conn.executemany(
+                """
+                UPDATE vms SET disk_bytes = ?, disk_mtime = ?,
+                    status = CASE status WHEN 'missing' THEN 'stopped' ELSE status END
+                WHERE disk_path = ?
+                """,
+                [(size, mtime, path) for path, (size, mtime) in on_disk.items() if path in known]
+            )
+            missing = [(name,) for path, name in known.items() if path and path not in on_disk]
+            conn.executemany("UPDATE vms SET status = 'missing' WHERE name = ?", missing)
+        self.sync_running(running_names)
+        return len(added), len(missing)
+
+
+# Shared by the CLI and the GUI; the database is opened on first use
+inventory = Inventory()
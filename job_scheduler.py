@@ -0,0 +1,310 @@
+import time
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# Jobs that may run at the same time, over all resources
+Job_Workers = 12
+
+# Most jobs of one kind that may run at the same time; the rest wait in line
+Resource_Limits = {
+    "build": 2,
+    "pull": 2,
+    "disk": 2,
+    "vm": 4,
+    "docker": 4,
+}
+
+# Finished jobs kept for the jobs view
+Job_History = 100
+
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been asked to stop."""
+
+
+class Job:
+    """One unit of background work and everything the jobs view shows about it."""
+
+    def __init__(self, job_id, name, resource, key):
+        self.id = job_id
+        self.name = name
+        self.resource = resource
+        self.key = key
+        self.status = "queued"     # queued, running, done, failed, cancelled
+        self.progress = None       # 0-100, or None when unknown
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+        self.on_done = None
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def wait(self, timeout=None):
+        """Waits for the job to finish and returns its result (or raises its error)."""
+        if not self._done.wait(timeout):
+            raise TimeoutError(f"Job {self.id} ({self.name}) is still {self.status}")
+        if self.status == "cancelled":
+            raise JobCancelled(f"Job {self.id} ({self.name}) was cancelled")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+    def snapshot(self):
+        now = self.finished_at or time.time()
+        return {"id": self.id, "name": self.name, "resource": self.resource, "status": self.status,
+                "progress": self.progress, "message": self.message,
+                "seconds": now - self.started_at if self.started_at else 0.0,
+                "error": str(self.error) if self.error else None}
+
+
+def current_job():
+    """The job running on this thread, or None outside the scheduler."""
+    return getattr(_local, "job", None)
+
+
+def check_cancelled(job=None):
+    """
+    Long loops call this; it raises JobCancelled if their job was cancelled.
+    Helper threads of a job pass the job they work for. No-op outside a job.
+    """
+    job = job or current_job()
+    if job is not None and job.cancel_requested():
+        raise JobCancelled(f"Job {job.id} ({job.name}) was cancelled")
+
+
+def report_progress(progress=None, message=None, job=None):
+    """Updates the current job's progress (0-100) and/or status text. No-op outside a job."""
+    job = job or current_job()
+    if job is None:
+        return
+    if progress is not None:
+        job.progress = max(0.0, min(100.0, float(progress)))
+    if message is not None:
+        job.message = message
+
+
+class JobScheduler:
+    """
+    Runs background work on one bounded pool. Each job may name a resource
+    ("build", "pull", ...); at most Resource_Limits[resource] of those run
+    at once and the others wait in line without holding a worker.
+    Jobs with the same key are not queued twice. Cancellation is
+    cooperative: running jobs stop at their next check_cancelled().
+    """
+
+    def __init__(self, max_workers=Job_Workers, limits=None):
+        self.max_workers = max_workers
+        self.limits = dict(Resource_Limits if limits is None else limits)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._jobs = {}                # id -> Job, active and recent
+        self._finished = deque()       # ids of finished jobs, oldest first
+        self._running = {}             # resource -> running count
+        self._waiting = {}             # resource -> deque of (job, fn, args, kwargs)
+
+    def submit(self, name, fn, *args, resource=None, key=None, on_done=None, **kwargs):
+        """
+        Queues fn(*args, **kwargs) as a job and returns the Job right away.
+        If a job with the same key is still queued or running, that job is
+        returned instead of starting another one. on_done(job) is called
+        when it finishes, so callers never have to block a worker waiting.
+        """
+        with self._lock:
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and job.active:
+                        return job
+            job = Job(next(self._ids), name, resource, key)
+            job.on_done = on_done
+            self._jobs[job.id] = job
+            limit = self.limits.get(resource)
+            if limit is not None and self._running.get(resource, 0) >= limit:
+                self._waiting.setdefault(resource, deque()).append((job, fn, args, kwargs))
+                job.message = "waiting for a free slot"
+                return job
+            self._running[resource] = self._running.get(resource, 0) + 1
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def run(self, name, fn, *args, resource=None, **kwargs):
+        """
+        Runs fn as a job and waits for its result; the CLI runs its long
+        operations this way. Ctrl+C while waiting cancels the job and waits
+        for it to stop (JobCancelled is raised). Called from inside a job
+        it runs inline on the same worker, so nested work never waits for a
+        worker its own parent is holding.
+        """
+        if current_job() is not None:
+            return fn(*args, **kwargs)
+        job = self.submit(name, fn, *args, resource=resource, **kwargs)
+        try:
+            return job.wait()
+        except KeyboardInterrupt:
+            print(f"\nCancelling job {job.id} ({name})...")
+            self.cancel(job.id)
+            return job.wait()
+
+    def _run(self, job, fn, args, kwargs):
+        _local.job = job
+        try:
+            if job.cancel_requested():
+                job.status = "cancelled"
+                return
+            job.status = "running"
+            job.started_at = time.time()
+            job.message = ""
+            try:
+                job.result = fn(*args, **kwargs)
+                job.status = "cancelled" if job.cancel_requested() else "done"
+                if job.status == "done" and job.progress is not None:
+                    job.progress = 100.0
+            except JobCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                job.error = e
+                job.status = "failed"
+        finally:
+            _local.job = None
+            job.finished_at = time.time()
+            if job.status == "cancelled" and job.message == "cancelling...":
+                job.message = ""
+            self._finish(job)
+
+    def _finish(self, job):
+        next_up = None
+        with self._lock:
+            self._finished.append(job.id)
+            while len(self._finished) > Job_History:
+                self._jobs.pop(self._finished.popleft(), None)
+            waiting = self._waiting.get(job.resource)
+            skipped = []
+            # Hand the slot to the next job of the same kind that is not cancelled
+            while waiting:
+                candidate = waiting.popleft()
+                if candidate[0].cancel_requested():
+                    self._mark_cancelled(candidate[0])
+                    skipped.append(candidate[0])
+                    continue
+                next_up = candidate
+                break
+            if next_up is None:
+                self._running[job.resource] -= 1
+        for cancelled in skipped:
+            self._notify(cancelled)
+        self._notify(job)
+        if next_up is not None:
+            try:
+                self._pool.submit(self._run, *next_up)
+            except RuntimeError:
+                # The program is exiting; the pool takes no more work
+                with self._lock:
+                    self._mark_cancelled(next_up[0])
+                self._notify(next_up[0])
+
+    def _notify(self, job):
+        job._done.set()
+        if job.on_done is not None:
+            try:
+                job.on_done(job)
+            except Exception as e:
+                print(f"Job {job.id} callback error: {e}")
+
+    def _mark_cancelled(self, job):
+        # Caller holds the lock and calls _notify() after releasing it
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        self._finished.append(job.id)
+
+    def cancel(self, job_id):
+        """
+        Cancels a job. A waiting job is dropped at once; a running one is
+        asked to stop. Returns False if there is no such active job.
+        """
+        dropped = False
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.active:
+                return False
+            job._cancel.set()
+            waiting = self._waiting.get(job.resource)
+            if waiting:
+                for entry in list(waiting):
+                    if entry[0] is job:
+                        waiting.remove(entry)
+                        self._mark_cancelled(job)
+                        dropped = True
+                        break
+            if job.status == "running":
+                job.message = "cancelling..."
+        if dropped:
+            self._notify(job)
+        return True
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, active_only=False):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [j.snapshot() for j in jobs if j.active or not active_only]
+
+    def gather(self, jobs, timeout=None):
+        """Waits for several jobs; returns their results (None for failed or cancelled ones)."""
+        results = []
+        for job in jobs:
+            try:
+                results.append(job.wait(timeout))
+            except Exception:
+                results.append(None)
+        return results
+
+
+# Shared by the CLI, the GUI and the managers
+scheduler = JobScheduler()
+
+
+def format_jobs(jobs):
+    """Formats JobScheduler.list_jobs() as a table."""
+    lines = [f"{'ID':<5} {'STATUS':<10} {'KIND':<8} {'PROGRESS':<9} {'TIME (s)':<9} NAME"]
+    for j in sorted(jobs, key=lambda j: j["id"], reverse=True):
+        progress = f"{j['progress']:.0f}%" if j["progress"] is not None else "-"
+        detail = j["error"] or j["message"]
+        lines.append(f"{j['id']:<5} {j['status']:<10} {j['resource'] or '-':<8} {progress:<9} {j['seconds']:<9.1f} "
+                     f"{j['name']}" + (f"  ({detail})" if detail else ""))
+    return lines
+
+
+def show_jobs():
+    """Lists background jobs and lets the user cancel one."""
+    print("\n--- Background Jobs ---")
+    jobs = scheduler.list_jobs()
+    if not jobs:
+        print("No jobs have run yet.")
+        return
+    for line in format_jobs(jobs):
+        print(line)
+    if not any(j["status"] in ("queued", "running") for j in jobs):
+        return
+    choice = input("Job ID to cancel (Enter to go back): ").strip()
+    if not choice:
+        return
+    if not choice.isdigit() or not scheduler.cancel(int(choice)):
+        print(f"Error: No active job with ID '{choice}'.")
+    else:
+        print(f"Cancellation of job {choice} requested.")
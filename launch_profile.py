@@ -0,0 +1,138 @@
+import os
+import glob
+import functools
+import capacity
+
+Hugepages_Path = "/dev/hugepages"
+
+# "auto" fields are filled in from the host probe. A VM config can
+# override any of them with a "profile" object, e.g.
+#   "profile": {"accel": "tcg", "pin_cpus": "2-3", "hugepages": true}
+Default_Profile = {
+    "accel": "auto",        # kvm | tcg
+    "cpu_model": "auto",    # host on KVM, max on TCG
+    "disk_bus": "virtio",   # virtio | ide
+    "disk_cache": "auto",   # none on KVM (O_DIRECT), writeback on TCG
+    "disk_aio": "auto",     # io_uring when the kernel has it, else native / threads
+    "pin_cpus": None,       # "0-3,8" or a list of host CPUs to run the VM on
+    "numa_node": None,      # Pin to the CPUs of this NUMA node
+    "hugepages": False,     # Back guest RAM with /dev/hugepages
+}
+
+
+def parse_cpulist(text):
+    """Turns '0-3,8' into [0, 1, 2, 3, 8]."""
+    cpus = []
+    for part in str(text).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _io_uring_supported():
+    # io_uring arrived in Linux 5.1 and can be switched off with a sysctl
+    try:
+        major, minor = (int(x) for x in os.uname().release.split(".")[:2])
+    except ValueError:
+        return False
+    if (major, minor) < (5, 1):
+        return False
+    try:
+        with open("/proc/sys/kernel/io_uring_disabled", 'r') as f:
+            return f.read().strip() == "0"
+    except FileNotFoundError:
+        return True
+
+
+def _numa_nodes():
+    nodes = {}
+    for path in sorted(glob.glob("/sys/devices/system/node/node[0-9]*")):
+        try:
+            with open(os.path.join(path, "cpulist"), 'r') as f:
+                nodes[int(path.rsplit("node", 1)[1])] = parse_cpulist(f.read())
+        except (OSError, ValueError):
+            continue
+    return nodes
+
+
+@functools.lru_cache(maxsize=None)
+def probe_host():
+    """Checks what this host supports. Runs once per process; the result is cached."""
+    meminfo = capacity.read_meminfo()
+    page_kb = meminfo.get("Hugepagesize", 0)
+    return {
+        "kvm": capacity.kvm_available(),
+        "io_uring": _io_uring_supported(),
+        "hugepages_free_mb": meminfo.get("HugePages_Free", 0) * page_kb // 1024,
+        "numa_nodes": _numa_nodes(),
+    }
+
+
+def resolve_profile(overrides=None, ram_mb=0):
+    """Merges config overrides into the defaults and fills in every 'auto' value."""
+    host = probe_host()
+    profile = dict(Default_Profile)
+    profile.update(overrides or {})
+
+    if profile["accel"] == "auto":
+        profile["accel"] = "kvm" if host["kvm"] else "tcg"
+    kvm = profile["accel"] == "kvm"
+
+    if profile["cpu_model"] == "auto":
+        profile["cpu_model"] = "host" if kvm else "max"
+    if profile["disk_cache"] == "auto":
+        profile["disk_cache"] = "none" if kvm else "writeback"
+    if profile["disk_aio"] == "auto":
+        if host["io_uring"]:
+            profile["disk_aio"] = "io_uring"
+        else:
+            # aio=native needs O_DIRECT, which only cache=none gives
+            profile["disk_aio"] = "native" if profile["disk_cache"] == "none" else "threads"
+
+    if profile["pin_cpus"] is None and profile["numa_node"] is not None:
+        profile["pin_cpus"] = host["numa_nodes"].get(int(profile["numa_node"]))
+    if isinstance(profile["pin_cpus"], str):
+        profile["pin_cpus"] = parse_cpulist(profile["pin_cpus"])
+
+    if profile["hugepages"] and host["hugepages_free_mb"] < int(ram_mb):
+        print(f"Warning: only {host['hugepages_free_mb']} MB of hugepages free, using normal memory.")
+        profile["hugepages"] = False
+    return profile
+
+
+def profile_args(profile, disk_path):
+    """The QEMU arguments for the accelerator, CPU, disk and memory backing."""
+    # Commas in -drive values are escaped by doubling them
+    drive = (f"file={disk_path.replace(',', ',,')},format=qcow2,if={profile['disk_bus']},"
+             f"cache={profile['disk_cache']},aio={profile['disk_aio']}")
+    args = [
+        "-accel", profile["accel"],
+        "-cpu", profile["cpu_model"],
+        "-drive", drive,
+    ]
+    if profile["hugepages"]:
+        args.extend(["-mem-path", Hugepages_Path, "-mem-prealloc"])
+    return args
+
+
+def show_profile():
+    """Prints the host probe and the launch profile new VMs get by default."""
+    print("\n--- Launch Profile ---")
+    try:
+        host = probe_host()
+        profile = resolve_profile()
+    except Exception as e:
+        print(f"Error probing host: {e}")
+        return
+    print(f"KVM            : {'yes' if host['kvm'] else 'no (falling back to TCG emulation)'}")
+    print(f"io_uring       : {'yes' if host['io_uring'] else 'no'}")
+    print(f"Hugepages free : {host['hugepages_free_mb']} MB")
+    nodes = ", ".join(f"node{n}: {len(cpus)} CPUs" for n, cpus in host["numa_nodes"].items()) or "n/a"
+    print(f"NUMA nodes     : {nodes}")
+    print(f"Default args   : {' '.join(profile_args(profile, '<disk>'))}")
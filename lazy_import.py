@@ -0,0 +1,35 @@
+import sys
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Stands in for a module until one of its attributes is first used, then
+    imports it. Safe to touch from several threads at once.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def __getattr__(self, attr):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}{'' if self._module is None else ' (loaded)'}>"
+
+
+def lazy_import(name):
+    """
+    Returns the module if it is already imported, otherwise a LazyModule.
+    Used for the Docker side, whose docker/requests/urllib3 imports would
+    otherwise slow down every start, including VM-only sessions.
+    """
+    module = sys.modules.get(name)
+    return module if module is not None else LazyModule(name)
@@ -0,0 +1,45 @@
+import queue
+from collections import deque
+
+# Lines kept in the GUI log; older ones are dropped
+Scrollback_Lines = 5000
+
+# Most lines moved into the log widget per drain
+Batch_Lines = 2000
+
+# How often (ms) the GUI drains the queue
+Drain_Interval_MS = 100
+
+
+class LogSink:
+    """
+    Buffer between worker threads and the GUI log. Any thread may push();
+    only the Tk thread drains it, in batches, so widgets are never touched
+    from a worker. The last Scrollback_Lines lines are kept with their
+    source so the view can be re-filtered.
+    """
+
+    def __init__(self, scrollback=Scrollback_Lines):
+        self._queue = queue.SimpleQueue()
+        self.history = deque(maxlen=scrollback)   # (source, line); Tk thread only
+
+    def push(self, message, source="System"):
+        self._queue.put((source, message))
+
+    def drain(self, max_lines=Batch_Lines):
+        """Takes queued messages (Tk thread). Returns (source, line) pairs."""
+        batch = []
+        while len(batch) < max_lines:
+            try:
+                source, message = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            lines = str(message).splitlines() or [""]
+            batch.append((source, f">> {lines[0]}"))
+            batch.extend((source, line) for line in lines[1:])
+        self.history.extend(batch)
+        return batch
+
+    def lines(self, source=None):
+        """Kept lines, optionally only those from one source."""
+        return [line for src, line in self.history if source is None or src == source]
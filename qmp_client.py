@@ -0,0 +1,142 @@
+import json
+import asyncio
+import threading
+from collections import deque
+
+
+class QMPError(Exception):
+    """Raised when QEMU answers a command with an error."""
+
+
+class QMPClient:
+    """
+    Minimal asyncio client for the QEMU Machine Protocol (QMP).
+    One client talks to one VM over its unix socket.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.events = deque(maxlen=100)  # Latest async events (SHUTDOWN, STOP, ...)
+        self._reader = None
+        self._writer = None
+        self._lock = asyncio.Lock()
+        self._next_id = 0
+
+    @property
+    def connected(self):
+        return self._writer is not None and not self._writer.is_closing()
+
+    async def connect(self):
+        self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path)
+        # QEMU greets us first, then waits for capabilities negotiation
+        greeting = await self._read_message()
+        if "QMP" not in greeting:
+            raise QMPError(f"Unexpected greeting: {greeting}")
+        await self.execute("qmp_capabilities")
+        return greeting
+
+    async def _read_message(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError(f"QMP socket closed: {self.socket_path}")
+        return json.loads(line)
+
+    async def execute(self, command, arguments=None):
+        """Sends one command and returns its 'return' value."""
+        async with self._lock:
+            self._next_id += 1
+            request = {"execute": command, "id": self._next_id}
+            if arguments:
+                request["arguments"] = arguments
+            self._writer.write(json.dumps(request).encode() + b"\n")
+            await self._writer.drain()
+
+            while True:
+                message = await self._read_message()
+                if "event" in message:
+                    self.events.append(message)
+                    continue
+                if message.get("id") != self._next_id:
+                    continue
+                if "error" in message:
+                    raise QMPError(message["error"].get("desc", str(message["error"])))
+                return message.get("return")
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+        self._reader = self._writer = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class QMPPool:
+    """
+    Keeps one open QMP connection per VM, all served by one event loop
+    running in a background thread. Blocking code calls run() to use it.
+    """
+
+    def __init__(self):
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._clients = {}  # socket path -> QMPClient
+
+    @property
+    def loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="qmp-loop", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def run(self, coro, timeout=10):
+        """Runs a coroutine on the shared loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    async def _client(self, socket_path):
+        client = self._clients.get(socket_path)
+        if client is None or not client.connected:
+            client = QMPClient(socket_path)
+            await client.connect()
+            self._clients[socket_path] = client
+        return client
+
+    async def execute(self, socket_path, command, arguments=None):
+        """Runs a command, reconnecting once if the old connection went away."""
+        try:
+            client = await self._client(socket_path)
+            return await client.execute(command, arguments)
+        except (ConnectionError, BrokenPipeError):
+            await self.forget(socket_path)
+            client = await self._client(socket_path)
+            return await client.execute(command, arguments)
+
+    async def execute_many(self, requests):
+        """
+        Runs (socket_path, command, arguments) requests at the same time.
+        Returns a list of results; a failed request gives its exception.
+        """
+        return await asyncio.gather(
+            *(self.execute(path, command, arguments) for path, command, arguments in requests),
+            return_exceptions=True
+        )
+
+    async def forget(self, socket_path):
+        client = self._clients.pop(socket_path, None)
+        if client is not None:
+            await client.close()
+
+
+# Shared by every caller in this process
+pool = QMPPool()
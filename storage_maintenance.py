@@ -0,0 +1,319 @@
+import os
+import re
+import time
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import vm_manager
+import job_scheduler
+from job_scheduler import JobCancelled, check_cancelled, report_progress, scheduler
+from vm_supervisor import supervisor
+
+# qemu-img convert -p prints progress like "    (42.17/100%)" separated by \r
+Progress_Pattern = re.compile(rb"\((\d+(?:\.\d+)?)/100%\)")
+
+# Images not written to for this many days count as cold
+Cold_Days = 30
+
+# How many images are compacted at once (the scheduler's "disk" limit)
+Maintenance_Workers = job_scheduler.Resource_Limits["disk"]
+
+
+def list_images():
+    """Every qcow2 image in VM_Storage and Base_Images."""
+    paths = []
+    for folder in (vm_manager.VM_Folder, vm_manager.Base_Folder):
+        paths.extend(
+            os.path.join(folder, f) for f in sorted(os.listdir(folder)) if f.endswith('.qcow2')
+        )
+    return paths
+
+
+def in_use_paths():
+    """Disks of running VMs plus the base images behind them. These are never rewritten."""
+    used = set()
+    for vm in supervisor.list_vms():
+        disk = vm.get("disk_path")
+        if not disk:
+            continue
+        used.add(os.path.abspath(disk))
+        try:
+            backing = vm_manager.image_info(disk).get("full-backing-filename")
+        except (subprocess.CalledProcessError, ValueError):
+            continue
+        if backing:
+            used.add(os.path.abspath(backing))
+    return used
+
+
+def image_report(max_workers=8):
+    """
+    Returns actual vs. virtual size for every image.
+    The qemu-img info calls run in parallel.
+    """
+    def inspect(path):
+        entry = {"path": path, "actual_bytes": None, "virtual_bytes": None, "backing": None, "error": None}
+        try:
+            info = vm_manager.image_info(path)
+            entry["actual_bytes"] = info.get("actual-size", os.path.getsize(path))
+            entry["virtual_bytes"] = info.get("virtual-size")
+            entry["backing"] = info.get("full-backing-filename")
+        except Exception as e:
+            entry["error"] = str(e)
+        entry["mtime"] = os.path.getmtime(path)
+        return entry
+
+    paths = list_images()
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as pool:
+        return list(pool.map(inspect, paths))
+
+
+def snapshot_tags(paths, max_workers=8):
+    """
+    Returns {path: [snapshot names]} for the images that have internal
+    snapshots. 'qemu-img convert' does not copy those, so compacting such
+    an image would silently delete them.
+    """
+    def tags(path):
+        try:
+            return [s["name"] for s in vm_manager.image_info(path).get("snapshots", [])]
+        except (subprocess.CalledProcessError, ValueError):
+            # Unreadable images fail in compact_image() with qemu-img's own error
+            return []
+
+    paths = list(paths)
+    if not paths:
+        return {}
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(paths)))) as pool:
+        return {path: found for path, found in zip(paths, pool.map(tags, paths)) if found}
+
+
+def cold_images(days=Cold_Days):
+    """Images that have not been written to for 'days' days, are not in use and have no snapshots."""
+    cutoff = time.time() - days * 86400
+    used = in_use_paths()
+    cold = [p for p in list_images() if os.path.getmtime(p) < cutoff and os.path.abspath(p) not in used]
+    snapshotted = snapshot_tags(cold)
+    return [p for p in cold if p not in snapshotted]
+
+
+def plan_compaction(compress_cold=False):
+    """
+    Picks the images to rewrite: every idle image, with the cold ones
+    compressed if compress_cold is set. Images with internal snapshots
+    are left alone. Returns (compact, compress, skipped) where skipped
+    maps path -> reason.
+    """
+    used = in_use_paths()
+    idle = [p for p in list_images() if os.path.abspath(p) not in used]
+    skipped = {path: f"has snapshots ({', '.join(tags)}); compacting would delete them"
+               for path, tags in snapshot_tags(idle).items()}
+    targets = [p for p in idle if p not in skipped]
+    cold = set(cold_images()) & set(targets) if compress_cold else set()
+    return [p for p in targets if p not in cold], sorted(cold), skipped
+
+
+def compact_image(path, compress=False, on_progress=None):
+    """
+    Rewrites an image with 'qemu-img convert' to drop unused clusters,
+    optionally compressing it (-c). Overlays keep their base image (-B).
+    The original is only replaced if the new file is smaller. Images with
+    internal snapshots are refused, since the copy would not keep them.
+    Returns (bytes before, bytes after).
+    """
+    if os.path.abspath(path) in in_use_paths():
+        raise RuntimeError(f"'{path}' is in use by a running VM")
+
+    info = vm_manager.image_info(path)
+    if info.get("snapshots"):
+        tags = ", ".join(s["name"] for s in info["snapshots"])
+        raise RuntimeError(f"'{path}' has snapshots ({tags}); compacting would delete them")
+    before = os.path.getsize(path)
+    folder, name = os.path.split(path)
+    tmp_path = os.path.join(folder, f".{name}.compact")
+
+    cmd = ["qemu-img", "convert", "-p", "-O", "qcow2"]
+    if compress:
+        cmd.append("-c")
+    if info.get("full-backing-filename"):
+        cmd.extend(["-B", info["full-backing-filename"], "-F", info.get("backing-filename-format", "qcow2")])
+    cmd.extend([path, tmp_path])
+
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        buffer = b""
+        while True:
+            chunk = proc.stdout.read(256)
+            if not chunk:
+                break
+            buffer = (buffer + chunk)[-256:]
+            matches = Progress_Pattern.findall(buffer)
+            if matches and on_progress:
+                on_progress(path, float(matches[-1]))
+        if proc.wait() != 0:
+            raise RuntimeError(proc.stderr.read().decode(errors="replace").strip() or "qemu-img convert failed")
+
+        after = os.path.getsize(tmp_path)
+        if after < before:
+            # Keep the old timestamps so a cold image still looks cold
+            st = os.stat(path)
+            os.utime(tmp_path, (st.st_atime, st.st_mtime))
+            os.replace(tmp_path, path)
+            return before, after
+        return before, before
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.stderr.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class MaintenanceRunner:
+    """
+    Runs compaction jobs on the shared job scheduler ("disk" jobs, at most
+    Maintenance_Workers at once) and keeps their progress so the CLI or
+    GUI can show it.
+    """
+
+    def __init__(self, max_workers=Maintenance_Workers):
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self.jobs = {}  # path -> status record
+
+    def _update(self, path, **fields):
+        with self._lock:
+            self.jobs[path].update(fields)
+
+    def _progress(self, path, pct):
+        self._update(path, progress=pct)
+        report_progress(pct)
+        # Raising here stops the copy; compact_image() kills qemu-img and removes the temp file
+        check_cancelled()
+
+    def _run(self, path, compress):
+        self._update(path, status="running", started_at=time.time())
+        try:
+            before, after = compact_image(path, compress, self._progress)
+            self._update(path, status="done", progress=100.0, before=before, after=after)
+        except JobCancelled:
+            self._update(path, status="cancelled")
+            raise
+        except Exception as e:
+            self._update(path, status="failed", error=str(e))
+            raise
+        return before, after
+
+    def submit(self, paths, compress=False, on_done=None):
+        """
+        Queues images for compaction and returns their scheduler jobs.
+        Images that already have a job queued or running are skipped.
+        on_done(job) is called as each one finishes.
+        """
+        def finished(job, path):
+            # A job cancelled while waiting for a slot never reached _run()
+            if job.status == "cancelled":
+                self._update(path, status="cancelled")
+            if on_done:
+                on_done(job)
+
+        jobs = []
+        for path in paths:
+            with self._lock:
+                if self.jobs.get(path, {}).get("status") in ("queued", "running"):
+                    continue
+                self.jobs[path] = {"path": path, "status": "queued", "progress": 0.0,
+                                   "compress": compress, "before": None, "after": None, "error": None}
+            name = f"{'Compress' if compress else 'Compact'} {os.path.basename(path)}"
+            jobs.append(scheduler.submit(name, self._run, path, compress, resource="disk",
+                                         key=("compact", path),
+                                         on_done=lambda job, path=path: finished(job, path)))
+        return jobs
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def busy(self):
+        return any(job["status"] in ("queued", "running") for job in self.snapshot())
+
+
+# Shared by the CLI and the GUI
+runner = MaintenanceRunner()
+
+
+def format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def show_report():
+    """Prints actual vs. virtual size for every image."""
+    print("\n--- Disk Usage Report ---")
+    try:
+        entries = image_report()
+    except Exception as e:
+        print(f"Error reading images: {e}")
+        return
+    if not entries:
+        print("No disk images found.")
+        return
+    print(f"{'IMAGE':<35} {'ACTUAL':<12} {'VIRTUAL':<12} {'USED %':<8} {'IDLE (days)':<12}")
+    total_actual = 0
+    for e in entries:
+        idle = (time.time() - e["mtime"]) / 86400
+        if e["error"]:
+            print(f"{os.path.basename(e['path']):<35} ERROR: {e['error']}")
+            continue
+        total_actual += e["actual_bytes"]
+        used = 100 * e["actual_bytes"] / e["virtual_bytes"] if e["virtual_bytes"] else 0
+        print(f"{os.path.basename(e['path']):<35} {format_size(e['actual_bytes']):<12} "
+              f"{format_size(e['virtual_bytes']):<12} {used:<8.1f} {idle:<12.0f}")
+    print(f"Total on disk: {format_size(total_actual)}")
+
+
+def run_maintenance():
+    """Compacts all idle images (and compresses cold ones) with live progress."""
+    print("\n--- Compact Disk Images ---")
+    compress = input(f"Also compress images idle for {Cold_Days}+ days? (y/n): ").lower() == 'y'
+    try:
+        plain, cold, skipped = plan_compaction(compress)
+    except Exception as e:
+        print(f"Error: {e}")
+        return
+    for path, reason in skipped.items():
+        print(f"{os.path.basename(path):<35} SKIPPED: {reason}")
+    targets = plain + cold
+    if not targets:
+        print("No images to compact (all are in use, have snapshots or none exist).")
+        return
+
+    runner.submit(plain)
+    runner.submit(cold, compress=True)
+
+    print(f"Compacting {len(targets)} image(s), {runner.max_workers} at a time...")
+    try:
+        while runner.busy():
+            progress = ", ".join(f"{os.path.basename(j['path'])} {j['progress']:.0f}%"
+                                 for j in runner.snapshot() if j["status"] == "running")
+            print(f"\r{progress:<100}", end="", flush=True)
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        print("\nStill running in the background.")
+        return
+
+    print()
+    saved = 0
+    for job in runner.snapshot():
+        if job["path"] not in targets:
+            continue
+        if job["status"] == "failed":
+            print(f"{os.path.basename(job['path']):<35} FAILED: {job['error']}")
+        elif job["status"] == "done":
+            saved += job["before"] - job["after"]
+            print(f"{os.path.basename(job['path']):<35} {format_size(job['before'])} -> {format_size(job['after'])}")
+    print(f"Reclaimed {format_size(saved)}.")
@@ -0,0 +1,67 @@
+import os
+import re
+import time
+import asyncio
+import qmp_client
+
+# QEMU prints this to its log when the serial port is attached to a pty
+PTY_Pattern = re.compile(r"char device redirected to (/dev/pts/\d+) \(label serial0\)")
+
+
+def find_pty(log_path, timeout=5):
+    """Waits for QEMU to report which pty it attached the serial port to."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with open(log_path, 'r', errors="replace") as f:
+                match = PTY_Pattern.search(f.read())
+            if match:
+                return match.group(1)
+        except FileNotFoundError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError(f"QEMU did not report a serial pty in {log_path}")
+
+
+async def _open_console(vm):
+    loop = asyncio.get_running_loop()
+    if vm.get("console_socket"):
+        # QEMU may still be creating the socket right after launch
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                # Keep the writer too: dropping it would close the connection
+                return await asyncio.open_unix_connection(vm["console_socket"], limit=2 ** 20)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+    pty_path = await loop.run_in_executor(None, find_pty, vm["log_path"])
+    fd = os.open(pty_path, os.O_RDONLY | os.O_NOCTTY | os.O_NONBLOCK)
+    reader = asyncio.StreamReader(limit=2 ** 20)
+    transport, _ = await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), os.fdopen(fd, 'rb', 0))
+    return reader, transport
+
+
+async def _stream(vm, on_line):
+    reader, closer = await _open_console(vm)
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            on_line(line.decode(errors="replace").rstrip("\r\n"))
+    finally:
+        closer.close()
+
+
+def stream_console(vm, on_line):
+    """
+    Streams a headless VM's serial console, calling on_line() once per line
+    as it arrives. Runs on the shared QMP event loop, so no thread is used.
+    Returns a future: cancel() it to stop, result() to wait for the end.
+    """
+    if not vm.get("console_socket") and vm.get("console") != "pty":
+        raise ValueError(f"VM '{vm['name']}' has no serial console (it was not started headless)")
+    return asyncio.run_coroutine_threadsafe(_stream(vm, on_line), qmp_client.pool.loop)
@@ -1,66 +1,407 @@
 import os
 import subprocess
 import json
-
+import time
+from concurrent.futures import ThreadPoolExecutor
+from vm_supervisor import supervisor
+import qmp_client
+import vm_console
+import capacity
+import launch_profile
+from inventory import inventory
+from job_scheduler import JobCancelled, current_job, scheduler
 
 
 VM_Folder = "VM_Storage"
 if not os.path.exists(VM_Folder):
     os.makedirs(VM_Folder)
 
-def create_disk(disk_name, size_gb):
+# Shared "golden" images that VM disks can be cloned from
+Base_Folder = os.path.join(VM_Folder, "Base_Images")
+if not os.path.exists(Base_Folder):
+    os.makedirs(Base_Folder)
+
+# Values used when a config file leaves a field out
+VM_Defaults = {
+    "vm_name": "default_vm",
+    "ram_mb": 2048,
+    "cpu_cores": 4,
+    "disk_size_gb": 10,
+    "iso_path": "ISO_Images/ubuntu-20.04.6-desktop-amd64.iso",
+    "base_image": None,
+    "headless": False,
+    "serial": "socket",
+    "vnc": None,
+}
+
+# How many qemu-img processes a fleet may run at the same time
+Fleet_Workers = 4
+
+# Each running VM gets a QMP control socket in here
+QMP_Folder = os.path.join(VM_Folder, "qmp")
+
+# Serial console sockets of headless VMs
+Console_Folder = os.path.join(VM_Folder, "console")
+
+def vm_name_from_disk(disk_path):
+    return os.path.splitext(os.path.basename(disk_path))[0]
+
+def image_info(path):
+    """Returns the output of 'qemu-img info --output=json' as a dict."""
+    # -U lets us read images that a running VM has locked
+    result = subprocess.run(
+        ["qemu-img", "info", "-U", "--output=json", path],
+        check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout)
+
+def resolve_base_image(base_image):
+    """Accepts a bare file name from Base_Images or a full path to a base image."""
+    if not base_image.endswith('.qcow2'):
+        base_image += '.qcow2'
+    if not os.path.exists(base_image):
+        base_image = os.path.join(Base_Folder, os.path.basename(base_image))
+    if not os.path.exists(base_image):
+        raise FileNotFoundError(f"Base image '{base_image}' not found")
+    return os.path.abspath(base_image)
+
+def create_disk(disk_name, size_gb, base_image=None, config=None):
     """
     Creates a virtual hard drive using qemu-img.
     Command: qemu-img create -f qcow2 <name> <size>
+    With a base image the disk is a copy-on-write overlay that only stores
+    this VM's own changes:
+    Command: qemu-img create -f qcow2 -b <base> -F qcow2 <name> [size]
+    The new VM (and its config, if given) is recorded in the inventory.
     """
-    print(f"\n[1/2] Creating Hard Drive: {disk_name} ({size_gb} GB)...")
+    if base_image:
+        print(f"\n[1/2] Creating Overlay Disk: {disk_name} (base: {os.path.basename(base_image)})...")
+    else:
+        print(f"\n[1/2] Creating Hard Drive: {disk_name} ({size_gb} GB)...")
     
     # Ensure the name ends with .qcow2
     if not disk_name.endswith('.qcow2'):
         disk_name += '.qcow2'
     disk_name = os.path.join(VM_Folder, disk_name)
+
+    cmd = ["qemu-img", "create", "-f", "qcow2"]
         
     try:
+        if base_image:
+            base_image = resolve_base_image(base_image)
+            # The backing path is stored inside the overlay, so keep it absolute
+            cmd.extend(["-b", base_image, "-F", "qcow2", disk_name])
+            # Only pass a size when the VM needs a bigger disk than the base
+            base_size = image_info(base_image)["virtual-size"]
+            if size_gb and size_gb * 1024 ** 3 > base_size:
+                cmd.append(f"{size_gb}G")
+        else:
+            cmd.extend([disk_name, f"{size_gb}G"])
+
         # We use subprocess to run the shell command
-        subprocess.run(
-            ["qemu-img", "create", "-f", "qcow2", disk_name, f"{size_gb}G"], 
-            check=True
-        )
+        subprocess.run(cmd, check=True)
         print(f"Success! Disk created at: {os.path.abspath(disk_name)}")
+        inventory.record_vm(vm_name_from_disk(disk_name), disk_name, base_image, config)
         return disk_name
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
         print(f"Error creating disk: {e}")
         return None
 
-def launch_vm(ram_mb, cpu_cores, disk_path, iso_path=None):
+def list_base_images():
+    """
+    Returns {base image path: [overlay paths]} for every image in Base_Images,
+    plus any other image that an overlay in VM_Storage is backed by.
+    """
+    bases = {}
+    for f in sorted(os.listdir(Base_Folder)):
+        if f.endswith('.qcow2'):
+            bases[os.path.abspath(os.path.join(Base_Folder, f))] = []
+
+    for f in sorted(os.listdir(VM_Folder)):
+        if not f.endswith('.qcow2'):
+            continue
+        path = os.path.join(VM_Folder, f)
+        try:
+            backing = image_info(path).get("full-backing-filename")
+        except (subprocess.CalledProcessError, ValueError):
+            continue
+        if backing:
+            bases.setdefault(os.path.abspath(backing), []).append(path)
+    return bases
+
+def show_base_images():
+    """Prints the base images and how many overlays depend on each one."""
+    print("\n--- Base Images ---")
+    try:
+        bases = list_base_images()
+    except Exception as e:
+        print(f"Error reading images: {e}")
+        return
+    if not bases:
+        print(f"No base images found. Copy a prepared .qcow2 into '{Base_Folder}'.")
+        return
+    for base, overlays in bases.items():
+        print(f"{os.path.basename(base):<30} | Overlays: {len(overlays):<4} | {base}")
+        for overlay in overlays:
+            print(f"    - {overlay}")
+
+def launch_vm(ram_mb, cpu_cores, disk_path, iso_path=None, name=None, headless=False, serial="socket", vnc=None, queue=False, profile=None):
     """
     Launches the VM using qemu-system-x86_64.
+    QEMU runs as a detached process, so this returns as soon as it has started.
+    With headless=True there is no GTK window: the serial console goes to a
+    unix socket (serial="socket") or a pty (serial="pty"), and vnc=":1" adds
+    an optional VNC display.
+    A VM that would overcommit the host is rejected, or with queue=True
+    waits until running VMs free enough resources.
+    'profile' overrides the host's launch profile (see launch_profile).
+    Returns the supervisor record, or None if QEMU could not be started.
     """
-    print(f"\n[2/2] Launching Virtual Machine...")
-    print(f"Configuration: {ram_mb}MB RAM | {cpu_cores} Cores")
+    name = name or vm_name_from_disk(disk_path)
+    print(f"\n[2/2] Launching Virtual Machine '{name}'{' (headless)' if headless else ''}...")
+    # KVM or TCG, CPU model, disk options and pinning for this host
+    tuning = launch_profile.resolve_profile(profile, ram_mb)
+    print(f"Configuration: {ram_mb}MB RAM | {cpu_cores} Cores | {tuning['accel'].upper()}")
     
     # Build the massive QEMU command
     cmd = [
         "qemu-system-x86_64",
+        "-name", name,
         "-m", str(ram_mb),              # RAM size
         "-smp", str(cpu_cores),         # Number of CPU cores
-        "-hda", disk_path,              # The hard drive we just created
-        "-enable-kvm",                  # Use KVM acceleration (faster)
-        "-display", "gtk"               # Try to open a GUI window
     ]
+    cmd.extend(launch_profile.profile_args(tuning, disk_path))
+
+    details = {"disk_path": disk_path, "iso_path": iso_path, "headless": headless, "profile": tuning}
+    if headless:
+        cmd.extend(["-display", "none"])
+        if serial == "pty":
+            cmd.extend(["-serial", "pty"])
+            details["console"] = "pty"
+        else:
+            if not os.path.exists(Console_Folder):
+                os.makedirs(Console_Folder)
+            console_socket = os.path.abspath(os.path.join(Console_Folder, f"{name}.sock"))
+            cmd.extend(["-serial", f"unix:{console_socket},server=on,wait=off"])
+            details["console"] = "socket"
+            details["console_socket"] = console_socket
+        if vnc:
+            cmd.extend(["-vnc", vnc])
+            details["vnc"] = vnc
+    else:
+        cmd.extend(["-display", "gtk"])  # Try to open a GUI window
     
     # If the user provided an OS installer (ISO), attach it to the CD-ROM
     if iso_path:
         cmd.extend(["-cdrom", iso_path, "-boot", "d"])
+
+    # QMP control channel, so the VM can be queried and controlled while it runs
+    if not os.path.exists(QMP_Folder):
+        os.makedirs(QMP_Folder)
+    qmp_socket = os.path.abspath(os.path.join(QMP_Folder, f"{name}.sock"))
+    cmd.extend(["-qmp", f"unix:{qmp_socket},server=on,wait=off"])
     
     print(f"Running command: {' '.join(cmd)}")
     
     try:
-        # We don't use check=True here because closing the VM window might look like an 'error' to Python
-        subprocess.run(cmd)
+        with capacity.reserve(ram_mb, cpu_cores, wait=queue):
+            record = supervisor.start(name, cmd, ram_mb, cpu_cores, cpu_affinity=tuning["pin_cpus"], qmp_socket=qmp_socket, **details)
+        print(f"VM '{name}' is running (PID {record['pid']}). QEMU output: {record['log_path']}")
+        inventory.set_status(name, "running", ran=True)
+        return record
+    except capacity.CapacityError as e:
+        print(f"Launch rejected for '{name}': {e}")
+        return None
+    except JobCancelled:
+        print(f"Launch of '{name}' cancelled while waiting for capacity.")
+        return None
     except Exception as e:
         print(f"Failed to launch QEMU: {e}")
-        print("Tip: If you are on WSL without a GUI, try adding '-nographic' to the command.")
+        if not headless:
+            print("Tip: If you are on WSL or a server without a GUI, launch the VM headless.")
+        return None
+
+def list_running_vms():
+    """Prints every VM the supervisor is tracking."""
+    print("\n--- Running VMs ---")
+    vms = supervisor.list_vms()
+    if not vms:
+        print("No VMs are currently running.")
+        return
+    print(f"{'NAME':<20} {'PID':<8} {'RAM (MB)':<10} {'CPUS':<6} {'UPTIME':<10} DISK")
+    for vm in vms:
+        uptime = int(time.time() - vm["started_at"])
+        uptime_text = f"{uptime // 3600}h{uptime % 3600 // 60:02d}m"
+        print(f"{vm['name']:<20} {vm['pid']:<8} {vm['ram_mb']:<10} {vm['cpu_cores']:<6} {uptime_text:<10} {vm.get('disk_path', '')}")
+
+def stop_vm(force=False):
+    """Stops a running VM. With force=True the QEMU process is killed."""
+    name = input("Enter the name of the VM to " + ("force-kill: " if force else "stop: ")).strip()
+    try:
+        if force:
+            stopped = supervisor.kill(name)
+        else:
+            print(f"Stopping VM '{name}'...")
+            stopped = supervisor.stop(name)
+        if stopped:
+            inventory.set_status(name, "stopped")
+            print(f"VM '{name}' stopped.")
+        else:
+            print(f"VM '{name}' is still shutting down. Use force-kill if it hangs.")
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+def qmp_command(name, command, arguments=None, timeout=10):
+    """Sends a QMP command to a running VM and returns QEMU's answer."""
+    vm = supervisor.get(name)
+    if not vm:
+        raise KeyError(f"No running VM named '{name}'")
+    if not vm.get("qmp_socket"):
+        raise ValueError(f"VM '{name}' was started without a QMP socket")
+    return qmp_client.pool.run(qmp_client.pool.execute(vm["qmp_socket"], command, arguments), timeout)
+
+def vm_status(name):
+    """Returns QEMU's run state, e.g. {'status': 'running', 'running': True}."""
+    return qmp_command(name, "query-status")
+
+def pause_vm(name):
+    qmp_command(name, "stop")
+
+def resume_vm(name):
+    qmp_command(name, "cont")
+
+def powerdown_vm(name):
+    """Presses the virtual power button so the guest OS shuts down cleanly."""
+    qmp_command(name, "system_powerdown")
+
+def vm_blockstats(name):
+    """Returns read/write counters for every disk attached to the VM."""
+    return qmp_command(name, "query-blockstats")
+
+def vm_cpu_stats(name):
+    """
+    Returns one record per vCPU with its host thread ID and the CPU time
+    (in seconds) that thread has used, read from /proc.
+    """
+    vm = supervisor.get(name)
+    ticks = os.sysconf("SC_CLK_TCK")
+    stats = []
+    for cpu in qmp_command(name, "query-cpus-fast"):
+        seconds = None
+        try:
+            with open(f"/proc/{vm['pid']}/task/{cpu['thread-id']}/stat", 'r') as f:
+                # Fields after the ')' of the thread name; utime and stime are 14 and 15
+                fields = f.read().rsplit(")", 1)[1].split()
+            seconds = (int(fields[11]) + int(fields[12])) / ticks
+        except (OSError, IndexError, ValueError):
+            pass
+        stats.append({"cpu_index": cpu["cpu-index"], "thread_id": cpu["thread-id"], "cpu_seconds": seconds})
+    return stats
+
+def query_all_vms():
+    """Asks every running VM for its status at once over one event loop."""
+    vms = [vm for vm in supervisor.list_vms() if vm.get("qmp_socket")]
+    results = qmp_client.pool.run(
+        qmp_client.pool.execute_many([(vm["qmp_socket"], "query-status", None) for vm in vms])
+    )
+    return {vm["name"]: result for vm, result in zip(vms, results)}
+
+def show_vm_status():
+    """Prints the QEMU run state of every running VM."""
+    print("\n--- VM Status (QMP) ---")
+    try:
+        statuses = query_all_vms()
+    except Exception as e:
+        print(f"Error querying VMs: {e}")
+        return
+    if not statuses:
+        print("No VMs are currently running.")
+        return
+    for name, status in statuses.items():
+        text = f"ERROR ({status})" if isinstance(status, Exception) else status["status"]
+        print(f"{name:<20} | {text}")
+
+def control_vm(action):
+    """Pauses, resumes or gracefully shuts down a VM through QMP."""
+    actions = {"pause": pause_vm, "resume": resume_vm, "shutdown": powerdown_vm}
+    name = input(f"Enter the name of the VM to {action}: ").strip()
+    try:
+        actions[action](name)
+        print(f"Sent '{action}' to VM '{name}'.")
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+def show_vm_stats():
+    """Prints vCPU time and disk I/O counters for one VM."""
+    name = input("Enter the name of the VM: ").strip()
+    try:
+        print(f"\n--- Stats for '{name}' ---")
+        for cpu in vm_cpu_stats(name):
+            used = f"{cpu['cpu_seconds']:.1f}s" if cpu["cpu_seconds"] is not None else "n/a"
+            print(f"vCPU {cpu['cpu_index']:<3} | Thread {cpu['thread_id']:<8} | CPU time: {used}")
+        for dev in vm_blockstats(name):
+            st = dev["stats"]
+            device = dev.get("device") or dev.get("qdev", "?")
+            print(f"Disk {device:<10} | Read: {st['rd_bytes'] / 1024 ** 2:.1f} MB ({st['rd_operations']} ops) "
+                  f"| Written: {st['wr_bytes'] / 1024 ** 2:.1f} MB ({st['wr_operations']} ops)")
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+    except Exception as e:
+        print(f"Error: {e}")
+
+def watch_console():
+    """Streams a headless VM's serial console until Ctrl+C."""
+    name = input("Enter the name of the headless VM: ").strip()
+    vm = supervisor.get(name)
+    if not vm:
+        print(f"Error: No running VM named '{name}'")
+        return
+    try:
+        stream = vm_console.stream_console(vm, lambda line: print(line, flush=True))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    print(f"--- Serial console of '{name}' (Ctrl+C to return) ---")
+    try:
+        stream.result()
+        print("--- Console closed ---")
+    except KeyboardInterrupt:
+        stream.cancel()
+        print("\n--- Stopped watching ---")
+    except Exception as e:
+        print(f"Console error: {e}")
+
+def reconcile_inventory():
+    """Syncs the inventory with VM_Storage and the running VMs. Cheap enough for every startup."""
+    running = [vm["name"] for vm in supervisor.list_vms()]
+    return inventory.reconcile(VM_Folder, running)
+
+def show_inventory():
+    """Prints every known VM from the inventory, optionally filtered by status."""
+    print("\n--- VM Inventory ---")
+    status = input("Filter by status (running/stopped/created/discovered/missing, empty for all): ").strip().lower()
+    try:
+        inventory.sync_running(vm["name"] for vm in supervisor.list_vms())
+        vms = inventory.list_vms(status or None)
+    except Exception as e:
+        print(f"Error reading inventory: {e}")
+        return
+    if not vms:
+        print("No VMs found.")
+        return
+    print(f"{'NAME':<20} {'STATUS':<11} {'CREATED':<17} {'LAST RUN':<17} {'BASE IMAGE':<20} DISK")
+    for vm in vms:
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(vm["created_at"]))
+        last_run = time.strftime("%Y-%m-%d %H:%M", time.localtime(vm["last_run_at"])) if vm["last_run_at"] else "never"
+        base = os.path.basename(vm["base_image"]) if vm["base_image"] else "-"
+        print(f"{vm['name']:<20} {vm['status']:<11} {created:<17} {last_run:<17} {base:<20} {vm['disk_path']}")
+    counts = inventory.counts()
+    print(", ".join(f"{count} {name}" for name, count in sorted(counts.items())))
 
 def create_vm_interactive():
     """Objective 1: Interactive User Input"""
@@ -76,18 +417,134 @@ def create_vm_interactive():
         print("Error: Please enter numbers only for RAM, CPU, and Disk.")
         return
 
+    # Don't create a disk for a VM this host can't run
+    ok, reason = capacity.check(ram, cpu)
+    if not ok:
+        print(f"Error: Not enough host capacity. {reason}")
+        return
+
+    # Cloning a base image skips the OS install completely
+    base_image = input("Base image to clone (leave empty for a blank disk): ").strip() or None
+
     # 2. Create the Disk
-    disk_path = create_disk(vm_name, disk_size)
+    config = {"vm_name": vm_name, "ram_mb": ram, "cpu_cores": cpu, "disk_size_gb": disk_size, "base_image": base_image}
+    disk_path = create_disk(vm_name, disk_size, base_image, config)
     
     if disk_path:
         # 3. Ask for an ISO (Optional)
-        use_iso = input("Do you have an ISO file (OS Installer)? (y/n): ").lower()
+        use_iso = 'n' if base_image else input("Do you have an ISO file (OS Installer)? (y/n): ").lower()
         iso_path = None
         if use_iso == 'y':
             iso_path = input("Enter full path to ISO file: ")
         
-        # 4. Launch
-        launch_vm(ram, cpu, disk_path, iso_path) 
+        # 4. Launch (headless saves the RAM and CPU of a GTK window)
+        headless = input("Run headless with a serial console (no window)? (y/n): ").lower() == 'y'
+        vnc = None
+        if headless:
+            vnc = input("VNC display, e.g. ':1' (leave empty for none): ").strip() or None
+        launch_vm(ram, cpu, disk_path, iso_path, vm_name, headless=headless, vnc=vnc)
+
+def load_vm_specs(source, defaults=None):
+    """
+    Loads VM specs from a JSON file or from a folder of JSON files.
+    A file may hold one config object or a list of them.
+    """
+    defaults = VM_Defaults if defaults is None else defaults
+    if os.path.isdir(source):
+        files = sorted(
+            os.path.join(source, f) for f in os.listdir(source) if f.endswith(".json")
+        )
+    else:
+        files = [source]
+
+    specs = []
+    for path in files:
+        with open(path, 'r') as f:
+            data = json.load(f)
+        entries = data if isinstance(data, list) else [data]
+        for entry in entries:
+            spec = dict(defaults)
+            spec.update(entry)
+            specs.append(spec)
+    return specs
+
+def provision_vm(spec):
+    """Creates the disk for one spec and returns a result record with timing."""
+    started = time.perf_counter()
+    result = {"name": spec["vm_name"], "spec": spec, "disk_path": None, "error": None}
+    try:
+        result["disk_path"] = create_disk(spec["vm_name"], spec["disk_size_gb"], spec.get("base_image"), spec)
+        if not result["disk_path"]:
+            result["error"] = "qemu-img create failed"
+    except Exception as e:
+        result["error"] = str(e)
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+def print_fleet_report(results):
+    print("\n--- Fleet Report ---")
+    print(f"{'VM':<25} {'RESULT':<8} {'TIME (s)':<10} DETAILS")
+    for r in results:
+        status = "FAILED" if r["error"] else "OK"
+        details = r["error"] or r["disk_path"]
+        print(f"{r['name']:<25} {status:<8} {r['seconds']:<10.2f} {details}")
+    failed = sum(1 for r in results if r["error"])
+    print(f"{len(results) - failed} created, {failed} failed.")
+
+def launch_spec(spec, disk_path, queue=False):
+    """Launches a VM described by a config spec on an existing disk."""
+    # A clone of a base image already has an OS, so skip the installer
+    iso = None if spec.get("base_image") else spec["iso_path"] or None
+    return launch_vm(
+        spec["ram_mb"], spec["cpu_cores"], disk_path, iso, spec["vm_name"],
+        headless=spec.get("headless", False), serial=spec.get("serial", "socket"), vnc=spec.get("vnc"),
+        queue=queue, profile=spec.get("profile")
+    )
+
+def create_fleet(specs, max_workers=Fleet_Workers, launch=False, queue=False):
+    """
+    Creates the disks for every spec on a bounded worker pool, then prints
+    per-VM timing. With launch=True the VMs are bin-packed onto the host:
+    the ones that fit are launched and the rest are reported as deferred,
+    or with queue=True launched one by one as resources free up.
+    """
+    names = [s["vm_name"] for s in specs]
+    duplicates = sorted({n for n in names if names.count(n) > 1})
+    if duplicates:
+        print(f"Error: duplicate VM names in fleet: {', '.join(duplicates)}")
+        return []
+
+    print(f"\nProvisioning {len(specs)} VM(s) with up to {max_workers} parallel disk jobs...")
+    job = current_job()
+
+    def provision(spec):
+        # Disks not started yet are skipped once the job is cancelled
+        if job is not None and job.cancel_requested():
+            return {"name": spec["vm_name"], "spec": spec, "disk_path": None, "error": "cancelled", "seconds": 0.0}
+        return provision_vm(spec)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(specs)))) as pool:
+        results = list(pool.map(provision, specs))
+
+    print_fleet_report(results)
+
+    if launch:
+        by_name = {r["name"]: r for r in results if r["disk_path"]}
+        admitted, deferred = capacity.plan_fleet([r["spec"] for r in by_name.values()])
+        for spec in admitted:
+            r = by_name[spec["vm_name"]]
+            r["vm"] = launch_spec(spec, r["disk_path"])
+
+        if deferred:
+            print(f"\n{len(deferred)} VM(s) don't fit on this host right now: {', '.join(s['vm_name'] for s in deferred)}")
+            if queue:
+                print("Queued: they will start as running VMs free up resources (Ctrl+C to give up).")
+        for spec in deferred:
+            r = by_name[spec["vm_name"]]
+            r["vm"] = launch_spec(spec, r["disk_path"], queue=True) if queue else None
+            if not queue:
+                r["deferred"] = True
+    return results
 
 def create_vm_from_config():
     """Objective 1b: Create VM from Configuration File"""
@@ -98,27 +555,41 @@ def create_vm_from_config():
         config_file = "vm_config.json"
         
     try:
-        with open(config_file, 'r') as f:
-            config = json.load(f)
-            
-        print(f"Loaded configuration: {config}")
-        
-        # Extract values
-        name = config.get("vm_name", "default_vm")
-        ram = config.get("ram_mb", 2048)
-        cpu = config.get("cpu_cores", 4)
-        disk_size = config.get("disk_size_gb", 10)
-        iso = config.get("iso_path", "ISO_Images/ubuntu-20.04.6-desktop-amd64.iso")
-        
-        # Run the standard creation process
-        disk_path = create_disk(name, disk_size)
-        
-        if disk_path:
-            launch_vm(ram, cpu, disk_path, iso if iso else None)
+        specs = load_vm_specs(config_file)
+        print(f"Loaded configuration: {specs[0] if len(specs) == 1 else f'{len(specs)} VMs'}")
+
+        # A single config is just a fleet of one
+        scheduler.run(f"Create fleet of {len(specs)} VMs", create_fleet, specs, launch=True, resource="vm")
             
     except FileNotFoundError:
         print(f"Error: File '{config_file}' not found.")
     except json.JSONDecodeError:
         print(f"Error: '{config_file}' is not a valid JSON file.")
     except Exception as e:
-        print(f"Error: {e}")
\ No newline at end of file
+        print(f"Error: {e}")
+
+def create_fleet_from_source():
+    """Objective 1c: Provision many VMs at once"""
+    print("\n--- Create VM Fleet ---")
+
+    source = input("Enter a JSON file with a list of VMs, or a folder of config files: ").strip()
+    if not source:
+        print("Error: Please enter a file or folder path.")
+        return
+
+    try:
+        specs = load_vm_specs(source)
+        if not specs:
+            print(f"Error: No VM configs found in '{source}'.")
+            return
+        launch = input(f"Launch the {len(specs)} VM(s) after their disks are ready? (y/n): ").lower() == 'y'
+        queue = False
+        if launch:
+            queue = input("Queue VMs that don't fit until resources free up? (y/n): ").lower() == 'y'
+        scheduler.run(f"Create fleet of {len(specs)} VMs", create_fleet, specs, launch=launch, queue=queue, resource="vm")
+    except FileNotFoundError:
+        print(f"Error: '{source}' not found.")
+    except json.JSONDecodeError as e:
+        print(f"Error: invalid JSON ({e}).")
+    except Exception as e:
+        print(f"Error: {e}")
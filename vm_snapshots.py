@@ -0,0 +1,142 @@
+import os
+import time
+import subprocess
+import vm_manager
+from vm_supervisor import supervisor
+from inventory import inventory
+
+# Tag used by "reset to snapshot" when none is given
+Default_Tag = "clean"
+
+
+class SnapshotError(Exception):
+    """Raised when QEMU refuses a snapshot operation."""
+
+
+def disk_for(name):
+    """Finds a VM's disk from the supervisor, the inventory or the default path."""
+    vm = supervisor.get(name)
+    if vm and vm.get("disk_path"):
+        return vm["disk_path"]
+    record = inventory.get(name)
+    if record and record.get("disk_path"):
+        return record["disk_path"]
+    path = os.path.join(vm_manager.VM_Folder, f"{name}.qcow2")
+    if not os.path.exists(path):
+        raise KeyError(f"No disk found for VM '{name}'")
+    return path
+
+
+def _hmp(name, command_line):
+    # savevm/loadvm/delvm are only available as monitor commands; errors come back as text
+    output = vm_manager.qmp_command(name, "human-monitor-command", {"command-line": command_line}, timeout=300)
+    if output and "error" in output.lower():
+        raise SnapshotError(output.strip())
+    return output
+
+
+def _qemu_img(*args):
+    result = subprocess.run(["qemu-img", "snapshot", *args], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SnapshotError(result.stderr.strip() or "qemu-img snapshot failed")
+
+
+def list_snapshots(name):
+    """Returns the internal snapshots of a VM's disk (works while it runs)."""
+    return vm_manager.image_info(disk_for(name)).get("snapshots", [])
+
+
+def create_snapshot(name, tag):
+    """
+    Creates an internal qcow2 snapshot. A running VM is snapshotted live
+    through QMP, including its RAM and device state.
+    """
+    if supervisor.get(name):
+        _hmp(name, f"savevm {tag}")
+    else:
+        _qemu_img("-c", tag, disk_for(name))
+
+
+def delete_snapshot(name, tag):
+    if supervisor.get(name):
+        _hmp(name, f"delvm {tag}")
+    else:
+        _qemu_img("-d", tag, disk_for(name))
+
+
+def revert_snapshot(name, tag):
+    """
+    Rolls a VM back to a snapshot. A running VM is restored live, which
+    needs a snapshot taken while it was running (one with saved RAM).
+    """
+    if supervisor.get(name):
+        _hmp(name, f"loadvm {tag}")
+    else:
+        _qemu_img("-a", tag, disk_for(name))
+
+
+def reset_to_snapshot(name, tag=Default_Tag):
+    """
+    Restores a VM to a snapshot as fast as possible and leaves it in the
+    state it was in. A running VM with a live snapshot is restored in
+    place. One with a disk-only snapshot is stopped, reverted offline and
+    started again with the same QEMU command.
+    """
+    snapshot = next((s for s in list_snapshots(name) if s["name"] == tag), None)
+    if snapshot is None:
+        raise KeyError(f"VM '{name}' has no snapshot named '{tag}'")
+
+    vm = supervisor.get(name)
+    if vm is None:
+        revert_snapshot(name, tag)
+        return "reverted"
+    if snapshot.get("vm-state-size", 0) > 0:
+        revert_snapshot(name, tag)
+        return "restored live"
+
+    if not supervisor.kill(name):
+        raise SnapshotError(f"VM '{name}' did not stop")
+    _qemu_img("-a", tag, vm["disk_path"])
+    details = {k: v for k, v in vm.items() if k not in ("name", "pid", "cmd", "ram_mb", "cpu_cores", "started_at", "log_path", "cpu_affinity")}
+    supervisor.start(name, vm["cmd"], vm["ram_mb"], vm["cpu_cores"], cpu_affinity=vm.get("cpu_affinity"), **details)
+    inventory.set_status(name, "running", ran=True)
+    return "reverted and restarted"
+
+
+def manage_snapshots(action):
+    """Interactive create / list / revert / delete / reset."""
+    name = input("Enter the VM name: ").strip()
+    try:
+        if action == "list":
+            snapshots = list_snapshots(name)
+            print(f"\n--- Snapshots of '{name}' ---")
+            if not snapshots:
+                print("No snapshots.")
+            for snap in snapshots:
+                kind = "live (RAM + disk)" if snap.get("vm-state-size", 0) > 0 else "disk only"
+                created = time.strftime("%Y-%m-%d %H:%M", time.localtime(snap.get("date-sec", 0)))
+                print(f"{snap['name']:<20} | {kind:<18} | created {created}")
+            return
+
+        prompt = f"Snapshot name (default '{Default_Tag}'): " if action == "reset" else "Snapshot name: "
+        tag = input(prompt).strip() or (Default_Tag if action == "reset" else "")
+        if not tag:
+            print("Error: Please enter a snapshot name.")
+            return
+
+        if action == "create":
+            create_snapshot(name, tag)
+            print(f"Snapshot '{tag}' created for '{name}'.")
+        elif action == "revert":
+            revert_snapshot(name, tag)
+            print(f"VM '{name}' reverted to '{tag}'.")
+        elif action == "delete":
+            delete_snapshot(name, tag)
+            print(f"Snapshot '{tag}' deleted.")
+        elif action == "reset":
+            result = reset_to_snapshot(name, tag)
+            print(f"VM '{name}' reset to '{tag}' ({result}).")
+    except KeyError as e:
+        print(f"Error: {e.args[0]}")
+    except Exception as e:
+        print(f"Error: {e}")
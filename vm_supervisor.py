@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import shutil
+import signal
+import subprocess
+import threading
+
+Registry_File = os.path.join("VM_Storage", "running_vms.json")
+Log_Folder = os.path.join("VM_Storage", "logs")
+
+
+class VMSupervisor:
+    """
+    Starts QEMU as a detached process and keeps a registry of running VMs.
+    The registry is saved to disk, so a new CLI or GUI session still sees
+    (and can stop) VMs that an earlier session started.
+    No thread is kept per VM: dead processes are cleaned up whenever the
+    registry is read.
+    """
+
+    def __init__(self, registry_file=Registry_File):
+        self.registry_file = registry_file
+        self._lock = threading.Lock()
+        self._children = {}  # name -> Popen, only for VMs this process started
+        self._vms = self._load()
+
+    # --- Registry persistence ---
+    def _load(self):
+        try:
+            with open(self.registry_file, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save(self):
+        folder = os.path.dirname(self.registry_file)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        tmp_path = self.registry_file + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._vms, f, indent=4)
+        os.replace(tmp_path, self.registry_file)
+
+    def _is_alive(self, name, record):
+        proc = self._children.get(name)
+        if proc is not None:
+            # poll() also reaps the process so it doesn't stay a zombie
+            return proc.poll() is None
+        # Started by another session: make sure the PID wasn't reused
+        try:
+            with open(f"/proc/{record['pid']}/cmdline", 'rb') as f:
+                program = f.read().split(b"\0")[0].decode(errors="replace")
+        except OSError:
+            return False
+        return os.path.basename(program) == os.path.basename(record["cmd"][0])
+
+    def _prune(self):
+        dead = [name for name, record in self._vms.items() if not self._is_alive(name, record)]
+        for name in dead:
+            del self._vms[name]
+            self._children.pop(name, None)
+        if dead:
+            self._save()
+        return dead
+
+    # --- Lifecycle ---
+    def start(self, name, cmd, ram_mb, cpu_cores, cpu_affinity=None, **details):
+        """
+        Starts the command in its own session and registers it under 'name'.
+        cpu_affinity pins the process (and every thread it starts) to those
+        host CPUs. Extra keyword arguments are stored with the record.
+        """
+        with self._lock:
+            self._prune()
+            if name in self._vms:
+                raise ValueError(f"A VM named '{name}' is already running (PID {self._vms[name]['pid']})")
+
+            if not os.path.exists(Log_Folder):
+                os.makedirs(Log_Folder)
+            log_path = os.path.join(Log_Folder, f"{name}.log")
+
+            # Pin before exec, so QEMU's vCPU threads inherit the affinity
+            popen_cmd = cmd
+            if cpu_affinity and shutil.which("taskset"):
+                popen_cmd = ["taskset", "-c", ",".join(str(c) for c in cpu_affinity)] + cmd
+
+            # QEMU's own messages go to a log file instead of our terminal
+            with open(log_path, 'w') as log_file:
+                proc = subprocess.Popen(
+                    popen_cmd,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True
+                )
+
+            record = {
+                "name": name,
+                "pid": proc.pid,
+                "ram_mb": int(ram_mb),
+                "cpu_cores": int(cpu_cores),
+                "cmd": cmd,
+                "cpu_affinity": list(cpu_affinity) if cpu_affinity else None,
+                "log_path": log_path,
+                "started_at": time.time(),
+            }
+            record.update(details)
+            if cpu_affinity and popen_cmd is cmd:
+                # No taskset: pin right after start instead
+                os.sched_setaffinity(proc.pid, cpu_affinity)
+            self._children[name] = proc
+            self._vms[name] = record
+            self._save()
+            return record
+
+    def list_vms(self):
+        """Returns the records of all VMs that are still running."""
+        with self._lock:
+            self._prune()
+            return [dict(r) for r in self._vms.values()]
+
+    def get(self, name):
+        with self._lock:
+            self._prune()
+            record = self._vms.get(name)
+            return dict(record) if record else None
+
+    def _signal(self, name, sig):
+        with self._lock:
+            self._prune()
+            record = self._vms.get(name)
+            if not record:
+                raise KeyError(f"No running VM named '{name}'")
+            os.kill(record["pid"], sig)
+
+    def _wait_gone(self, name, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.get(name) is None:
+                return True
+            time.sleep(0.2)
+        return False
+
+    def stop(self, name, timeout=15):
+        """
+        Asks QEMU to quit (SIGTERM) and waits up to 'timeout' seconds.
+        Returns True if the VM exited in time.
+        """
+        self._signal(name, signal.SIGTERM)
+        return self._wait_gone(name, timeout)
+
+    def kill(self, name, timeout=5):
+        """Force-kills the VM process (SIGKILL)."""
+        self._signal(name, signal.SIGKILL)
+        return self._wait_gone(name, timeout)
+
+
+# One supervisor per process, shared by the CLI and the GUI
+supervisor = VMSupervisor()